@@ -0,0 +1,118 @@
+# analytics.py
+#
+# --- ข้อมูลการเล่นสำหรับปรับสมดุล LEVEL_DEFINITIONS/RECIPES ---
+# 1. GameRoom เรียก `record()` ที่จุดสำคัญของเกม (ดู EVENT_KINDS) ด้วยเวลาของห้อง (`room.now`)
+#    เป็นเพียงการต่อท้าย tuple ใน ring buffer (deque ที่มี maxlen) ถ้าเขียนไม่ทัน event เก่าสุดจะถูกเขียนทับ
+#    และนับไว้ใน game_analytics_overwritten_total แทนการให้ hub รอ
+# 2. OS thread จริงดึง event ออกมาเป็นชุดทุก `flush_interval` วินาที แปลงเป็น JSON lines สั้นๆ
+#    {"t": เวลา, "k": ชนิด, "r": ห้อง, "l": ด่าน, "v": ค่า} แล้วเขียนผ่าน gzip
+#    ไฟล์ gzip เปิดค้างไว้และ sync flush ทุกชุด (ไฟล์ที่ยังเขียนอยู่อ่านได้ถึงชุดล่าสุด และบีบอัดได้ดีเท่าไฟล์เดียว)
+# 3. ไฟล์หมุนเมื่อข้อมูลก่อนบีบอัดเกิน `max_bytes` ชื่อไฟล์มีเวลาที่เริ่มเขียน: events-YYYYmmdd-HHMMSS.jsonl.gz
+# 4. สรุปผลแบบ offline ด้วย `python -m tools.analytics_report <ไดเรกทอรี>`
+
+import gzip
+import json
+import os
+import time
+from collections import deque
+
+from metrics import Counter
+from os_threads import original
+
+# ชนิดของ event ที่ GameRoom ส่งมา: ความหมายของค่า "v"
+EVENT_KINDS = {
+    'level_start': 'จำนวนผู้เล่นในด่าน',
+    'objective': 'ชื่อเมนูที่ผู้เล่นได้รับเป็นเป้าหมาย',
+    'submitted': 'ชื่อเมนูที่ส่งสำเร็จ',
+    'failed': 'ชื่อเมนูที่เป็นเป้าหมายตอนส่งจานผิดสูตร',
+    'passed': 'วัตถุดิบที่ถูกส่งต่อให้เพื่อนบ้าน',
+    'ability': 'วัตถุดิบที่ถูกแปรรูป',
+    'level_complete': 'คะแนนที่ได้ในด่าน',
+}
+
+EVENTS_WRITTEN = Counter('game_analytics_events_total', 'จำนวน analytics event ที่เขียนลงไฟล์แล้ว')
+EVENTS_OVERWRITTEN = Counter('game_analytics_overwritten_total', 'จำนวน analytics event ที่ถูกเขียนทับใน ring buffer ก่อนถูกเขียนลงไฟล์')
+
+
+class AnalyticsSink:
+    """ring buffer ของ analytics event ที่เขียนเป็นไฟล์ JSONL แบบ gzip จาก background thread"""
+    def __init__(self, directory, capacity=100000, flush_interval=1.0, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self._buffer = deque(maxlen=capacity) # append/popleft ของ deque ปลอดภัยข้าม thread โดยไม่ต้องใช้ lock
+        self._file = None
+        self._written = 0 # ไบต์ก่อนบีบอัดในไฟล์ปัจจุบัน
+        self._file_lock = original('threading').Lock() # writer thread กับ close() ตอนปิดเซิร์ฟเวอร์
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, timestamp, kind, room_id, level, value):
+        buffer = self._buffer
+        if len(buffer) == buffer.maxlen:
+            EVENTS_OVERWRITTEN.inc()
+        buffer.append((timestamp, kind, room_id, level, value))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = original('threading').Thread(target=self._run, name='analytics-writer', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def _run(self):
+        sleep = original('time').sleep
+        while True:
+            sleep(self.flush_interval)
+            self.flush()
+
+    def _open(self):
+        name = time.strftime('events-%Y%m%d-%H%M%S', time.gmtime())
+        path = os.path.join(self.directory, f'{name}.jsonl.gz')
+        suffix = 1
+        while os.path.exists(path): # หมุนไฟล์มากกว่า 1 ครั้งในวินาทีเดียว
+            path = os.path.join(self.directory, f'{name}-{suffix}.jsonl.gz')
+            suffix += 1
+        self._file = gzip.open(path, 'wb')
+        self._written = 0
+
+    def flush(self):
+        """เขียนทุก event ใน buffer เป็นชุดเดียว (ถูกเรียกจาก writer thread)"""
+        buffer = self._buffer
+        lines = []
+        while buffer:
+            t, kind, room_id, level, value = buffer.popleft()
+            lines.append(json.dumps({'t': round(t, 3), 'k': kind, 'r': room_id, 'l': level, 'v': value},
+                                    ensure_ascii=False, separators=(',', ':')))
+        if not lines:
+            return 0
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        with self._file_lock:
+            if self._file is not None and self._written + len(data) > self.max_bytes:
+                self._file.close()
+                self._file = None
+            if self._file is None:
+                self._open()
+            self._file.write(data)
+            self._file.flush() # Z_SYNC_FLUSH: ข้อมูลถึงไฟล์แล้วแต่ยังใช้ dictionary ของการบีบอัดต่อได้
+            self._written += len(data)
+        EVENTS_WRITTEN.inc(amount=len(lines))
+        return len(lines)
+
+    def close(self):
+        """เขียนที่ค้างอยู่แล้วปิดไฟล์ (ใส่ส่วนท้ายของ gzip) เรียกตอนปิดเซิร์ฟเวอร์"""
+        self.flush()
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_events(path):
+    """อ่าน event จากไฟล์ที่ AnalyticsSink เขียนทีละรายการ (ไฟล์ที่ยังเขียนไม่จบอ่านได้ถึงชุดล่าสุดที่ flush แล้ว)"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                if line.endswith('\n'):
+                    yield json.loads(line)
+        except EOFError: # ไฟล์ที่ยังไม่ถูกปิด (ไม่มีส่วนท้ายของ gzip)
+            return
@@ -5,426 +5,283 @@
 # 2. ปรับปรุง Game Loop: ใช้ "Master Game Loop" เพียงตัวเดียวในการอัปเดตทุกห้องเกมที่ Active อยู่
 #    ซึ่งช่วยลดการใช้ CPU ลงอย่างมากเมื่อเทียบกับการสร้าง Loop แยกสำหรับแต่ละห้อง
 # 3. โค้ดที่สะอาดขึ้น: การแยกส่วนการทำงานทำให้โค้ดอ่านง่าย, แก้ไข, และต่อยอดได้สะดวกขึ้น
+# 4. ไฟล์นี้เหลือเพียงส่วนเชื่อมต่อกับ Flask-SocketIO รายละเอียดของแต่ละส่วนอยู่ในโมดูลของมันเอง:
+#    - เกม: game_engine.py, bots.py, room_browser.py
+#    - connection: validation.py, ratelimit.py, outbound.py, sessions.py
+#    - ข้อมูลถาวร: snapshot.py (SIGTERM), journal.py, leaderboard.py, analytics.py
+#    - การดูแลระบบ: metrics.py, instrumentation.py, event_log.py, ops.py, overload.py, hub_watchdog.py, profiler.py, os_threads.py
 
 import eventlet
 eventlet.monkey_patch()
 
-from flask import Flask, render_template, request
-from flask_socketio import SocketIO, join_room, leave_room, emit
+from flask import Flask, Response, abort, jsonify, render_template, request
+from flask_socketio import SocketIO, disconnect, join_room, leave_room, emit
+import functools
+import hmac
+import json
 import random
+import secrets
+import signal
 import string
-import time
 import os
-from threading import Lock
+import time
+from threading import Event, Lock, local
+
+from game_engine import LEVEL_DEFINITIONS, MAX_PLAYERS, GameRoom, Transport
+from analytics import AnalyticsSink
+from bots import BotScheduler
+from room_browser import PAGE_SIZE, RoomBrowser
+from journal import JournalWriter
+from latency import LatencyTracker, parse_samples
+from leaderboard import WINDOWS, Leaderboard
+from event_log import StructuredLogger
+from hub_watchdog import BlockingWatchdog
+from instrumentation import LOCK_WAIT_SECONDS, Instrumentation, context_from_stack
+from metrics import REGISTRY, Counter, Gauge, Histogram, TimedLock
+from ops import OpsBoard
+from outbound import OutboundQueues
+from overload import OverloadController
+from profiler import SamplingProfiler
+from ratelimit import DISCONNECT, DROP, RateLimiter, parse_limit
+from sessions import SessionRegistry
+import snapshot
+from validation import SCHEMAS, validate
 
 # --- การตั้งค่าพื้นฐาน ---
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.config['SECRET_KEY'] = 'a-very-secret-key-for-the-game!'
 socketio = SocketIO(app, async_mode='eventlet')
 
-# --- ข้อมูลหลักของเกม (Constants) ---
-# การเก็บข้อมูลเหล่านี้ไว้ในระดับ Global ทำให้เข้าถึงได้ง่ายและไม่เปลี่ยนแปลง
-RECIPES = {
-    'สลัดผัก': {'ingredients': sorted(['🥬', '🍅', '🥕']), 'points': 50, 'time_bonus': 10},
-    'สปาเก็ตตี้': {'ingredients': sorted(['🍝', '🥫', '🥩']), 'points': 110, 'time_bonus': 16},
-    'ไอศกรีม': {'ingredients': sorted(['🍨', '🍒']), 'points': 35, 'time_bonus': 7},
-    'ผลไม้รวม': {'ingredients': sorted(['🍓', '🍌', '🍎']), 'points': 30, 'time_bonus': 5},
-    'ซีฟู้ดต้ม': {'ingredients': sorted(['🦞', '🍄', '🌶️']), 'points': 200, 'time_bonus': 22},
-    'ไก่ทอด': {'ingredients': sorted(['🍗', '🍟']), 'points': 60, 'time_bonus': 10},
-    'อาหารเช้าชุดใหญ่': {'ingredients': sorted(['🍳', '🍞', '🍄']), 'points': 170, 'time_bonus': 20},
-    'สเต็กแอนด์ฟรายส์': {'ingredients': sorted(['🥓', '🥕', '🍄']), 'points': 210, 'time_bonus': 24},
-    'ซูชิ': {'ingredients': sorted(['🍣', '🥬']), 'points': 130, 'time_bonus': 18},
-    'สลัดสุขภาพ': {'ingredients': sorted(['🥗', '🥕', '🍅']), 'points': 160, 'time_bonus': 18},
-    'ส้มตำ': {'ingredients': sorted(['🥗', '🌶️', '🍅', '🥜']), 'points': 140, 'time_bonus': 19},
-}
-
-ABILITIES_CONFIG = {
-    'กระทะ': {'verb': 'ทอด', 'transformations': {'🥚': '🍳', '🥩': '🥓'}},
-    'หม้อ': {'verb': 'ต้ม', 'transformations': {'🦐': '🦞', '🥔': '🍟'}},
-    'เขียง': {'verb': 'หั่น', 'transformations': {'🥬': '🥗', '🥕': '🥒','🐟': '🍣'}}
-}
-
-LEVEL_DEFINITIONS = {
-    1: {'target_score': 300, 'time': 130, 'spawn_interval': 3},
-    2: {'target_score': 475, 'time': 120, 'spawn_interval': 3},
-    3: {'target_score': 750, 'time': 110, 'spawn_interval': 3},
-}
-
-# --- สร้างข้อมูลอ้างอิงเพื่อการค้นหาที่รวดเร็ว ---
-TRANSFORMED_TO_BASE_INGREDIENT = {transformed: base for ability_config in ABILITIES_CONFIG.values() for base, transformed in ability_config['transformations'].items()}
-TRANSFORMED_ING_INFO = {transformed: ability for ability, config in ABILITIES_CONFIG.items() for transformed in config['transformations'].values()}
-ALL_INGREDIENTS = list(set(ing for recipe in RECIPES.values() for ing in recipe['ingredients']))
-NORMAL_RECIPES_KEYS = [k for k, v in RECIPES.items() if not any(ing in TRANSFORMED_TO_BASE_INGREDIENT for ing in v['ingredients'])]
-ABILITY_TO_RECIPES = {
-    ability: [
-        recipe_name for recipe_name, recipe_data in RECIPES.items()
-        if any(ing in recipe_data['ingredients'] for ing in config['transformations'].values())
-    ]
-    for ability, config in ABILITIES_CONFIG.items()
-}
-
-# --- โครงสร้างหลักแบบ OOP ---
-
-class Player:
-    """เก็บข้อมูลและสถานะของผู้เล่นแต่ละคน"""
-    def __init__(self, sid, name):
-        self.sid = sid
-        self.name = name
-        self.plate = []
-        self.objective = None
-        self.ability = None
-        self.ability_processing = None # {'input': str, 'output': str, 'end_time': float}
-
-    def assign_new_objective(self, possible_recipes):
-        """สุ่มเป้าหมายใหม่ให้ผู้เล่น"""
-        if not possible_recipes:
-            possible_recipes = list(RECIPES.keys())
-        objective_name = random.choice(possible_recipes)
-        self.objective = {'name': objective_name}
-
-class GameState:
-    """จัดการสถานะโดยรวมของเกมในห้องนั้นๆ เช่น ด่าน, คะแนน, เวลา"""
-    def __init__(self, player_sids, players_map, level=1):
-        self.is_active = True
-        self.level = level
-        self.score = 0
-        self.total_score = 0
-        self.target_score = LEVEL_DEFINITIONS[level]['target_score']
-        self.time_left = LEVEL_DEFINITIONS[level]['time']
-        self.player_order_sids = player_sids
-        self.players_map = players_map # {sid: Player object}
-        self.last_spawn_time = time.time()
-
-    def tick(self):
-        """อัปเดตสถานะเกมในแต่ละวินาที (ถูกเรียกโดย Master Game Loop)"""
-        if not self.is_active:
-            return
-        self.time_left -= 1
-
-    def check_ability_processing(self):
-        """ตรวจสอบการแปรรูปวัตถุดิบที่เสร็จสิ้น"""
-        finished_players = []
-        current_time = time.time()
-        for player in self.players_map.values():
-            if player.ability_processing and current_time >= player.ability_processing['end_time']:
-                finished_players.append(player)
-        return finished_players
-
-    def get_spawnable_ingredients(self):
-        """รวบรวมวัตถุดิบที่จำเป็นสำหรับผู้เล่นทุกคนเพื่อนำไปสุ่ม"""
-        required_pool = set()
-        for player in self.players_map.values():
-            if player.objective and player.objective.get('name') in RECIPES:
-                for ing in RECIPES[player.objective['name']]['ingredients']:
-                    base_ingredient = TRANSFORMED_TO_BASE_INGREDIENT.get(ing, ing)
-                    required_pool.add(base_ingredient)
-        
-        if not required_pool: # กรณีไม่มีเป้าหมาย ให้สุ่มจากวัตถุดิบพื้นฐานทั้งหมด
-            return [ing for ing in ALL_INGREDIENTS if ing not in TRANSFORMED_TO_BASE_INGREDIENT]
-            
-        return list(required_pool)
-
-class GameRoom:
-    """Class หลักในการจัดการห้องเกม 1 ห้อง"""
-    def __init__(self, room_id, host_sid, host_name):
-        self.id = room_id
-        self.host_sid = host_sid
-        self.players = {host_sid: Player(host_sid, host_name)}
-        self.game_state = None
-        self.lock = Lock() # ป้องกัน Race Condition เมื่อมีการเข้าถึงข้อมูลพร้อมกัน
-
-    def add_player(self, sid, name):
-        with self.lock:
-            if len(self.players) < 8:
-                self.players[sid] = Player(sid, name)
-                return True
-            return False
-
-    def remove_player(self, sid):
-        with self.lock:
-            if sid in self.players:
-                del self.players[sid]
-            if not self.players:
-                return 'delete_room' # สัญญาณให้ลบห้องนี้ทิ้ง
-            if sid == self.host_sid:
-                self.host_sid = list(self.players.keys())[0]
-            if self.game_state and self.game_state.is_active:
-                if sid in self.game_state.player_order_sids:
-                    self.game_state.player_order_sids.remove(sid)
-                if sid in self.game_state.players_map:
-                    del self.game_state.players_map[sid]
-                if len(self.game_state.player_order_sids) < 1:
-                    self.game_state.is_active = False
-                    return 'game_over_disconnect'
-        return 'ok'
-
-    def start_game(self):
-        with self.lock:
-            player_sids = list(self.players.keys())
-            random.shuffle(player_sids)
-            self.game_state = GameState(player_sids, self.players)
-            self._assign_abilities()
-            self._assign_all_objectives()
-            
-            # ส่งข้อมูลเริ่มต้นเกมให้ผู้เล่นทุกคน
-            ui_state = self.get_augmented_state_for_ui()
-            for i, sid in enumerate(player_sids):
-                left_sid = player_sids[i - 1]
-                right_sid = player_sids[(i + 1) % len(player_sids)]
-                emit('game_started', {
-                    'initial_state': ui_state,
-                    'your_sid': sid,
-                    'your_name': self.players[sid].name,
-                    'left_neighbor': self.players[left_sid].name,
-                    'right_neighbor': self.players[right_sid].name
-                }, room=sid)
-            print(f"เกมในห้อง {self.id} เริ่มขึ้นแล้ว!")
-
-    def _assign_abilities(self):
-        """สุ่มความสามารถให้ผู้เล่นในห้อง"""
-        abilities_pool = list(ABILITIES_CONFIG.keys())
-        random.shuffle(abilities_pool)
-        for i, player in enumerate(self.players.values()):
-            player.ability = abilities_pool[i] if i < len(abilities_pool) else None
-            player.ability_processing = None
-
-    def _assign_all_objectives(self):
-        """สุ่มเป้าหมายให้ผู้เล่นทุกคน"""
-        active_abilities = {p.ability for p in self.players.values() if p.ability}
-        possible_recipes = list(NORMAL_RECIPES_KEYS)
-        for ability in active_abilities:
-            possible_recipes.extend(ABILITY_TO_RECIPES.get(ability, []))
-        
-        for player in self.players.values():
-            player.assign_new_objective(possible_recipes)
-
-    def update(self):
-        """ฟังก์ชันที่ถูกเรียกโดย Master Game Loop ทุกๆ 1 วินาที"""
-        with self.lock:
-            if not self.game_state or not self.game_state.is_active:
-                return
-
-            self.game_state.tick()
-
-            # 1. ตรวจสอบการแปรรูปวัตถุดิบ
-            finished_players = self.game_state.check_ability_processing()
-            for player in finished_players:
-                output_item = player.ability_processing['output']
-                socketio.emit('receive_item', {'item': {'type': 'ingredient', 'name': output_item}}, room=player.sid)
-                player.ability_processing = None
-
-            # 2. สุ่มวัตถุดิบ
-            spawn_interval = LEVEL_DEFINITIONS[self.game_state.level]['spawn_interval']
-            if time.time() - self.game_state.last_spawn_time > spawn_interval:
-                spawnable_ings = self.game_state.get_spawnable_ingredients()
-                if spawnable_ings:
-                    for sid in self.game_state.player_order_sids:
-                        ingredient = random.choice(spawnable_ings)
-                        socketio.emit('receive_item', {'item': {'type': 'ingredient', 'name': ingredient}}, room=sid)
-                self.game_state.last_spawn_time = time.time()
-
-            # 3. ตรวจสอบเงื่อนไขจบเกม (หมดเวลา)
-            if self.game_state.time_left <= 0:
-                self.game_state.is_active = False
-                total_final_score = self.game_state.total_score + self.game_state.score
-                socketio.emit('game_over', {'total_score': total_final_score, 'message': 'หมดเวลา!'}, room=self.id)
-                self.game_state = None # รีเซ็ตสถานะเกม
-    
-    def get_lobby_info(self):
-        """สร้างข้อมูลสำหรับหน้า Lobby"""
-        return {
-            'players': [{'sid': p.sid, 'name': p.name} for p in self.players.values()],
-            'host_sid': self.host_sid,
-            'room_id': self.id
-        }
-
-    def get_augmented_state_for_ui(self):
-        """สร้างข้อมูลเกมทั้งหมดเพื่อส่งไปอัปเดตหน้า UI"""
-        if not self.game_state: return None
-        
-        # สร้างสำเนาข้อมูลพื้นฐาน
-        ui_state = {
-            'is_active': self.game_state.is_active,
-            'level': self.game_state.level,
-            'score': self.game_state.score,
-            'total_score': self.game_state.total_score,
-            'target_score': self.game_state.target_score,
-            'time_left': self.game_state.time_left,
-            'player_order_sids': self.game_state.player_order_sids,
-        }
-
-        # สร้างข้อมูลผู้เล่นและเป้าหมาย
-        ui_state['players_state'] = {
-            sid: {
-                'plate': p.plate,
-                'objective': p.objective,
-                'ability': p.ability,
-                'ability_processing': p.ability_processing
-            } for sid, p in self.players.items() if sid in self.game_state.players_map
-        }
-        
-        # สร้างข้อมูลเป้าหมายพร้อมคำใบ้
-        all_player_objectives = []
-        for player in self.game_state.players_map.values():
-            if player.objective and 'name' in player.objective:
-                recipe_details = RECIPES[player.objective['name']]
-                ingredients_with_hints = [
-                    {'name': ing, 'hint': TRANSFORMED_ING_INFO.get(ing), 'base': TRANSFORMED_TO_BASE_INGREDIENT.get(ing)}
-                    for ing in recipe_details['ingredients']
-                ]
-                all_player_objectives.append({
-                    'player_name': player.name,
-                    'objective_name': player.objective['name'],
-                    'ingredients': ingredients_with_hints,
-                    'points': recipe_details['points']
-                })
-        ui_state['all_player_objectives'] = all_player_objectives
-        return ui_state
-
-    def handle_player_action(self, sid, data):
-        """จัดการ Action ต่างๆ จากผู้เล่น"""
-        with self.lock:
-            player = self.players.get(sid)
-            if not player or not self.game_state or not self.game_state.is_active:
-                return
-
-            action_type = data.get('type')
-            
-            if action_type == 'pass_item':
-                item_data = data.get('item')
-                if item_data.get('type') == 'plate':
-                    emit('action_fail', {'message': 'ไม่สามารถส่งจานได้!', 'sound': 'error'}, room=sid)
-                    return
-                
-                player_sids = self.game_state.player_order_sids
-                if len(player_sids) <= 1: return
-
-                player_index = player_sids.index(sid)
-                direction = data.get('direction')
-                target_sid = player_sids[player_index - 1] if direction == 'left' else player_sids[(player_index + 1) % len(player_sids)]
-                socketio.emit('receive_item', {'item': item_data}, room=target_sid)
-
-            elif action_type == 'add_to_plate':
-                player.plate = data.get('new_plate_contents', [])
-
-            elif action_type == 'submit_order':
-                self._handle_submit_order(player)
-
-            # ส่ง state ล่าสุดให้ทุกคนหลัง action
-            ui_state = self.get_augmented_state_for_ui()
-            if ui_state:
-                socketio.emit('update_game_state', ui_state, room=self.id)
-
-    def _handle_submit_order(self, player):
-        """ตรรกะการส่งอาหาร"""
-        player_plate = sorted(player.plate)
-        objective_name = player.objective.get('name')
-        if not objective_name or objective_name not in RECIPES:
-            return
+# --- Adapter: ส่งข้อความของ engine ผ่าน Flask-SocketIO ---
+class SocketIOTransport(Transport):
+    """Transport ที่ส่งข้อความออกด้วย socketio.emit (ใช้ได้ทั้งใน handler และ background task)
+
+    ถ้า handler ตั้ง `pending_ack` ไว้ (action ที่ client แนบ seq มา) ข้อความแรกที่ส่งถึงผู้ส่ง action
+    (ส่งถึงตัวเขาเองหรือทั้งห้อง) จะถูกแนบ `ack` เพื่อให้ client วัด round-trip ได้ (ดู latency.py)"""
+    def __init__(self, socketio):
+        self.socketio = socketio
+        self._local = local() # เฉพาะของแต่ละ greenlet
+        self.offline_sids = () # sid ที่ไม่มี connection (บอทของเซิร์ฟเวอร์) ข้อความถึง sid เหล่านี้ถูกทิ้ง
 
-        required_ingredients = RECIPES[objective_name]['ingredients']
-        if player_plate == required_ingredients:
-            # ทำอาหารสำเร็จ
-            recipe_data = RECIPES[objective_name]
-            self.game_state.score += recipe_data['points']
-            self.game_state.time_left = min(self.game_state.time_left + recipe_data['time_bonus'], 999)
-            
-            player.plate = []
-            self._assign_all_objectives() # สุ่มเป้าหมายใหม่ให้ทุกคน
-            
-            emit('action_success', {'message': f'ทำ {objective_name} สำเร็จ! (+{recipe_data["points"]} คะแนน)', 'sound': 'success'}, room=player.sid)
-
-            # ตรวจสอบเงื่อนไขผ่านด่าน
-            if self.game_state.score >= self.game_state.target_score:
-                self._level_up()
-        else:
-            emit('action_fail', {'message': 'สูตรไม่ถูกต้อง! ลองอีกครั้ง', 'sound': 'error'}, room=player.sid)
-
-    def _level_up(self):
-        """ตรรกะการเลื่อนขึ้นด่านใหม่"""
-        current_level = self.game_state.level
-        self.game_state.total_score += self.game_state.score
-        next_level = current_level + 1
-
-        if next_level in LEVEL_DEFINITIONS:
-            # ไปด่านต่อไป
-            self.game_state.is_active = False # หยุดเกมชั่วคราว
-            socketio.emit('level_complete', {'level': current_level, 'level_score': self.game_state.score, 'total_score': self.game_state.total_score}, room=self.id)
-            socketio.sleep(5) # รอ 5 วินาที
-
-            # รีเซ็ตสำหรับด่านใหม่
-            player_sids = list(self.players.keys())
-            random.shuffle(player_sids)
-            self.game_state = GameState(player_sids, self.players, level=next_level)
-            self.game_state.total_score = self.game_state.total_score # ใช้ total_score เดิม
-            self._assign_abilities()
-            self._assign_all_objectives()
-            
-            socketio.emit('clear_all_items', {}, room=self.id)
-            socketio.emit('start_next_level', self.get_augmented_state_for_ui(), room=self.id)
-        else:
-            # ชนะเกม
-            self.game_state.is_active = False
-            socketio.emit('game_won', {'total_score': self.game_state.total_score}, room=self.id)
-            self.game_state = None
-
-    def use_ability(self, sid, item_name):
-        with self.lock:
-            player = self.players.get(sid)
-            if not player or not self.game_state or not self.game_state.is_active: return
-
-            if not player.ability or player.ability_processing:
-                emit('action_fail', {'message': 'ไม่สามารถใช้ความสามารถได้ในขณะนี้', 'sound': 'error'}, room=sid)
-                # [FIX] ส่งวัตถุดิบกลับคืนถ้าใช้ความสามารถไม่ได้
-                socketio.emit('receive_item', {'item': {'type': 'ingredient', 'name': item_name}}, room=sid)
-                return
-
-            ability_config = ABILITIES_CONFIG.get(player.ability)
-            if not ability_config or item_name not in ability_config['transformations']:
-                emit('action_fail', {'message': 'วัตถุดิบนี้ใช้กับความสามารถของคุณไม่ได้', 'sound': 'error'}, room=sid)
-                # [FIX] ส่งวัตถุดิบกลับคืนถ้าวัตถุดิบไม่ถูกต้อง
-                socketio.emit('receive_item', {'item': {'type': 'ingredient', 'name': item_name}}, room=sid)
-                return
-
-            output_item = ability_config['transformations'][item_name]
-            player.ability_processing = {'input': item_name, 'output': output_item, 'end_time': time.time() + 6}
-            
-            verb = ability_config['verb']
-            emit('action_success', {'message': f'กำลัง{verb}{item_name}...', 'sound': 'click'}, room=sid)
-            
-            ui_state = self.get_augmented_state_for_ui()
-            if ui_state:
-                socketio.emit('update_game_state', ui_state, room=self.id)
+    def set_pending_ack(self, sid, room_id, seq, started):
+        self._local.pending_ack = (sid, room_id, seq, started) if isinstance(seq, int) else None
 
+    def emit(self, event, data, to):
+        if to in self.offline_sids:
+            return
+        pending = getattr(self._local, 'pending_ack', None)
+        if pending is not None and (to == pending[0] or to == pending[1]):
+            self._local.pending_ack = None
+            data = dict(data, ack={'sid': pending[0], 'seq': pending[2],
+                                   'server_ms': round((time.perf_counter() - pending[3]) * 1000, 3)})
+        self.socketio.emit(event, data, room=to)
+
+transport = SocketIOTransport(socketio)
+
+# --- Journal (ไม่บังคับ): ตั้งค่า GAME_JOURNAL_DIR เพื่อบันทึกทุกคำสั่งของแต่ละห้องไว้เล่นซ้ำ ---
+journal_writer = JournalWriter(os.environ['GAME_JOURNAL_DIR']) if os.environ.get('GAME_JOURNAL_DIR') else None
+
+# --- Analytics (ไม่บังคับ): ตั้งค่า GAME_ANALYTICS_DIR แล้วสรุปผลด้วย `python -m tools.analytics_report` ---
+analytics = AnalyticsSink(os.environ['GAME_ANALYTICS_DIR']) if os.environ.get('GAME_ANALYTICS_DIR') else None
+
+
+# --- Metrics (ดู metrics.py) และ Middleware วัดผล handler (ดู instrumentation.py) ---
+LOOP_SECONDS = Histogram('game_loop_iteration_seconds', 'เวลาที่ใช้ใน 1 รอบของ Master Game Loop')
+LOOP_LATENESS = Histogram('game_loop_lateness_seconds', 'Master Game Loop เริ่มรอบช้ากว่ากำหนดเท่าไร')
+# --- Structured log: GAME_LOG_FILE='-' = เขียนออก stdout, event ที่เกิดถี่ถูกสุ่มเก็บบางส่วน ---
+event_log = StructuredLogger(
+    os.environ.get('GAME_LOG_FILE', os.path.join('logs', 'game.jsonl')),
+    sample_rates={'player_action': 0.01, 'use_ability': 0.05, 'tick': 0.001, 'bot_step': 0.001},
+)
+instrumentation = Instrumentation(socketio, logger=event_log)
+instrumentation.install()
+connected_sockets = 0
+latency_tracker = LatencyTracker()
+ops_board = OpsBoard() # สรุปของแต่ละห้องสำหรับหน้า /admin (ดู ops.py)
+loop_stats = {'iteration_ms': 0.0, 'lateness_ms': 0.0, 'rooms_updated': 0, 'tick': 0}
+BROADCASTS_SKIPPED = Counter('game_broadcasts_skipped_total', 'จำนวนครั้งที่ข้ามการส่ง state ของห้องที่ไม่มีความเคลื่อนไหวเพราะเซิร์ฟเวอร์ทำงานหนัก')
+ROOMS_REJECTED = Counter('game_rooms_rejected_total', 'จำนวนคำขอสร้างห้องที่ถูกปฏิเสธเพราะเซิร์ฟเวอร์ทำงานหนัก')
+
+# --- Load Shedding (ดู overload.py) ---
+def _overload_changed(previous, level, load):
+    event_log.log('overload_level', previous=previous, level=level, name=overload.level_name, load=round(load, 3))
+
+overload = OverloadController(on_change=_overload_changed)
+
+# วินาทีที่รอ ack_items ก่อนส่งวัตถุดิบซ้ำ (0 = ปิดการส่งซ้ำ)
+ITEM_RETRANSMIT_SECONDS = float(os.environ.get('GAME_ITEM_RETRANSMIT_SECONDS', '3')) or None
+
+# วินาทีที่ถือที่นั่งของผู้เล่นที่หลุดการเชื่อมต่อไว้ (0 = นำออกจากห้องทันทีเหมือนเดิม)
+sessions = SessionRegistry(grace_seconds=float(os.environ.get('GAME_RESUME_GRACE_SECONDS', '30')))
+Gauge('game_session_seats_held', 'จำนวนที่นั่งที่รอผู้เล่นที่หลุดการเชื่อมต่อกลับมา', lambda: len(sessions))
+
+# --- ตารางคะแนนสูงสุด (ดู leaderboard.py): GAME_LEADERBOARD_DB='' = ปิด ---
+LEADERBOARD_DB = os.environ.get('GAME_LEADERBOARD_DB', os.path.join('data', 'leaderboard.sqlite3'))
+leaderboard = Leaderboard(LEADERBOARD_DB, levels=sorted(LEVEL_DEFINITIONS)) if LEADERBOARD_DB else None
+if leaderboard:
+    Gauge('game_leaderboard_pending_results', 'จำนวนผลการเล่นที่รอเขียนลงฐานข้อมูล', leaderboard.pending)
+
+def _record_result(room, outcome, level, total_score):
+    """GameRoom.on_finish: ส่งผลของเกมที่จบแล้วเข้าคิวของ leaderboard"""
+    leaderboard.record(room.id, outcome, level, total_score, [player.name for player in room.players.values()])
+    event_log.log('game_finished', room=room.id, outcome=outcome, level=level, total_score=total_score)
+
+# --- บอทของเซิร์ฟเวอร์ (ดู bots.py): GAME_BOT_THINK_SECONDS = ช่วงเวลาเฉลี่ยระหว่าง action ของบอทแต่ละตัว ---
+bot_scheduler = BotScheduler(think_seconds=float(os.environ.get('GAME_BOT_THINK_SECONDS', '1')), track=instrumentation.track)
+transport.offline_sids = bot_scheduler.bots
+Gauge('game_bots', 'จำนวนบอทของเซิร์ฟเวอร์ที่นั่งอยู่ในห้อง', lambda: len(bot_scheduler))
+BOT_NAMES = ['บอทเชฟ', 'บอทพ่อครัว', 'บอทแม่ครัว', 'บอทผู้ช่วย', 'บอทเด็กล้างจาน', 'บอทคนหั่นผัก', 'บอทคนทอด']
+
+# --- หน้าค้นหาห้อง: GAME_ROOM_BROWSER_PUSH_SECONDS = ส่งรายการใหม่ให้คนที่เปิดหน้านี้อยู่ได้ไม่เกิน 1 ครั้งต่อกี่วินาที ---
+room_browser = RoomBrowser(push_interval=float(os.environ.get('GAME_ROOM_BROWSER_PUSH_SECONDS', '1')))
+Gauge('game_public_rooms', 'จำนวนห้องสาธารณะที่เข้าร่วมได้', lambda: len(room_browser))
+Gauge('game_room_browser_watchers', 'จำนวน client ที่เปิดหน้าค้นหาห้องอยู่', lambda: len(room_browser.watchers))
+
+# --- Snapshot ห้องทั้งหมดตอน deploy (ไม่บังคับ): ตั้งค่า GAME_SNAPSHOT_FILE เพื่อบันทึกเมื่อได้ SIGTERM และกู้คืนตอนเริ่ม ---
+SNAPSHOT_FILE = os.environ.get('GAME_SNAPSHOT_FILE')
+shutdown_requested = Event() # ตั้งโดย SIGTERM: master loop หยุดแล้วเป็นผู้บันทึกและปิดเซิร์ฟเวอร์ (ดู _shutdown)
+# เวลาที่รอผู้เล่นกลับเข้าห้องที่กู้คืน (รวมเวลาที่ client ใช้เชื่อมต่อใหม่หลังเซิร์ฟเวอร์กลับมา)
+RESTORE_GRACE_SECONDS = float(os.environ.get('GAME_RESTORE_GRACE_SECONDS', '60'))
+
+# --- Rate limit ต่อ connection (ดู ratelimit.py): ตั้งค่าเป็น "rate,burst" เช่น GAME_RATE_PLAYER_ACTION=10,20 ---
+rate_limiter = RateLimiter(
+    {
+        'player_action': parse_limit(os.environ.get('GAME_RATE_PLAYER_ACTION'), (10.0, 20)),
+        'use_ability': parse_limit(os.environ.get('GAME_RATE_USE_ABILITY'), (3.0, 6)),
+        'ack_items': parse_limit(os.environ.get('GAME_RATE_ACK_ITEMS'), (5.0, 10)),
+        'resume': parse_limit(os.environ.get('GAME_RATE_RESUME'), (1.0, 3)),
+        'list_rooms': parse_limit(os.environ.get('GAME_RATE_LIST_ROOMS'), (2.0, 10)),
+        'add_bot': parse_limit(os.environ.get('GAME_RATE_BOTS'), (2.0, 8)),
+        'remove_bot': parse_limit(os.environ.get('GAME_RATE_BOTS'), (2.0, 8)),
+    },
+    abuse_drops=int(os.environ.get('GAME_RATE_ABUSE_DROPS', '100')),
+    abuse_window=float(os.environ.get('GAME_RATE_ABUSE_WINDOW', '10')),
+)
+
+def _rate_limited(event):
+    """True = ทิ้งข้อความนี้ (เรียกก่อนแตะ lock ใดๆ) และตัดการเชื่อมต่อถ้าส่งเกินอัตราต่อเนื่อง"""
+    verdict = rate_limiter.check(request.sid, event)
+    if verdict == DISCONNECT:
+        event_log.log('abuse_disconnect', sid=request.sid, message=event)
+        disconnect()
+    return verdict in (DROP, DISCONNECT)
+
+def guarded(event):
+    """guard ของ instrumentation.on: ตรวจ rate limit และ payload (ดู validation.py) ก่อนเริ่มวัดผลหรือแตะ lock ใดๆ
+    คืน payload ที่ผ่านการตรวจ หรือ None ถ้าต้องทิ้งข้อความ"""
+    if event not in SCHEMAS:
+        raise KeyError(f'ไม่มี schema ของ event {event!r} (ดู validation.SCHEMAS)')
+    def guard(data):
+        if _rate_limited(event): return None
+        return validate(event, data)
+    return guard
+
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') # ไม่ได้ตั้งค่า = ปิด endpoint ของผู้ดูแลทั้งหมด
+
+def _active_handler(frame):
+    context = context_from_stack(frame)
+    return {'event': context.event, 'room': context.room} if context else None
+
+# --- ตรวจจับการ block ของ hub (ดู hub_watchdog.py) ---
+watchdog = BlockingWatchdog(
+    threshold=float(os.environ.get('GAME_WATCHDOG_THRESHOLD_MS', '100')) / 1000,
+    log_path=os.environ.get('GAME_WATCHDOG_LOG', os.path.join('logs', 'blocking.log')),
+    context=_active_handler,
+)
+# hub ของ eventlet ทำงานบน main thread จึงใช้ id ของ thread ที่ import โมดูลนี้
+profiler = SamplingProfiler(eventlet.patcher.original('_thread').get_ident())
 
 # --- Global State & Master Loop ---
 rooms = {} # {'room_id': GameRoom object}
-rooms_lock = Lock()
+rooms_lock = TimedLock(Lock(), LOCK_WAIT_SECONDS, ('rooms',), instrumentation.lock_waited)
+
+Gauge('game_connected_sockets', 'จำนวน Socket ที่เชื่อมต่ออยู่', lambda: connected_sockets)
+Gauge('game_rooms', 'จำนวนห้องแยกตามสถานะ', ops_board.phase_gauge, ['state'])
+Gauge('game_degradation_level', 'ระดับการลดงานปัจจุบัน (0 = ปกติ, 3 = ไม่รับห้องใหม่)', lambda: overload.level)
+Gauge('game_overload_load_ratio', 'ค่าเฉลี่ยของ (เวลาใน loop + ความช้า) ต่องบ 1 วินาที', lambda: round(overload.load, 4))
+
+def _room_of(sid):
+    """ห้องที่ผู้เล่น `sid` อยู่ (วนหาทุกห้อง ใช้กับเหตุการณ์ที่เกิดไม่บ่อยเท่านั้น)"""
+    with rooms_lock:
+        for room in rooms.values():
+            if sid in room.players:
+                return room
+    return None
+
+# --- คิวขาออกต่อ client (ดู outbound.py) ---
+def _resync_client(eio_sid):
+    """client ค้างข้อความมากเกินไป: ส่งสถานะล่าสุดครั้งเดียวแทนข้อความที่ถูกทิ้ง"""
+    sid = socketio.server.manager.sid_from_eio_sid(eio_sid, '/')
+    room = _room_of(sid) if sid else None
+    event_log.log('outbound_resync', sid=sid, room=room.id if room else None)
+    if room:
+        socketio.emit('resync', room.get_resync_state(sid), to=sid)
+
+def _disconnect_slow_client(eio_sid):
+    event_log.log('slow_client_disconnect', sid=socketio.server.manager.sid_from_eio_sid(eio_sid, '/'))
+    socketio.server.eio.disconnect(eio_sid)
+
+outbound = OutboundQueues(
+    high_water=int(os.environ.get('GAME_OUTBOUND_HIGH_WATER', '32')),
+    max_backlog=int(os.environ.get('GAME_OUTBOUND_MAX_BACKLOG', '256')),
+    disconnect_after=float(os.environ.get('GAME_OUTBOUND_DISCONNECT_AFTER', '30')),
+)
+outbound.install(socketio.server.eio, _resync_client, _disconnect_slow_client)
+Gauge('game_outbound_backlogged_clients', 'จำนวน client ที่มีข้อความพักอยู่ใน backlog', lambda: outbound.stats()[0])
+Gauge('game_outbound_backlog_messages', 'จำนวนข้อความใน backlog ของทุก client', lambda: outbound.stats()[1])
+Gauge('game_outbound_queue_depth_max', 'ความยาว queue ของ engine.io ที่ยาวที่สุดในบรรดา client ทั้งหมด',
+      lambda: max((socket.queue.qsize() for socket in list(socketio.server.eio.sockets.values())), default=0))
+
+def update_active_rooms():
+    """อัปเดตทุกห้องที่กำลังเล่นอยู่ 1 รอบ คืนค่าจำนวนห้องที่ถูกอัปเดต"""
+    with rooms_lock:
+        # สร้าง List ของห้องที่ต้องอัปเดตเพื่อไม่ให้ blockนาน
+        active_rooms = [room for room in rooms.values() if room.needs_update]
+
+    tick = loop_stats['tick'] = loop_stats['tick'] + 1
+    spawn_batch = overload.spawn_batch
+    for room in active_rooms:
+        tracked = instrumentation.track('tick', room.id)
+        with tracked:
+            room.spawn_batch = spawn_batch
+            room.update() # เรียกใช้ method update ของแต่ละห้อง
+            # ส่งข้อมูลอัปเดตให้ผู้เล่นในห้องนั้นๆ ทุกวินาที (ห้องที่ไม่มีความเคลื่อนไหวอาจถูกลดความถี่เมื่อเซิร์ฟเวอร์ทำงานหนัก)
+            if overload.should_broadcast(room, tick):
+                room.broadcast_state()
+            else:
+                BROADCASTS_SKIPPED.inc()
+        ops_board.record_tick(room.id, tracked.elapsed)
+        _room_changed(room)
+    return len(active_rooms)
+
+def release_expired_seats():
+    """นำผู้เล่นที่ไม่กลับมาภายในเวลาผ่อนผันออกจากห้อง"""
+    for room_id, sid in sessions.expired():
+        with rooms_lock:
+            room = rooms.get(room_id)
+        if room and sid in room.players:
+            _remove_player(room, sid, reason='grace_expired')
 
 def master_game_loop():
     """
     Master Loop ที่ทำงานเบื้องหลังเพียง Loop เดียว
     เพื่ออัปเดตสถานะของทุกห้องที่กำลังเล่นอยู่พร้อมกัน
     """
-    while True:
-        with rooms_lock:
-            # สร้าง List ของห้องที่ต้องอัปเดตเพื่อไม่ให้ blockนาน
-            active_rooms = [room for room in rooms.values() if room.game_state and room.game_state.is_active]
-
-        if not active_rooms:
-            socketio.sleep(1) # ถ้าไม่มีห้องเล่นอยู่ ก็พัก 1 วิ
-            continue
-
-        for room in active_rooms:
-            room.update() # เรียกใช้ method update ของแต่ละห้อง
-            # ส่งข้อมูลอัปเดตให้ผู้เล่นในห้องนั้นๆ ทุกวินาที
-            ui_state = room.get_augmented_state_for_ui()
-            if ui_state:
-                socketio.emit('update_game_state', ui_state, room=room.id)
-        
-        # หลังจาก update ทุกห้องเสร็จแล้ว ค่อย sleep
-        # เพื่อให้การ update เกิดขึ้นใกล้เคียงกันทุก 1 วินาที
-        socketio.sleep(1)
+    next_tick = time.monotonic()
+    while not shutdown_requested.is_set():
+        started = time.monotonic()
+        lateness = max(0.0, started - next_tick)
+        LOOP_LATENESS.observe(lateness)
+        updated = update_active_rooms()
+        release_expired_seats()
+        finished = time.monotonic()
+        LOOP_SECONDS.observe(finished - started)
+        overload.observe(finished - started, lateness)
+        loop_stats.update(iteration_ms=(finished - started) * 1000, lateness_ms=lateness * 1000, rooms_updated=updated)
+        # ตั้งเวลารอบถัดไปให้ตรงทุก 1 วินาที (ถ้าช้าจนเลยไปแล้ว ข้ามรอบที่พลาดไปแทนการเร่งทำย้อนหลัง)
+        next_tick = max(next_tick + 1, finished)
+        socketio.sleep(next_tick - finished)
+    _save_and_exit()
 
 
 # --- SocketIO Event Handlers ---
@@ -432,73 +289,306 @@ def master_game_loop():
 def index():
     return render_template('index.html')
 
-@socketio.on('connect')
+@app.route('/leaderboard')
+def leaderboard_view():
+    """คะแนนสูงสุด: ?level=<ด่านที่ไปถึง, 0 = ทุกด่าน>&window=all|week|day (อ่านจากหน่วยความจำ ไม่แตะฐานข้อมูล)"""
+    level = request.args.get('level', 0, type=int)
+    window = request.args.get('window', 'all')
+    if not leaderboard or window not in WINDOWS:
+        abort(404)
+    entries = [{'score': entry['score'], 'level': entry['level'], 'outcome': entry['outcome'],
+                'players': entry['players'], 'finished_at': entry['finished_at']}
+               for entry in leaderboard.top(level, window)]
+    response = jsonify({'level': level, 'window': window, 'entries': entries})
+    response.headers['Cache-Control'] = 'public, max-age=5'
+    return response
+
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+def admin_only(view):
+    """ต้องส่ง ADMIN_TOKEN มาทาง header `X-Admin-Token` หรือ query `?token=`"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = request.headers.get('X-Admin-Token') or request.args.get('token', '')
+        if not ADMIN_TOKEN:
+            abort(404)
+        if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
+
+# --- Operations Console: ข้อมูลมาจาก ops_board, instrumentation และ loop_stats ที่ถูกอัปเดตไว้แล้ว ---
+OPS_MAX_STREAMS = 5
+OPS_TOP_ROOMS = 20
+ops_streams = 0
+_ops_cache = {'at': 0.0, 'data': None}
+
+def _outbound_depth(sid):
+    """จำนวนข้อความที่ค้างอยู่ในคิวขาออกของ engine.io สำหรับผู้เล่นคนนี้"""
+    eio_sid = socketio.server.manager.eio_sid_from_sid(sid, '/')
+    return outbound.pending(eio_sid) if eio_sid else None
+
+def _ops_overview():
+    """ภาพรวมของเซิร์ฟเวอร์ สร้างใหม่ไม่เกินวินาทีละครั้งแล้วใช้ร่วมกันทุก stream"""
+    now = time.monotonic()
+    if _ops_cache['data'] is None or now - _ops_cache['at'] >= 1:
+        window = 10
+        report = instrumentation.window.report(window)
+        top_rooms = ops_board.top_rooms(OPS_TOP_ROOMS)
+        for summary in top_rooms:
+            room = rooms.get(summary['room_id'])
+            summary['outbound_queue'] = sum(_outbound_depth(sid) or 0 for sid in list(room.players)) if room else 0
+        _ops_cache.update(at=now, data={
+            'time': time.time(),
+            'connected_sockets': connected_sockets,
+            'rooms': len(ops_board.rooms),
+            'rooms_by_phase': dict(ops_board.phase_counts),
+            'loop': dict(loop_stats),
+            'degradation': {'level': overload.level, 'name': overload.level_name, 'load': round(overload.load, 3)},
+            'events': [{
+                'event': h['event'],
+                'in_per_second': round(h['messages_in'] / window, 2),
+                'out_per_second': round(h['messages_out'] / window, 2),
+                'bytes_out_per_second': round(h['bytes_out'] / window, 1),
+                'p99_ms': h['p99_ms'],
+            } for h in report['handlers']],
+            'top_rooms': top_rooms,
+        })
+    return _ops_cache['data']
+
+def _ops_room(room_id):
+    """รายละเอียดของห้องเดียว (drill-down)"""
+    room = rooms.get(room_id)
+    summary = ops_board.rooms.get(room_id)
+    if not room or not summary:
+        return None
+    detail = summary.as_dict()
+    detail['host_sid'] = room.host_sid
+    detail['player_list'] = [{
+        'sid': sid,
+        'name': player.name,
+        'ability': player.ability,
+        'objective': (player.objective or {}).get('name'),
+        'plate': list(player.plate),
+        'outbound_queue': _outbound_depth(sid),
+    } for sid, player in list(room.players.items())]
+    detail['latency'] = latency_tracker.room_summary(room_id)
+    return detail
+
+@app.route('/admin')
+@admin_only
+def ops_console():
+    return render_template('admin.html')
+
+@app.route('/admin/stream')
+@admin_only
+def ops_stream():
+    """Server-Sent Events ของภาพรวม (และห้องที่เลือกด้วย ?room=) ทุก `interval` วินาที (1-10)"""
+    global ops_streams
+    if ops_streams >= OPS_MAX_STREAMS:
+        return jsonify({'error': 'มีหน้า console เปิดอยู่มากเกินไป'}), 429
+    interval = min(max(request.args.get('interval', 2, type=float), 1), 10)
+    room_id = request.args.get('room', '').upper() or None
+
+    def generate():
+        global ops_streams
+        ops_streams += 1
+        try:
+            while True:
+                payload = {'overview': _ops_overview(), 'room': _ops_room(room_id) if room_id else None}
+                yield f'data: {json.dumps(payload, ensure_ascii=False)}\n\n'
+                socketio.sleep(interval)
+        finally:
+            ops_streams -= 1
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/admin/slowest-handlers')
+@admin_only
+def slowest_handlers():
+    """handler ที่ช้าที่สุด (เรียงตาม p99) ใน `window` วินาทีล่าสุด เช่น /admin/slowest-handlers?k=5&window=60"""
+    k = request.args.get('k', 10, type=int)
+    window = request.args.get('window', 60, type=int)
+    return jsonify(instrumentation.window.report(window, k))
+
+@app.route('/admin/latency')
+@admin_only
+def client_latency():
+    """percentile ของ round-trip ที่ผู้เล่นพบจริงแยกตามห้อง (?room=ABCD เฉพาะห้อง หรือ ?k=20 ห้องที่แย่ที่สุด)"""
+    return jsonify(latency_tracker.report(request.args.get('room'), request.args.get('k', 20, type=int)))
+
+@app.route('/admin/blocking')
+@admin_only
+def blocking_events():
+    """เหตุการณ์ล่าสุดที่มี greenlet ยึด hub นานเกิน threshold พร้อม stack และ handler/ห้องที่กำลังทำงาน"""
+    return jsonify(watchdog.report())
+
+@app.route('/admin/profile')
+@admin_only
+def profile_hub():
+    """สุ่มอ่าน stack ของ hub เป็นเวลา `seconds` วินาที ที่ `hz` ครั้ง/วินาที แล้วคืนผลแบบ collapsed stack
+    เช่น curl -H 'X-Admin-Token: ...' '/admin/profile?seconds=10&hz=200' > out.folded"""
+    profile = profiler.start(request.args.get('seconds', 10, type=float), request.args.get('hz', 100, type=int))
+    if profile is None:
+        return jsonify({'error': 'มีการ profile ที่ยังไม่จบอยู่'}), 409
+    while not profile.done:
+        socketio.sleep(0.1) # รอแบบ greenlet ไม่ block hub ที่กำลังถูก profile
+    return Response(profile.collapsed(), mimetype='text/plain; charset=utf-8',
+                    headers={'X-Profile-Samples': str(profile.samples)})
+
+@instrumentation.on('connect')
 def handle_connect():
-    print(f"ผู้เล่นเชื่อมต่อเข้ามา: {request.sid}")
+    global connected_sockets
+    connected_sockets += 1
 
-@socketio.on('disconnect')
+@instrumentation.on('disconnect')
 def handle_disconnect():
-    print(f"ผู้เล่นตัดการเชื่อมต่อ: {request.sid}")
-    room_to_update = None
-    with rooms_lock:
-        for room in rooms.values():
-            if request.sid in room.players:
-                room_to_update = room
-                break
-    
-    if not room_to_update: return
+    global connected_sockets
+    connected_sockets -= 1
+    rate_limiter.forget(request.sid)
+    room_browser.unwatch(request.sid)
+    room_to_update = _room_of(request.sid)
+    if not room_to_update:
+        sessions.forget(request.sid)
+        return
+    instrumentation.set_room(room_to_update.id)
+    if room_to_update.lock.locked():
+        # engine.io ตัด client ที่หมดเวลา ping ได้ระหว่าง emit จึงอาจถูกเรียกซ้อนใน greenlet ที่ถือ lock ของห้องนี้อยู่
+        # (Master Game Loop หรือบอท) ต้องทำต่อใน greenlet ใหม่ ไม่งั้นจะรอ lock ที่ตัวเองถือไว้ตลอดไป
+        socketio.start_background_task(_player_disconnected, room_to_update, request.sid)
+        return
+    _player_disconnected(room_to_update, request.sid)
 
-    player_name = room_to_update.players.get(request.sid, Player(None, 'Unknown')).name
-    result = room_to_update.remove_player(request.sid)
-    print(f"ผู้เล่น {player_name} ออกจากห้อง {room_to_update.id}")
+def _player_disconnected(room_to_update, sid):
+    """เก็บที่นั่งไว้ให้กลับมาด้วย resume token ถ้าทำได้ ไม่งั้นนำผู้เล่นออกจากห้อง"""
+    if sessions.suspend(sid) and room_to_update.suspend_player(sid):
+        _room_changed(room_to_update)
+        event_log.log('player_away', sid=sid, room=room_to_update.id)
+        return
+    _remove_player(room_to_update, sid, reason='disconnect')
+
+def _room_changed(room):
+    """ห้องเปลี่ยนสถานะ: อัปเดตสรุปของหน้า /admin และรายการห้องสาธารณะ"""
+    ops_board.update(room)
+    room_browser.update(room)
+
+def _remove_player(room_to_update, sid, reason):
+    """นำผู้เล่นออกจากห้องและแจ้งคนที่เหลือ (ลบห้องทิ้งถ้าไม่เหลือใคร หรือเหลือแต่บอท)"""
+    sessions.forget(sid)
+    bot_scheduler.remove(sid)
+    player = room_to_update.players.get(sid)
+    player_name = player.name if player else 'Unknown'
+    result = room_to_update.handle_player_left(sid)
+    _room_changed(room_to_update)
+    event_log.log('player_left', sid=sid, room=room_to_update.id, name=player_name, result=result, reason=reason)
 
     if result == 'delete_room':
         with rooms_lock:
             if room_to_update.id in rooms:
                 del rooms[room_to_update.id]
-            print(f"ห้อง {room_to_update.id} ว่างเปล่า, ทำการลบห้อง")
-        return
-    
-    if result == 'game_over_disconnect':
-        total_final_score = room_to_update.game_state.total_score + room_to_update.game_state.score if room_to_update.game_state else 0
-        socketio.emit('game_over', {'total_score': total_final_score, 'message': 'ผู้เล่นไม่พอที่จะเล่นต่อ เกมจบลง'}, room=room_to_update.id)
-        room_to_update.game_state = None
-
-    # อัปเดตข้อมูล Lobby และเพื่อนบ้าน
-    socketio.emit('update_lobby', room_to_update.get_lobby_info(), room=room_to_update.id)
-    if room_to_update.host_sid == request.sid: # ถ้า host เดิมออก
-        socketio.emit('new_host', {'host_sid': room_to_update.host_sid}, room=room_to_update.id)
-
-    if room_to_update.game_state and room_to_update.game_state.is_active:
-        player_sids = room_to_update.game_state.player_order_sids
-        for i, sid in enumerate(player_sids):
-            left_sid = player_sids[i - 1]
-            right_sid = player_sids[(i + 1) % len(player_sids)]
-            socketio.emit('update_neighbors', {
-                'left_neighbor': room_to_update.players[left_sid].name,
-                'right_neighbor': room_to_update.players[right_sid].name
-            }, room=sid)
-        ui_state = room_to_update.get_augmented_state_for_ui()
-        if ui_state:
-            socketio.emit('update_game_state', ui_state, room=room_to_update.id)
-
-@socketio.on('create_room')
+            if journal_writer:
+                journal_writer.close(room_to_update)
+            latency_tracker.forget(room_to_update.id)
+            ops_board.remove(room_to_update.id)
+            room_browser.remove(room_to_update.id)
+            event_log.log('room_deleted', room=room_to_update.id)
+    elif all(player.bot for player in room_to_update.players.values()):
+        for bot_sid in list(room_to_update.players):
+            _remove_player(room_to_update, bot_sid, reason='no_humans')
+
+@instrumentation.on('create_room', guard=guarded('create_room'))
 def handle_create_room(data):
+    if not overload.accepting_rooms:
+        ROOMS_REJECTED.inc()
+        emit('error_message', {'message': 'เซิร์ฟเวอร์กำลังทำงานหนัก กรุณาลองสร้างห้องใหม่อีกครั้งในภายหลัง'})
+        return
     player_name = data.get('name', 'ผู้เล่นนิรนาม')
     while True:
         room_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
         if room_id not in rooms:
             break
     
-    room = GameRoom(room_id, request.sid, player_name)
-    with rooms_lock:
-        rooms[room_id] = room
+    room = GameRoom(room_id, request.sid, player_name, transport)
+    room.public = data.get('public', False)
+    room_browser.unwatch(request.sid)
+    instrumentation.set_room(room_id)
+    if journal_writer:
+        journal_writer.open(room)
+    _adopt_room(room)
     
     join_room(room_id)
-    emit('room_created', {'room_id': room_id, 'is_host': True})
+    emit('room_created', {'room_id': room_id, 'is_host': True, 'resume_token': sessions.issue(request.sid, room_id)})
     socketio.emit('update_lobby', room.get_lobby_info(), room=room_id)
 
-@socketio.on('join_room')
+def _adopt_room(room):
+    """ตั้งค่าของเซิร์ฟเวอร์ให้ห้อง (ใหม่หรือที่กู้คืนมา) แล้วเพิ่มเข้า `rooms`"""
+    room.retransmit_after = ITEM_RETRANSMIT_SECONDS
+    room.analytics = analytics
+    if leaderboard:
+        room.on_finish = _record_result
+    room.lock = TimedLock(room.lock, LOCK_WAIT_SECONDS, ('room',), instrumentation.lock_waited)
+    with rooms_lock:
+        rooms[room.id] = room
+    _room_changed(room)
+
+def save_rooms():
+    """บันทึกทุกห้องและ resume token ลง SNAPSHOT_FILE (เรียกตอนปิดเซิร์ฟเวอร์ หลัง master loop และบอทหยุดแล้ว)"""
+    started = time.perf_counter()
+    with rooms_lock:
+        all_rooms = list(rooms.values())
+    count = snapshot.save(SNAPSHOT_FILE, all_rooms, sessions.export(), time.time())
+    event_log.log('rooms_saved', rooms=count, duration_ms=round((time.perf_counter() - started) * 1000, 1))
+
+def restore_rooms():
+    """กู้คืนห้องจาก SNAPSHOT_FILE: ผู้เล่นทุกคนอยู่ในสถานะหลุด และกลับเข้าที่นั่งเดิมได้ด้วย resume token"""
+    started = time.perf_counter()
+    now = time.time()
+    try:
+        restored, saved_sessions = snapshot.load(SNAPSHOT_FILE, transport, time.time, now)
+    except (ValueError, KeyError, TypeError, IndexError) as e:
+        # ไฟล์ต่างเวอร์ชันหรือเสีย: เริ่มแบบไม่มีห้อง และเก็บไฟล์ไว้ตรวจสอบ (เซิร์ฟเวอร์ต้องเริ่มได้เสมอ)
+        os.replace(SNAPSHOT_FILE, SNAPSHOT_FILE + '.rejected')
+        event_log.log('rooms_restore_failed', error=f'{type(e).__name__}: {e}')
+        return
+    if not restored:
+        return
+    for room in restored:
+        for player in room.players.values():
+            if player.bot:
+                bot_scheduler.add(room, player.sid)
+            else:
+                player.away_since = now
+        _adopt_room(room)
+    entries = [entry for entry in saved_sessions if entry[1] in rooms and entry[2] in rooms[entry[1]].players]
+    covered = {sid for _, _, sid in entries}
+    # ผู้เล่นที่ไม่มี token (ไม่ควรเกิด) ได้ token ใหม่ที่ไม่มีใครรู้ เพื่อให้ถูกนำออกเมื่อหมดเวลาผ่อนผันเหมือนคนอื่น
+    entries += [[secrets.token_urlsafe(16), room.id, player.sid] for room in restored for player in room.players.values()
+                if not player.bot and player.sid not in covered]
+    sessions.restore(entries, RESTORE_GRACE_SECONDS)
+    os.replace(SNAPSHOT_FILE, SNAPSHOT_FILE + '.restored') # ไม่กู้คืนห้องเดิมซ้ำถ้าเซิร์ฟเวอร์เริ่มใหม่อีกครั้ง
+    event_log.log('rooms_restored', rooms=len(restored), players=len(entries),
+                  duration_ms=round((time.perf_counter() - started) * 1000, 1))
+
+def _shutdown(signum, frame):
+    """SIGTERM: ขอให้ master loop หยุด (signal handler อาจแทรกกลางคำสั่งที่ถือ lock อยู่ จึงไม่บันทึกที่นี่)"""
+    shutdown_requested.set()
+
+def _save_and_exit():
+    """เรียกจาก master loop หลังหยุดแล้ว: หยุดบอท บันทึกห้องทั้งหมด (ถ้าเปิดไว้) แล้วปิดเซิร์ฟเวอร์"""
+    bot_scheduler.stopped = True
+    if SNAPSHOT_FILE:
+        save_rooms()
+    if journal_writer:
+        journal_writer.flush()
+    if leaderboard:
+        leaderboard.flush()
+    if analytics:
+        analytics.close()
+    event_log.flush()
+    raise SystemExit(0)
+
+@instrumentation.on('join_room', guard=guarded('join_room'))
 def handle_join_room(data):
     player_name = data.get('name', 'ผู้เล่นนิรนาม')
     room_id = data.get('room_id', '').upper()
@@ -509,19 +599,59 @@ def handle_join_room(data):
     if not room:
         emit('error_message', {'message': 'ไม่พบห้องนี้!'})
         return
-    if room.game_state and room.game_state.is_active:
+    if room.phase != 'lobby': # กำลังเล่น หรือพักระหว่างด่าน
         emit('error_message', {'message': 'เกมในห้องนี้เริ่มไปแล้ว!'})
         return
     
+    if len(room.players) >= MAX_PLAYERS:
+        # ห้องเต็ม: ให้ผู้เล่นจริงนั่งแทนบอทตัวล่าสุด (ถ้ามี)
+        bot_sid = next((sid for sid in reversed(list(room.players)) if room.players[sid].bot), None)
+        if bot_sid:
+            _remove_player(room, bot_sid, reason='replaced')
     if not room.add_player(request.sid, player_name):
         emit('error_message', {'message': 'ห้องเต็มแล้ว!'})
         return
 
+    _room_changed(room)
+    room_browser.unwatch(request.sid)
     join_room(room_id)
-    emit('join_success', {'room_id': room_id, 'is_host': request.sid == room.host_sid})
+    emit('join_success', {'room_id': room_id, 'is_host': request.sid == room.host_sid,
+                          'resume_token': sessions.issue(request.sid, room_id)})
     socketio.emit('update_lobby', room.get_lobby_info(), room=room_id)
 
-@socketio.on('start_game')
+@instrumentation.on('resume', guard=guarded('resume'))
+def handle_resume(data):
+    """client ที่เชื่อมต่อใหม่ขอที่นั่งเดิมคืนด้วย resume token แล้วได้ snapshot เดียวแทนการสร้างห้องใหม่"""
+    session = sessions.resume(data.get('token'), request.sid)
+    with rooms_lock:
+        room = rooms.get(session[0]) if session else None
+    resume_state = room.resume_player(session[1], request.sid) if room else None
+    if resume_state is None:
+        sessions.forget(request.sid)
+        emit('resume_failed', {})
+        return
+    old_sid = session[1]
+    instrumentation.set_room(room.id)
+    join_room(room.id)
+    _room_changed(room)
+    event_log.log('player_resumed', sid=request.sid, old_sid=old_sid, room=room.id)
+    emit('resume_success', resume_state)
+    if old_sid == request.sid: # ส่ง resume ซ้ำบน connection เดิม: ไม่มี connection เก่าให้ตัด
+        return
+    rate_limiter.forget(old_sid)
+    if socketio.server.manager.is_connected(old_sid, '/'):
+        disconnect(old_sid) # connection เดิมที่เซิร์ฟเวอร์ยังไม่รู้ว่าหลุด
+
+@instrumentation.on('leave_room', guard=guarded('leave_room'))
+def handle_leave_room(data):
+    """ผู้เล่นกดออกจากห้องเอง: นำออกทันทีโดยไม่ถือที่นั่งไว้"""
+    room = _room_of(request.sid)
+    if room:
+        leave_room(room.id)
+        _remove_player(room, request.sid, reason='leave')
+    return True
+
+@instrumentation.on('start_game', guard=guarded('start_game'))
 def handle_start_game(data):
     room_id = data.get('room_id')
     with rooms_lock:
@@ -529,27 +659,108 @@ def handle_start_game(data):
     if not room or room.host_sid != request.sid:
         return
     room.start_game()
+    _room_changed(room)
+    event_log.log('game_started', sid=request.sid, room=room.id, players=len(room.players))
+
+@instrumentation.on('list_rooms', guard=guarded('list_rooms'))
+def handle_list_rooms(data):
+    """ห้องสาธารณะที่เข้าร่วมได้หน้าหนึ่ง ถ้า watch (ค่าเริ่มต้น) จะได้หน้าเดิมใหม่ทุกครั้งที่รายการเปลี่ยนจนกว่าจะเข้าห้องหรือส่ง watch=false"""
+    offset, limit = data.get('offset', 0), data.get('limit', PAGE_SIZE)
+    if not data.get('watch', True):
+        room_browser.unwatch(request.sid)
+        return
+    room_browser.watch(request.sid, offset, limit)
+    emit('room_list', room_browser.page(offset, limit))
 
-@socketio.on('player_action')
+@instrumentation.on('add_bot', guard=guarded('add_bot'))
+def handle_add_bot(data):
+    """host เพิ่มบอท 1 ตัวเข้าห้อง (เฉพาะตอนยังไม่เริ่มเกม)"""
+    with rooms_lock:
+        room = rooms.get(data.get('room_id'))
+    if not room or room.host_sid != request.sid or room.phase != 'lobby':
+        return
+    sid = bot_scheduler.new_sid()
+    names = {player.name for player in room.players.values()}
+    name = next((name for name in BOT_NAMES if name not in names), 'บอท')
+    if not room.add_player(sid, name, bot=True):
+        emit('error_message', {'message': 'ห้องเต็มแล้ว!'})
+        return
+    bot_scheduler.add(room, sid)
+    _room_changed(room)
+    event_log.log('bot_added', sid=sid, room=room.id)
+    socketio.emit('update_lobby', room.get_lobby_info(), room=room.id)
+
+@instrumentation.on('remove_bot', guard=guarded('remove_bot'))
+def handle_remove_bot(data):
+    """host นำบอทออกจากห้อง (เฉพาะตอนยังไม่เริ่มเกม)"""
+    with rooms_lock:
+        room = rooms.get(data.get('room_id'))
+    if not room or room.host_sid != request.sid or room.phase != 'lobby':
+        return
+    player = room.players.get(data.get('sid'))
+    if player and player.bot:
+        _remove_player(room, player.sid, reason='removed')
+
+@instrumentation.on('player_action', guard=guarded('player_action'))
 def handle_player_action(data):
+    started = time.perf_counter()
     room_id = data.get('room_id')
     with rooms_lock:
         room = rooms.get(room_id)
     if room:
+        transport.set_pending_ack(request.sid, room.id, data.get('seq'), started)
         room.handle_player_action(request.sid, data)
+        transport.set_pending_ack(None, None, None, None)
+        _room_changed(room)
 
-@socketio.on('use_ability')
+@instrumentation.on('use_ability', guard=guarded('use_ability'))
 def handle_use_ability(data):
+    started = time.perf_counter()
     room_id = data.get('room_id')
-    item_name = data.get('item_name')
+    item_id = data.get('item_id')
     with rooms_lock:
         room = rooms.get(room_id)
     if room:
-        room.use_ability(request.sid, item_name)
+        transport.set_pending_ack(request.sid, room.id, data.get('seq'), started)
+        room.use_ability(request.sid, item_id)
+        transport.set_pending_ack(None, None, None, None)
+        _room_changed(room)
+
+@instrumentation.on('ack_items', guard=guarded('ack_items'))
+def handle_ack_items(data):
+    """client ยืนยันการได้รับวัตถุดิบเป็นชุด: {'room_id': ..., 'level': ..., 'ids': [item_id, ...]}"""
+    with rooms_lock:
+        room = rooms.get(data.get('room_id'))
+    if room:
+        room.ack_items(request.sid, data.get('level'), data.get('ids'))
+
+@instrumentation.on('latency_report', guard=guarded('latency_report'))
+def handle_latency_report(data):
+    """ตัวอย่าง round-trip ที่ client ส่งมาเป็นชุด: {'room_id': ..., 'samples': [[seq, rtt_ms, server_ms], ...]}"""
+    with rooms_lock:
+        room = rooms.get(data.get('room_id'))
+    if room and request.sid in room.players:
+        samples = parse_samples(data.get('samples'))
+        if samples:
+            latency_tracker.record(room.id, samples)
 
 # --- Main Execution ---
 if __name__ == '__main__':
     print("เซิร์ฟเวอร์กำลังจะเริ่มที่ http://127.0.0.1:5000")
+    if SNAPSHOT_FILE:
+        restore_rooms()
+    signal.signal(signal.SIGTERM, _shutdown)
     # เริ่ม Master Game Loop ใน Background
+    event_log.start()
+    if leaderboard:
+        leaderboard.start()
+    if analytics:
+        analytics.start()
     socketio.start_background_task(target=master_game_loop)
+    watchdog.start(socketio.start_background_task, socketio.sleep)
+    socketio.start_background_task(outbound.run, socketio.sleep)
+    socketio.start_background_task(bot_scheduler.run, socketio.sleep)
+    socketio.start_background_task(room_browser.run, transport.emit, socketio.sleep)
+    if journal_writer:
+        socketio.start_background_task(journal_writer.run, socketio.sleep)
     socketio.run(app, host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,12 @@
+# benchmarks: ชุดวัดประสิทธิภาพ (ใช้เฉพาะ stdlib) สำหรับ hot path ของเซิร์ฟเวอร์เกม
+# เรียกใช้ด้วย `python -m benchmarks.run` จากโฟลเดอร์หลักของโปรเจกต์
+
+BENCHMARKS = [] # [(ชื่อ, setup)] ตามลำดับที่ลงทะเบียน (setup() คืนฟังก์ชันที่ถูกจับเวลา)
+
+
+def benchmark(name):
+    """ลงทะเบียน setup ของ benchmark ชื่อ `name` (ใช้เป็น decorator ในโมดูล bench_*)"""
+    def decorator(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return decorator
@@ -0,0 +1,66 @@
+# benchmarks/bench_bots.py
+#
+# --- ต้นทุนของบอทของเซิร์ฟเวอร์ (bots.py) ---
+# 1. `act()` ของบอท 1 ตัวในห้อง 8 คนที่เล่นไปแล้วครู่หนึ่ง (ตัดสินใจ + ทำ action จริงผ่าน GameRoom)
+# 2. หนึ่งวินาทีของเกมสำหรับ 125 ห้องที่มีแต่บอท (1,000 ตัว): room.update() ทุกห้อง + BotScheduler.run_due()
+#    (ห้องที่เกมจบแล้วถูกเริ่มเกมใหม่ เพื่อให้วัดบอทที่กำลังเล่นอยู่ตลอด)
+#    ตัวเลขนี้ต้องน้อยกว่า 1 วินาทีมาก เพราะทั้งหมดทำงานบน hub เดียวกับ Master Game Loop
+
+import app  # import ก่อนโมดูลอื่นเพื่อให้ eventlet.monkey_patch() มีผลเหมือนตอนรันเซิร์ฟเวอร์จริง
+from benchmarks import benchmark
+from bots import BotScheduler, act
+from game_engine import GameRoom, NullTransport
+from simulation import ManualClock
+
+ROOMS = 125
+PLAYERS = 8
+
+
+def make_bot_room(clock, room_id, scheduler=None, seed=1234):
+    """ห้องที่เริ่มเกมแล้ว มีแต่บอท `PLAYERS` ตัว"""
+    room = GameRoom(room_id, 'bot-0', 'บอท0', NullTransport(), clock=clock, seed=seed)
+    room.players['bot-0'].bot = True
+    for i in range(1, PLAYERS):
+        room.add_player(f'bot-{i}', f'บอท{i}', bot=True)
+    room.start_game()
+    if scheduler:
+        for sid in room.players:
+            scheduler.add(room, sid)
+    return room
+
+
+@benchmark(f'bot_act[{PLAYERS}p]')
+def _act():
+    clock = ManualClock(1000.0)
+    room = make_bot_room(clock, 'BOTS')
+    for _ in range(10): # ให้ทุกคนมีของบนสายพานก่อน
+        clock.advance(1)
+        room.update()
+    players = list(room.players.values())
+    turn = [0]
+
+    def run():
+        turn[0] += 1
+        if turn[0] % PLAYERS == 0:
+            clock.advance(1)
+            room.update()
+            if room.phase == 'lobby': # เกมจบแล้ว: เริ่มใหม่ให้บอทมีอะไรทำตลอดการวัด
+                room.start_game()
+        act(room, players[turn[0] % PLAYERS])
+    return run
+
+
+@benchmark(f'bot_second[{ROOMS} rooms x {PLAYERS} bots]')
+def _second():
+    clock = ManualClock(1000.0)
+    scheduler = BotScheduler(clock=clock, budget_seconds=60.0, seed=1)
+    rooms = [make_bot_room(clock, f'B{i:03d}', scheduler, seed=i) for i in range(ROOMS)]
+
+    def run():
+        clock.advance(1)
+        for room in rooms:
+            if room.phase == 'lobby':
+                room.start_game()
+            room.update()
+        scheduler.run_due()
+    return run
@@ -0,0 +1,137 @@
+# benchmarks/bench_gameroom.py
+#
+# --- Micro-benchmark ของ hot path ใน GameRoom ---
+# แต่ละ benchmark คือ (ชื่อ, setup) โดย setup() เตรียมห้องแล้วคืนฟังก์ชันไม่มีอาร์กิวเมนต์ที่จะถูกจับเวลา
+# ห้องใช้ NullTransport + ManualClock จึงวัดเฉพาะต้นทุน CPU ของ engine ไม่รวม Socket
+
+import itertools
+
+import app  # import ก่อนโมดูลอื่นเพื่อให้ eventlet.monkey_patch() มีผลเหมือนตอนรันเซิร์ฟเวอร์จริง
+from benchmarks import benchmark
+import flask
+from game_engine import RECIPES, GameRoom, NullTransport
+from simulation import ManualClock, play_game
+
+PLAYER_COUNTS = range(1, 9)
+DISCONNECT_ROOMS = 10000
+
+
+def make_room(num_players, seed=1234):
+    """สร้างห้องที่เริ่มเกมแล้ว มีผู้เล่น `num_players` คน"""
+    clock = ManualClock(1000.0)
+    room = GameRoom('BNCH', 'p0', 'ผู้เล่น0', NullTransport(), clock=clock, seed=seed)
+    for i in range(1, num_players):
+        room.add_player(f'p{i}', f'ผู้เล่น{i}')
+    room.start_game()
+    for i, player in enumerate(room.players.values()):
+        player.plate = RECIPES[player.objective['name']]['ingredients'][:i % 3]
+    return room, clock
+
+
+def _register_per_player_count(prefix, factory):
+    for n in PLAYER_COUNTS:
+        benchmark(f'{prefix}[{n}p]')(lambda n=n: factory(n))
+
+
+def _augmented_state(n):
+    room, _ = make_room(n)
+    return room.get_augmented_state_for_ui
+
+
+def _spawnable_ingredients(n):
+    room, _ = make_room(n)
+    return room.game_state.get_spawnable_ingredients
+
+
+def _assign_all_objectives(n):
+    room, _ = make_room(n)
+    return room._assign_all_objectives
+
+
+def _update(n):
+    room, clock = make_room(n)
+    game_state = room.game_state
+
+    def run():
+        clock.advance(1)
+        game_state.time_left = 100 # ไม่ให้เกมจบระหว่างวัด
+        room.update()
+    return run
+
+
+_register_per_player_count('get_augmented_state_for_ui', _augmented_state)
+_register_per_player_count('get_spawnable_ingredients', _spawnable_ingredients)
+_register_per_player_count('_assign_all_objectives', _assign_all_objectives)
+_register_per_player_count('update', _update)
+
+
+@benchmark('handle_player_action[pass_item,4p]')
+def _pass_item():
+    room, _ = make_room(4)
+    game_state = room.game_state
+
+    def run():
+        item = game_state.create_item('p0', '🍅')
+        room.handle_player_action('p0', {'type': 'pass_item', 'item_id': item.id, 'direction': 'right'})
+        game_state.discard(item) # ไม่ให้สายพานของผู้รับเต็มระหว่างวัด
+    return run
+
+
+@benchmark('handle_player_action[add_to_plate,4p]')
+def _add_to_plate():
+    room, _ = make_room(4)
+    game_state = room.game_state
+    player = room.players['p0']
+
+    def run():
+        item = game_state.create_item('p0', '🍅')
+        room.handle_player_action('p0', {'type': 'add_to_plate', 'item_id': item.id})
+        player.plate = []
+    return run
+
+
+@benchmark('play_game[4p]')
+def _play_game():
+    """เกมเต็ม 1 เกมแบบเร่งเวลา (engine + GreedyPolicy) วนซ้ำ 20 seed (ส่วนกลับของค่านี้คือเกมต่อวินาทีของ simulation.py)"""
+    seeds = itertools.cycle(range(20))
+    return lambda: play_game(4, seed=next(seeds))
+
+
+@benchmark('_handle_submit_order[success,4p]')
+def _submit_success():
+    room, _ = make_room(4)
+    player = room.players['p0']
+
+    def run():
+        player.plate = list(RECIPES[player.objective['name']]['ingredients'])
+        room.game_state.score = 0 # ไม่ให้ผ่านด่านระหว่างวัด
+        room._handle_submit_order(player)
+    return run
+
+
+@benchmark('_handle_submit_order[fail,4p]')
+def _submit_fail():
+    room, _ = make_room(4)
+    player = room.players['p0']
+    player.plate = []
+    return lambda: room._handle_submit_order(player)
+
+
+@benchmark(f'handle_disconnect[{DISCONNECT_ROOMS} rooms]')
+def _disconnect():
+    """ผู้เล่นในห้องสุดท้ายหลุดแล้วกลับเข้าใหม่ ท่ามกลางห้องทั้งหมด 10k ห้อง (รวมการส่ง event เข้า structured log)"""
+    app.rooms.clear()
+    for i in range(DISCONNECT_ROOMS):
+        room = GameRoom(f'R{i:05d}', f'host{i}', 'host', app.transport)
+        room.add_player(f'guest{i}', 'guest')
+        app.rooms[room.id] = room
+    target = app.rooms[f'R{DISCONNECT_ROOMS - 1:05d}']
+    sid = f'guest{DISCONNECT_ROOMS - 1}'
+
+    def run():
+        with app.app.test_request_context('/'):
+            flask.request.sid = sid
+            flask.request.namespace = '/'
+            app.handle_disconnect()
+        target.add_player(sid, 'guest')
+    return run
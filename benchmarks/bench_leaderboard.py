@@ -0,0 +1,50 @@
+# benchmarks/bench_leaderboard.py
+#
+# --- ต้นทุนของตารางคะแนนสูงสุด (leaderboard.py) ---
+# 1. `top()` ถูกเรียกทุกครั้งที่มีคนเปิดหน้า lobby: ต้องไม่แตะฐานข้อมูล (ฐานข้อมูลมีผลอยู่แล้ว 100,000 เกม)
+# 2. `flush()` ทำงานบน writer thread: เขียนผล 500 เกมเป็นชุดเดียวแล้ว merge เข้าตารางในหน่วยความจำ
+
+import os
+import random
+import tempfile
+
+from benchmarks import benchmark
+from leaderboard import Leaderboard
+
+STORED_RESULTS = 100000
+FLUSH_BATCH = 500
+
+
+def _filled(name):
+    path = os.path.join(tempfile.gettempdir(), name)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    rng = random.Random(1)
+    now = [1_800_000_000.0]
+    board = Leaderboard(path, levels=(1, 2, 3), clock=lambda: now[0])
+    for i in range(STORED_RESULTS):
+        now[0] += 30
+        board.record(f'R{i % 10000:04d}', 'won', rng.randint(1, 3), rng.randint(0, 2000), ['ผู้เล่น1', 'ผู้เล่น2'])
+        if len(board._queue) >= board.max_queue:
+            board.flush()
+    board.flush()
+    board.refresh()
+    return board, rng
+
+
+@benchmark('leaderboard_top[day]')
+def _top():
+    board, _ = _filled('bench_leaderboard_top.sqlite3')
+    return lambda: board.top(0, 'day')
+
+
+@benchmark(f'leaderboard_flush[{FLUSH_BATCH} results]')
+def _flush():
+    board, rng = _filled('bench_leaderboard_flush.sqlite3')
+
+    def run():
+        for i in range(FLUSH_BATCH):
+            board.record(f'N{i:04d}', 'timeout', rng.randint(1, 3), rng.randint(0, 2000), ['ผู้เล่น1', 'ผู้เล่น2'])
+        board.flush()
+    return run
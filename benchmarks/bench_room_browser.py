@@ -0,0 +1,67 @@
+# benchmarks/bench_room_browser.py
+#
+# --- ต้นทุนของรายการห้องสาธารณะ (room_browser.py) ที่มีห้องรออยู่ 10,000 ห้อง ---
+# 1. `update()` ตอนมีคนเข้า/ออกห้อง (ห้องย้ายตำแหน่งในดัชนี) และตอน tick ของห้องที่ไม่มีอะไรเปลี่ยน
+# 2. `page()` หน้าแรกที่ client ขอ
+# 3. `push()` ส่งหน้าแรกให้ 1,000 client ที่เปิดหน้าค้นหาห้องอยู่หลังดัชนีเปลี่ยน (ไม่รวมต้นทุน Socket)
+
+import random
+
+from benchmarks import benchmark
+from game_engine import MAX_PLAYERS, GameRoom, NullTransport
+from room_browser import RoomBrowser
+
+LOBBIES = 10000
+WATCHERS = 1000
+
+
+def make_browser():
+    """ดัชนีที่มีห้องสาธารณะ `LOBBIES` ห้อง ห้องละ 1 ถึง MAX_PLAYERS - 1 คน"""
+    rng = random.Random(1)
+    browser = RoomBrowser()
+    rooms = []
+    for i in range(LOBBIES):
+        room = GameRoom(f'{i:04X}', 'p0', 'ผู้เล่น0', NullTransport(), seed=i)
+        room.public = True
+        for j in range(1, rng.randint(1, MAX_PLAYERS - 1)):
+            room.add_player(f'p{j}', f'ผู้เล่น{j}')
+        browser.update(room)
+        rooms.append(room)
+    return browser, rooms, rng
+
+
+@benchmark(f'room_browser_join_leave[{LOBBIES} lobbies]')
+def _join_leave():
+    browser, rooms, rng = make_browser()
+
+    def run():
+        room = rooms[rng.randrange(LOBBIES)]
+        room.add_player('guest', 'แขก')
+        browser.update(room)
+        room.remove_player('guest')
+        browser.update(room)
+    return run
+
+
+@benchmark(f'room_browser_unchanged[{LOBBIES} lobbies]')
+def _unchanged():
+    browser, rooms, rng = make_browser()
+    return lambda: browser.update(rooms[rng.randrange(LOBBIES)])
+
+
+@benchmark(f'room_browser_page[{LOBBIES} lobbies]')
+def _page():
+    browser, _, _ = make_browser()
+    return browser.page
+
+
+@benchmark(f'room_browser_push[{WATCHERS} watchers]')
+def _push():
+    browser, _, _ = make_browser()
+    for i in range(WATCHERS):
+        browser.watch(f'w{i}')
+
+    def run():
+        browser.version += 1
+        browser.push(lambda event, data, to: None)
+    return run
@@ -0,0 +1,56 @@
+# benchmarks/bench_snapshot.py
+#
+# --- ต้นทุนของการบันทึก/กู้คืนห้องทั้งหมดตอน deploy (snapshot.py) ---
+# ห้องละ 4 คนที่เล่นไปแล้วระยะหนึ่ง (มีวัตถุดิบบนสายพาน จานไม่ว่าง และมีความสามารถที่กำลังแปรรูป)
+# เป้าหมาย: บันทึก + กู้คืน 5,000 ห้องรวมกันไม่เกิน 1 วินาที
+
+import os
+import tempfile
+
+import app  # import ก่อนโมดูลอื่นเพื่อให้ eventlet.monkey_patch() มีผลเหมือนตอนรันเซิร์ฟเวอร์จริง
+from benchmarks import benchmark
+import snapshot
+from game_engine import RECIPES, GameRoom, NullTransport
+from simulation import ManualClock
+
+SNAPSHOT_ROOMS = 5000
+
+
+def make_rooms(count, players=4):
+    clock = ManualClock(1000.0)
+    rooms = []
+    for r in range(count):
+        room = GameRoom(f'R{r:04d}', f'p{r}-0', 'ผู้เล่น0', NullTransport(), clock=clock, seed=r)
+        for i in range(1, players):
+            room.add_player(f'p{r}-{i}', f'ผู้เล่น{i}')
+        room.start_game()
+        rooms.append(room)
+    for _ in range(12): # ให้มีวัตถุดิบบนสายพานหลายชิ้น
+        clock.advance(1)
+        for room in rooms:
+            room.update()
+    for room in rooms:
+        for i, player in enumerate(room.players.values()):
+            player.plate = RECIPES[player.objective['name']]['ingredients'][:i % 3]
+    return rooms, clock
+
+
+def _path():
+    return os.path.join(tempfile.gettempdir(), 'bench_rooms.snapshot.json')
+
+
+@benchmark(f'snapshot_save[{SNAPSHOT_ROOMS} rooms]')
+def _save():
+    rooms, clock = make_rooms(SNAPSHOT_ROOMS)
+    path = _path()
+    sessions = [[f'token-{room.id}-{sid}', room.id, sid] for room in rooms for sid in room.players]
+    return lambda: snapshot.save(path, rooms, sessions, clock())
+
+
+@benchmark(f'snapshot_load[{SNAPSHOT_ROOMS} rooms]')
+def _load():
+    rooms, clock = make_rooms(SNAPSHOT_ROOMS)
+    path = _path()
+    snapshot.save(path, rooms, [], clock())
+    transport = NullTransport()
+    return lambda: snapshot.load(path, transport, clock, clock())
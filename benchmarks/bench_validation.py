@@ -0,0 +1,38 @@
+# benchmarks/bench_validation.py
+#
+# --- ต้นทุนของการตรวจ payload ขาเข้า (validation.py) ต่อข้อความ ---
+# ใช้ payload แบบเดียวกับที่ client จริงส่ง (รวม seq/sent_at ของ latency tracing) และกรณีที่ถูกปฏิเสธ
+
+from benchmarks import benchmark
+from validation import validate
+
+
+def _trace(payload):
+    return dict(payload, seq=1234, sent_at=1792414995040)
+
+
+VALID_PAYLOADS = {
+    'pass_item': ('player_action', _trace({'room_id': 'BNCH', 'type': 'pass_item', 'direction': 'left', 'item_id': 42})),
+    'add_to_plate': ('player_action', _trace({'room_id': 'BNCH', 'type': 'add_to_plate', 'item_id': 42})),
+    'remove_from_plate': ('player_action', _trace({'room_id': 'BNCH', 'type': 'remove_from_plate',
+                                                   'ingredients': ['🥗', '🌶️', '🍅', '🥜']})),
+    'submit_order': ('player_action', _trace({'room_id': 'BNCH', 'type': 'submit_order'})),
+    'use_ability': ('use_ability', _trace({'room_id': 'BNCH', 'item_id': 42})),
+    'join_room': ('join_room', {'room_id': 'BNCH', 'name': 'ผู้เล่นทดสอบ'}),
+}
+
+INVALID_PAYLOADS = {
+    'oversized_list': ('player_action', {'room_id': 'BNCH', 'type': 'remove_from_plate', 'ingredients': ['🍅'] * 10000}),
+    'unknown_ingredient': ('player_action', {'room_id': 'BNCH', 'type': 'remove_from_plate', 'ingredients': ['x' * 1000]}),
+    'bad_item_id': ('player_action', {'room_id': 'BNCH', 'type': 'pass_item', 'direction': 'left', 'item_id': 'x' * 1000}),
+    'not_a_dict': ('player_action', ['garbage']),
+}
+
+
+def _register(prefix, payloads):
+    for label, (event, payload) in payloads.items():
+        benchmark(f'{prefix}[{label}]')(lambda event=event, payload=payload: lambda: validate(event, payload))
+
+
+_register('validate', VALID_PAYLOADS)
+_register('validate_reject', INVALID_PAYLOADS)
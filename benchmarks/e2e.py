@@ -0,0 +1,185 @@
+# benchmarks/e2e.py
+#
+# --- Benchmark แบบ end-to-end ภายใน process เดียว ---
+# ใช้ socketio.test_client(app) สร้างห้องหลายร้อยห้อง แล้วเล่นเกมจนจบผ่าน handler จริง
+# (handle_create_room, handle_join_room, handle_start_game, handle_player_action, handle_use_ability)
+# วัดเวลาของ handler, จำนวนข้อความที่ถูกส่งออก และขนาด payload แยกตามชนิด action
+# ต่างจาก tools.loadtest ตรงที่ไม่มีเครือข่ายเข้ามาเกี่ยว จึงเห็นต้นทุน CPU ของเซิร์ฟเวอร์ล้วนๆ
+#
+# ตัวอย่าง: python -m benchmarks.e2e --rooms 200 --players 4 --output e2e.json
+
+import app  # import ก่อนโมดูลอื่นเพื่อให้ eventlet.monkey_patch() มีผลเหมือนตอนรันเซิร์ฟเวอร์จริง
+
+import argparse
+import json
+import time
+
+from simulation import GreedyPolicy, ManualClock
+
+
+class ActionStats:
+    """สถิติของ action ชนิดหนึ่ง: เวลา handler และข้อความที่เกิดขึ้นตามมา"""
+    def __init__(self):
+        self.latencies = []
+        self.messages = 0
+        self.bytes = 0
+
+    def summary(self):
+        values = sorted(self.latencies)
+        count = len(values)
+
+        def pct(p):
+            return values[min(count - 1, int(p / 100.0 * count))] * 1e6 if count else 0.0
+        return {
+            'count': count,
+            'mean_us': round(sum(values) / count * 1e6, 2) if count else 0.0,
+            'p50_us': round(pct(50), 2),
+            'p99_us': round(pct(99), 2),
+            'messages_per_action': round(self.messages / count, 2) if count else 0.0,
+            'bytes_per_action': round(self.bytes / count, 1) if count else 0.0,
+        }
+
+
+class Harness:
+    """ถือ test client ของทุกห้อง และรวมสถิติแยกตามชนิด action"""
+    def __init__(self):
+        self.stats = {}
+        self.room_clients = {} # {room_id: [test client, ...]}
+        self.inventories = {}  # {sid: {item_id: ingredient}}
+        self.games_won = 0
+
+    def _stats(self, name):
+        return self.stats.setdefault(name, ActionStats())
+
+    def drain(self, clients, name):
+        """เก็บข้อความที่ client ได้รับทั้งหมด นับเป็นผลของ action `name` และอัปเดตข้อมูลที่บอทต้องใช้"""
+        stats = self._stats(name)
+        for client in clients:
+            for message in client.get_received():
+                stats.messages += 1
+                stats.bytes += len(json.dumps(message['args'], ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                event, data = message['name'], message['args'][0]
+                if event == 'receive_item':
+                    self.inventories.setdefault(client.player_sid, {})[data['item']['id']] = data['item']['name']
+                elif event == 'receive_items':
+                    self.inventories.setdefault(client.player_sid, {}).update((item['id'], item['name']) for item in data['items'])
+                elif event == 'clear_all_items':
+                    self.inventories.pop(client.player_sid, None)
+                elif event == 'room_created':
+                    client.room_id = data['room_id']
+                elif event == 'game_started':
+                    client.player_sid = data['your_sid']
+                elif event == 'game_won' and client.is_host:
+                    self.games_won += 1
+
+    def emit(self, client, event, data, name, room_clients):
+        started = time.perf_counter()
+        client.emit(event, data)
+        self._stats(name).latencies.append(time.perf_counter() - started)
+        self.drain(room_clients, name)
+
+
+class HandlerRoute:
+    """ส่งการตัดสินใจของ GreedyPolicy ผ่าน handler ของ Socket.IO แทนการเรียก GameRoom ตรงๆ"""
+    def __init__(self, harness, room, client):
+        self.harness = harness
+        self.room = room
+        self.client = client
+
+    def __getattr__(self, name):
+        return getattr(self.room, name)
+
+    def handle_player_action(self, sid, data):
+        payload = dict(data, room_id=self.room.id)
+        self.harness.emit(self.client, 'player_action', payload, data['type'], self.harness.room_clients[self.room.id])
+
+    def use_ability(self, sid, item_id):
+        payload = {'room_id': self.room.id, 'item_id': item_id}
+        self.harness.emit(self.client, 'use_ability', payload, 'use_ability', self.harness.room_clients[self.room.id])
+
+
+def run(args):
+    harness = Harness()
+    clock = ManualClock(time.time())
+    policy = GreedyPolicy()
+    app.rooms.clear()
+    # บอทเล่นเร็วกว่าเวลาจริงหลายเท่า (นาฬิกาจำลอง) จึงปิด rate limit ต่อ connection ระหว่างวัด
+    app.rate_limiter.limits.clear()
+
+    setup_started = time.perf_counter()
+    for r in range(args.rooms):
+        clients = [app.socketio.test_client(app.app) for _ in range(args.players)]
+        for i, client in enumerate(clients):
+            client.is_host = i == 0
+            client.player_sid = client.room_id = None
+        host = clients[0]
+        harness.emit(host, 'create_room', {'name': f'host{r}'}, 'create_room', clients[:1])
+        room_id = host.room_id
+        app.rooms[room_id].clock = clock # ให้ทุกห้องใช้นาฬิกาเดียวกันที่เดินเร็วได้
+        for i, client in enumerate(clients[1:], start=1):
+            harness.emit(client, 'join_room', {'name': f'p{r}-{i}', 'room_id': room_id}, 'join_room', clients[:i + 1])
+        harness.room_clients[room_id] = clients
+    for room_id, clients in harness.room_clients.items():
+        harness.emit(clients[0], 'start_game', {'room_id': room_id}, 'start_game', clients)
+    setup_seconds = time.perf_counter() - setup_started
+
+    # เล่นทุกห้องไปพร้อมกัน: บอทตัดสินใจทุกครึ่งวินาที (เวลาจำลอง) และ Master Loop ทำงานทุก 1 วินาที
+    routes = {room_id: {client.player_sid: HandlerRoute(harness, app.rooms[room_id], client) for client in clients}
+              for room_id, clients in harness.room_clients.items()}
+    all_clients = [client for clients in harness.room_clients.values() for client in clients]
+    play_started = time.perf_counter()
+    simulated_seconds = 0
+    while simulated_seconds < args.max_seconds:
+        for _ in range(2):
+            for room_id, room_routes in routes.items():
+                room = app.rooms.get(room_id)
+                if not room or not room.game_state or not room.game_state.is_active:
+                    continue
+                for sid in list(room.game_state.player_order_sids):
+                    policy.act(room_routes[sid], sid, harness.inventories.setdefault(sid, {}))
+            clock.advance(0.5)
+        started = time.perf_counter()
+        active = app.update_active_rooms()
+        harness._stats('master_loop_tick').latencies.append(time.perf_counter() - started)
+        harness.drain(all_clients, 'master_loop_tick')
+        simulated_seconds += 1
+        if not active:
+            break
+    play_seconds = time.perf_counter() - play_started
+
+    for client in all_clients:
+        client.disconnect()
+
+    actions = {name: stats.summary() for name, stats in sorted(harness.stats.items())}
+    handler_seconds = sum(sum(s.latencies) for name, s in harness.stats.items() if name != 'master_loop_tick')
+    handler_count = sum(len(s.latencies) for name, s in harness.stats.items() if name != 'master_loop_tick')
+    return {
+        'config': {'rooms': args.rooms, 'players_per_room': args.players},
+        'setup_seconds': round(setup_seconds, 3),
+        'play_seconds': round(play_seconds, 3),
+        'simulated_seconds': simulated_seconds,
+        'handler_calls': handler_count,
+        'handler_calls_per_cpu_second': round(handler_count / handler_seconds, 1) if handler_seconds else 0.0,
+        'games_won': harness.games_won,
+        'by_action': actions,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark end-to-end ผ่าน Flask-SocketIO test client')
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--max-seconds', type=int, default=600, help='เวลาในเกมสูงสุด (วินาทีจำลอง)')
+    parser.add_argument('--output', help='บันทึกผลเป็นไฟล์ JSON')
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
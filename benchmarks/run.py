@@ -0,0 +1,180 @@
+# benchmarks/run.py
+#
+# --- ตัวรัน benchmark และเปรียบเทียบกับ baseline ---
+# 1. ค้นหาโมดูล benchmarks/bench_*.py แล้วรันทุก benchmark ที่ลงทะเบียนด้วย `@benchmark(name)` (ดู benchmarks/__init__.py)
+# 2. จับเวลาด้วย timeit (ปรับจำนวนรอบอัตโนมัติ) แล้วบันทึกผลเป็น JSON (ns ต่อครั้ง)
+# 3. เปรียบเทียบค่าต่ำสุด (`ns_per_op_min`) กับ baseline ที่เก็บไว้ และคืน exit code 1 เมื่อช้าลงเกิน threshold
+#    ค่ากลาง (`ns_per_op_median`) ถูกบันทึกไว้ดูความแกว่งของผลเท่านั้น ไม่ใช้ตัดสิน
+#    ช้าลงไม่ถึง `--min-change-ns` (ค่าเริ่มต้น 0.2 µs/op) ไม่นับ และ benchmark ที่ดูเหมือนช้าลงจะถูกวัดซ้ำอีก `--confirm` ครั้ง
+#    ใน process ใหม่ (layout ของหน่วยความจำและ hash seed ต่างกันทุก process ทำให้ผลต่างกันได้ราว 10-30%)
+#    นับเป็น regression เฉพาะเมื่อยังช้าลงเกิน threshold ทุกครั้ง
+#
+# ตัวอย่าง:
+#   python -m benchmarks.run                                  # รันทั้งหมดแล้วเทียบกับ benchmarks/baseline.json
+#   python -m benchmarks.run --filter update --threshold 0.2  # เฉพาะชื่อที่มีคำว่า update, ยอมให้ช้าลงได้ 20%
+#   python -m benchmarks.run --threshold-for "handle_disconnect*=0.5"
+#   python -m benchmarks.run --update-baseline                # บันทึกผลครั้งนี้เป็น baseline ใหม่
+
+import argparse
+import fnmatch
+import importlib
+import json
+import os
+import pkgutil
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+import benchmarks
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def discover():
+    """import ทุกโมดูล bench_* ตามลำดับชื่อไฟล์ แล้วคืน (ชื่อ, setup) ที่ลงทะเบียนไว้ใน benchmarks.BENCHMARKS"""
+    for module_info in sorted(pkgutil.iter_modules(benchmarks.__path__), key=lambda m: m.name):
+        if module_info.name.startswith('bench_'):
+            importlib.import_module(f'benchmarks.{module_info.name}')
+    return list(benchmarks.BENCHMARKS)
+
+
+def measure(func, repeat, min_time):
+    """จับเวลา func แล้วคืนค่า ns ต่อครั้ง (min, median) และจำนวนรอบต่อชุด"""
+    timer = timeit.Timer(func)
+    loops, elapsed = timer.autorange()
+    if elapsed < min_time:
+        loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+    samples = [t / loops * 1e9 for t in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        'ns_per_op_min': round(min(samples), 1),
+        'ns_per_op_median': round(statistics.median(samples), 1),
+        'loops': loops,
+        'repeat': repeat,
+    }
+
+
+def compare(results, baseline, default_threshold, thresholds, min_change_ns=0.0):
+    """คืนค่า list ของ (ชื่อ, baseline, ปัจจุบัน, อัตราส่วน, threshold, ช้าลงเกินหรือไม่)
+    ช้าลงเกิน threshold แต่ไม่ถึง `min_change_ns` ต่อครั้งไม่นับเป็น regression"""
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        threshold = default_threshold
+        for pattern, value in thresholds:
+            if fnmatch.fnmatchcase(name, pattern):
+                threshold = value
+        # เทียบด้วยค่าต่ำสุด เพราะ noise จากเครื่อง (scheduler, cache) ทำให้ช้าลงได้อย่างเดียว ไม่ทำให้เร็วขึ้น
+        ratio = current['ns_per_op_min'] / base['ns_per_op_min']
+        regressed = ratio > 1 + threshold and current['ns_per_op_min'] - base['ns_per_op_min'] > min_change_ns
+        rows.append((name, base['ns_per_op_min'], current['ns_per_op_min'], ratio, threshold, regressed))
+    return rows
+
+
+def measure_in_subprocess(names, args):
+    """วัด benchmark `names` ซ้ำใน process ใหม่ คืน {ชื่อ: ผล}"""
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'rerun.json')
+        command = [sys.executable, '-m', 'benchmarks.run', '--baseline', '', '--output', output,
+                   '--repeat', str(args.repeat), '--min-time', str(args.min_time)]
+        for name in names:
+            command += ['--only', name]
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        with open(output, encoding='utf-8') as f:
+            return json.load(f)['results']
+
+
+def parse_threshold(text):
+    pattern, _, value = text.rpartition('=')
+    if not pattern:
+        raise argparse.ArgumentTypeError('ต้องอยู่ในรูป PATTERN=RATIO เช่น "update*=0.3"')
+    return pattern, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='รัน micro-benchmark และเปรียบเทียบกับ baseline')
+    parser.add_argument('--filter', default='', help='รันเฉพาะ benchmark ที่ชื่อมีข้อความนี้')
+    parser.add_argument('--only', action='append', default=[], help='รันเฉพาะ benchmark ชื่อนี้ (ระบุซ้ำได้)')
+    parser.add_argument('--repeat', type=int, default=5, help='จำนวนชุดการวัด')
+    parser.add_argument('--min-time', type=float, default=0.2, help='เวลาขั้นต่ำต่อชุด (วินาที)')
+    parser.add_argument('--output', help='บันทึกผลเป็นไฟล์ JSON')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='ไฟล์ baseline สำหรับเปรียบเทียบ')
+    parser.add_argument('--threshold', type=float, default=0.20, help='ยอมให้ช้าลงได้กี่เท่า (0.20 = 20%%)')
+    parser.add_argument('--threshold-for', type=parse_threshold, action='append', default=[],
+                        help='threshold เฉพาะ benchmark ในรูป PATTERN=RATIO (ระบุซ้ำได้)')
+    parser.add_argument('--min-change-ns', type=float, default=200.0,
+                        help='ช้าลงน้อยกว่านี้ (ns ต่อครั้ง) ไม่นับเป็น regression')
+    parser.add_argument('--confirm', type=int, default=3,
+                        help='วัดซ้ำ benchmark ที่ดูเหมือนช้าลงใน process ใหม่อีกกี่ครั้ง (ต้องช้าลงทุกครั้งจึงนับ)')
+    parser.add_argument('--update-baseline', action='store_true', help='เขียนผลครั้งนี้ทับไฟล์ baseline')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, setup in discover():
+        if args.filter not in name or (args.only and name not in args.only):
+            continue
+        func = setup()
+        results[name] = measure(func, args.repeat, args.min_time)
+        print(f"{name:45s} {results[name]['ns_per_op_min'] / 1000:10.2f} µs/op (min)", flush=True)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f).get('results', {})
+        baseline.update(results)
+        report['results'] = dict(sorted(baseline.items()))
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'บันทึก baseline แล้ว: {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('ไม่พบไฟล์ baseline ข้ามการเปรียบเทียบ')
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f).get('results', {})
+
+    rows = compare(results, baseline, args.threshold, args.threshold_for, args.min_change_ns)
+    for _ in range(args.confirm):
+        suspects = [row[0] for row in rows if row[5]]
+        if not suspects:
+            break
+        print(f'วัดซ้ำ {len(suspects)} benchmark ที่ดูเหมือนช้าลงใน process ใหม่', flush=True)
+        for name, rerun in measure_in_subprocess(suspects, args).items():
+            # ยังนับว่าช้าลงเฉพาะเมื่อครั้งที่เร็วที่สุดของทุกรอบยังช้าลงเกิน threshold
+            if rerun['ns_per_op_min'] < results[name]['ns_per_op_min']:
+                results[name] = rerun
+        rows = compare(results, baseline, args.threshold, args.threshold_for, args.min_change_ns)
+
+    regressions = 0
+    print(f"\n{'benchmark':45s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for name, base, current, ratio, threshold, regressed in rows:
+        regressions += regressed
+        flag = f'  <-- ช้าลงเกิน {threshold:.0%}' if regressed else ''
+        print(f'{name:45s} {base / 1000:10.2f} {current / 1000:10.2f} {ratio - 1:+8.1%}{flag}')
+    if regressions:
+        print(f'\nพบ {regressions} benchmark ที่ช้าลงเกิน threshold')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+# bots.py
+#
+# --- บอทของเซิร์ฟเวอร์ (เล่นคนเดียว / เติมที่นั่งให้ห้องที่มีผู้เล่นน้อย) ---
+# 1. บอทเป็น Player ธรรมดาในห้อง (`Player.bot = True`) มีที่นั่งใน player_order_sids ได้เป้าหมายและความสามารถเหมือนคนอื่น
+#    แต่ไม่มี connection: อ่านวัตถุดิบบนสายพานจาก `GameState.conveyor()` (ดัชนีตามเจ้าของ) และทำ action ผ่าน API เดียวกับ handler ของผู้เล่นจริง
+# 2. การตัดสินใจใช้ตารางที่คำนวณไว้ล่วงหน้า:
+#    - `recipe_plan()`: ของที่ยังขาด/ของเกินในจาน ต่อคู่ (เมนู, จาน) เติมทุกจานที่ถูกต้องบางส่วนไว้ตั้งแต่ import
+#    - `TRANSFORMS`: วัตถุดิบตั้งต้น -> (ความสามารถ, ผลลัพธ์)
+#    ลำดับการตัดสินใจ: ส่งอาหาร > เอาของเกินออกจากจาน > ใส่ของที่ขาด > แปรรูป > ส่งต่อไปทางคนที่ต้องการที่ใกล้ที่สุด > ทิ้ง
+#    `step()` คือสมองเดียวกันที่ simulation.GreedyPolicy ใช้ (ต่างกันแค่ที่มาของรายการวัตถุดิบ)
+# 3. ไม่มี greenlet ต่อบอท: `BotScheduler` เก็บเวลาคิดครั้งถัดไปของทุกบอทไว้ใน heap เดียว
+#    `run()` (background greenlet เดียว) ทำเฉพาะบอทที่ถึงเวลา และคืน hub ทุก `budget_seconds` เพื่อไม่ให้ Master Game Loop ช้า
+#    ถ้าเซิร์ฟเวอร์ทำงานไม่ทัน บอทจะคิดช้าลงเอง (นัดครั้งถัดไปนับจากเวลาที่คิดจริง ไม่ใช่เวลาที่นัดไว้)
+# ถูกเรียกจาก hub เท่านั้น จึงไม่ต้องใช้ lock
+
+import contextlib
+import heapq
+import itertools
+import random
+import secrets
+import time
+from functools import lru_cache
+
+from game_engine import ABILITIES_CONFIG, RECIPES
+from metrics import Counter
+
+BOT_ACTIONS = Counter('game_bot_actions_total', 'จำนวน action ที่บอทของเซิร์ฟเวอร์ทำ', ['action'])
+
+TRANSFORMS = {base: (ability, output) for ability, config in ABILITIES_CONFIG.items()
+              for base, output in config['transformations'].items()}
+
+
+@lru_cache(maxsize=8192)
+def recipe_plan(objective_name, plate):
+    """(ของที่ยังขาด, ของในจานที่ไม่อยู่ในสูตร) ของเมนู `objective_name` เมื่อในจานมี `plate` (tuple) อยู่แล้ว
+    คำนวณครั้งเดียวต่อคู่แล้วเก็บไว้ในตาราง (จำนวนคู่ที่เกิดขึ้นจริงมีไม่กี่ร้อย)"""
+    missing = list(RECIPES[objective_name]['ingredients'])
+    stale = []
+    for ing in plate:
+        if ing in missing:
+            missing.remove(ing)
+        else:
+            stale.append(ing)
+    return tuple(missing), tuple(stale)
+
+
+def _warm_plans():
+    """เติมตารางด้วยทุกจานที่ถูกต้องบางส่วนของทุกเมนูตั้งแต่ตอน import"""
+    for name, recipe in RECIPES.items():
+        ingredients = recipe['ingredients']
+        for size in range(len(ingredients) + 1):
+            for plate in itertools.permutations(ingredients, size):
+                recipe_plan(name, plate)
+
+
+_warm_plans()
+
+
+def plan_for(player):
+    if not player.objective or player.objective['name'] not in RECIPES:
+        return (), ()
+    return recipe_plan(player.objective['name'], tuple(player.plate))
+
+
+def direction_to(order, sid, targets):
+    """ทิศที่ใกล้ผู้รับที่ใกล้ที่สุดบนวงที่นั่ง"""
+    index = order.index(sid)
+    size = len(order)
+    right = min(((order.index(t) - index) % size for t in targets), key=lambda r: min(r, size - r))
+    return 'right' if right <= size - right else 'left'
+
+
+def step(room, player, held, direction_to=direction_to):
+    """ทำ 1 action ให้ `player` จากวัตถุดิบบนสายพาน `held` ([(item_id, ชื่อ)])
+    คืน (ชื่อ action, item_id ที่ใช้ไป) หรือ (None, None) ถ้าไม่มีอะไรทำ (ใช้ร่วมกับ simulation.GreedyPolicy)"""
+    game_state = room.game_state
+    if not game_state or not game_state.is_active:
+        return None, None
+    sid = player.sid
+    missing, stale = plan_for(player)
+    if player.objective and not missing:
+        room.handle_player_action(sid, {'type': 'submit_order'})
+        return 'submit_order', None
+    if stale:
+        room.handle_player_action(sid, {'type': 'remove_from_plate', 'ingredients': list(stale)})
+        return 'remove_from_plate', None
+    if not held:
+        return None, None
+    for item_id, name in held:
+        if name in missing:
+            room.handle_player_action(sid, {'type': 'add_to_plate', 'item_id': item_id})
+            return 'add_to_plate', item_id
+
+    order = game_state.player_order_sids
+    players = room.players
+    wanted = {} # {วัตถุดิบ: [sid ที่ยังขาด, ...]}
+    for other in order:
+        for ing in plan_for(players[other])[0]:
+            wanted.setdefault(ing, []).append(other)
+
+    for item_id, name in held:
+        targets = wanted.get(name)
+        if not targets and name in TRANSFORMS:
+            ability, output = TRANSFORMS[name]
+            if output in wanted:
+                if player.ability == ability:
+                    if player.ability_processing:
+                        continue # รอเครื่องว่าง เก็บไว้ก่อน
+                    room.use_ability(sid, item_id)
+                    return 'use_ability', item_id
+                targets = [other for other in order if players[other].ability == ability]
+        if targets and len(order) > 1:
+            room.handle_player_action(sid, {'type': 'pass_item', 'item_id': item_id,
+                                            'direction': direction_to(order, sid, targets)})
+            return 'pass_item', item_id
+        if len(held) > 1 or not player.objective: # ของชิ้นสุดท้ายเก็บไว้ เผื่อเป้าหมายใหม่ต้องใช้
+            room.handle_player_action(sid, {'type': 'trash_item', 'item_id': item_id})
+            return 'trash_item', item_id
+    return None, None
+
+
+def act(room, player):
+    """ทำ 1 action ให้บอท `player` ของเซิร์ฟเวอร์ คืนชื่อ action หรือ None ถ้าไม่มีอะไรทำ"""
+    game_state = room.game_state
+    if not game_state or not game_state.is_active:
+        return None
+    return step(room, player, [(item.id, item.name) for item in game_state.conveyor(player.sid)])[0]
+
+
+class BotScheduler:
+    """นัดเวลาคิดของทุกบอทไว้ใน heap เดียว (แทน greenlet ต่อบอท)"""
+    def __init__(self, think_seconds=1.0, budget_seconds=0.005, clock=time.monotonic, track=None, seed=None):
+        self.think_seconds = think_seconds
+        self.budget_seconds = budget_seconds
+        self.clock = clock
+        self.track = track or (lambda event, room: contextlib.nullcontext()) # instrumentation.track ของเซิร์ฟเวอร์
+        self.rng = random.Random(seed)
+        self.bots = {}  # {sid: GameRoom}
+        self._heap = [] # [(เวลาที่ต้องคิด, ลำดับ, sid)] บอทที่ถูกลบแล้วถูกข้ามตอนดึงออก
+        self._order = itertools.count()
+        self.stopped = False # ตั้งตอนปิดเซิร์ฟเวอร์: run() จบหลังรอบปัจจุบัน
+
+    @staticmethod
+    def new_sid():
+        """sid ของบอทใหม่ (สุ่ม จึงไม่ชนกับบอทในห้องที่กู้คืนจาก snapshot)"""
+        return f'bot-{secrets.token_urlsafe(9)}'
+
+    def add(self, room, sid):
+        """เริ่มนัดเวลาให้บอท `sid` ที่อยู่ใน `room` แล้ว (กระจายครั้งแรกไม่ให้ทุกบอทคิดพร้อมกัน)"""
+        self.bots[sid] = room
+        self._schedule(sid, self.clock() + self.rng.random() * self.think_seconds)
+
+    def remove(self, sid):
+        self.bots.pop(sid, None)
+
+    def _schedule(self, sid, due):
+        heapq.heappush(self._heap, (due, next(self._order), sid))
+
+    def run_due(self):
+        """ให้บอทที่ถึงเวลาคิดทำ 1 action คืน True ถ้าหมดงบเวลาก่อนทำครบ"""
+        now = self.clock()
+        deadline = time.perf_counter() + self.budget_seconds
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, sid = heapq.heappop(heap)
+            room = self.bots.get(sid)
+            player = room.players.get(sid) if room else None
+            if player is None:
+                self.bots.pop(sid, None)
+                continue
+            if room.needs_update:
+                tracked = self.track('bot_step', room.id) # เก็บใน local ให้ hub_watchdog หา context เจอ
+                with tracked:
+                    action = act(room, player)
+                if action:
+                    BOT_ACTIONS.inc((action,))
+            self._schedule(sid, now + self.think_seconds * (0.75 + 0.5 * self.rng.random()))
+            if time.perf_counter() >= deadline:
+                return True
+        return False
+
+    def run(self, sleep, interval=0.05):
+        """ลูปเบื้องหลัง (`sleep` คือ socketio.sleep เพื่อให้ทำงานเป็น greenlet)"""
+        while not self.stopped:
+            sleep(0 if self.run_due() else interval)
+
+    def __len__(self):
+        return len(self.bots)
@@ -0,0 +1,101 @@
+# event_log.py
+#
+# --- Structured logging แบบไม่ block hub ---
+# 1. `log(event, **fields)` บน hub เป็นเพียงการสร้าง dict แล้วต่อท้าย deque (ไม่มี I/O, ไม่มี lock ของ eventlet)
+#    ถ้าคิวเต็ม record ใหม่จะถูกทิ้งและนับไว้ใน game_log_dropped_total แทนการรอ
+# 2. OS thread จริงดึง record ออกมาเป็นชุดทุก `flush_interval` วินาที แปลงเป็น JSON lines แล้วเขียนลงไฟล์ครั้งเดียวต่อชุด
+#    ไฟล์หมุนตามขนาด (path → path.1 → ... → path.N)
+# 3. event ที่เกิดถี่ (เช่น player_action) สุ่มเก็บตาม `sample_rates` และบันทึกอัตราไว้ใน field `sample_rate`
+
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+
+from metrics import Counter
+from os_threads import original
+
+LOG_WRITTEN = Counter('game_log_records_total', 'จำนวน log record ที่เขียนลงไฟล์แล้ว')
+LOG_DROPPED = Counter('game_log_dropped_total', 'จำนวน log record ที่ถูกทิ้งเพราะคิวเต็ม')
+
+
+class RotatingFile:
+    """ไฟล์ log ที่หมุนเมื่อขนาดเกิน `max_bytes` (path → path.1 → ... → path.N) ใช้จาก thread เดียวเท่านั้น"""
+    def __init__(self, path, max_bytes=1024 * 1024, backup_count=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        if self.backup_count:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+    def write(self, data):
+        if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+
+class StdoutFile:
+    """ปลายทางแบบ stdout (path = '-') สำหรับรันในเครื่องหรือใน container ที่เก็บ log จาก stdout"""
+    def write(self, data):
+        sys.stdout.buffer.write(data)
+        sys.stdout.flush()
+
+
+class StructuredLogger:
+    """Logger แบบ JSON lines ที่เขียนไฟล์จาก background thread"""
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5, flush_interval=0.25,
+                 max_queue=50000, sample_rates=None):
+        self.sink = StdoutFile() if path == '-' else RotatingFile(path, max_bytes, backup_count)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.sample_rates = dict(sample_rates or {}) # {event: สัดส่วนที่เก็บ 0.0-1.0} ไม่ระบุ = เก็บทุกครั้ง
+        self._queue = deque() # append/popleft ของ deque ปลอดภัยข้าม thread โดยไม่ต้องใช้ lock
+        self._thread = None
+
+    def log(self, event, **fields):
+        rate = self.sample_rates.get(event)
+        if rate is not None:
+            if random.random() >= rate:
+                return
+            fields['sample_rate'] = rate
+        if len(self._queue) >= self.max_queue:
+            LOG_DROPPED.inc()
+            return
+        fields['ts'] = time.time()
+        fields['event'] = event
+        self._queue.append(fields)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = original('threading').Thread(target=self._run, name='event-log-writer', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def _run(self):
+        sleep = original('time').sleep
+        while True:
+            sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """เขียนทุก record ที่ค้างอยู่ในคิวเป็นชุดเดียว (ถูกเรียกจาก writer thread)"""
+        queue = self._queue
+        lines = []
+        while queue:
+            lines.append(json.dumps(queue.popleft(), ensure_ascii=False, separators=(',', ':'), default=str))
+        if lines:
+            self.sink.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            LOG_WRITTEN.inc(amount=len(lines))
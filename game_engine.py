@@ -0,0 +1,747 @@
+# game_engine.py
+#
+# --- แกนหลักของเกม (Engine) ที่ไม่ผูกกับ Socket ---
+# - ข้อความขาออกผ่าน `Transport` เวลาได้จาก clock ที่ฉีดเข้ามา และสุ่มด้วย random.Random ต่อห้อง จึงจำลองและเล่นซ้ำจาก journal ได้
+# - วัตถุดิบทุกชิ้นมี id และเจ้าของใน `GameState.items` ส่งแบบ at-least-once (ack_items) ชิ้นที่ไม่ได้ ack ถูกส่งซ้ำ
+# - ผู้เล่นที่หลุดถูกพักไว้พร้อมที่นั่ง (`suspend_player`/`resume_player`) ผู้เล่นอาจเป็นบอทของเซิร์ฟเวอร์ (`Player.bot`, ดู bots.py)
+
+import random
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from threading import Lock
+
+# --- ข้อมูลหลักของเกม (Constants) ---
+# การเก็บข้อมูลเหล่านี้ไว้ในระดับ Global ทำให้เข้าถึงได้ง่ายและไม่เปลี่ยนแปลง
+RECIPES = {
+    'สลัดผัก': {'ingredients': sorted(['🥬', '🍅', '🥕']), 'points': 50, 'time_bonus': 10},
+    'สปาเก็ตตี้': {'ingredients': sorted(['🍝', '🥫', '🥩']), 'points': 110, 'time_bonus': 16},
+    'ไอศกรีม': {'ingredients': sorted(['🍨', '🍒']), 'points': 35, 'time_bonus': 7},
+    'ผลไม้รวม': {'ingredients': sorted(['🍓', '🍌', '🍎']), 'points': 30, 'time_bonus': 5},
+    'ซีฟู้ดต้ม': {'ingredients': sorted(['🦞', '🍄', '🌶️']), 'points': 200, 'time_bonus': 22},
+    'ไก่ทอด': {'ingredients': sorted(['🍗', '🍟']), 'points': 60, 'time_bonus': 10},
+    'อาหารเช้าชุดใหญ่': {'ingredients': sorted(['🍳', '🍞', '🍄']), 'points': 170, 'time_bonus': 20},
+    'สเต็กแอนด์ฟรายส์': {'ingredients': sorted(['🥓', '🥕', '🍄']), 'points': 210, 'time_bonus': 24},
+    'ซูชิ': {'ingredients': sorted(['🍣', '🥬']), 'points': 130, 'time_bonus': 18},
+    'สลัดสุขภาพ': {'ingredients': sorted(['🥗', '🥕', '🍅']), 'points': 160, 'time_bonus': 18},
+    'ส้มตำ': {'ingredients': sorted(['🥗', '🌶️', '🍅', '🥜']), 'points': 140, 'time_bonus': 19},
+}
+
+ABILITIES_CONFIG = {
+    'กระทะ': {'verb': 'ทอด', 'transformations': {'🥚': '🍳', '🥩': '🥓'}},
+    'หม้อ': {'verb': 'ต้ม', 'transformations': {'🦐': '🦞', '🥔': '🍟'}},
+    'เขียง': {'verb': 'หั่น', 'transformations': {'🥬': '🥗', '🥕': '🥒','🐟': '🍣'}}
+}
+
+LEVEL_DEFINITIONS = {
+    1: {'target_score': 300, 'time': 130, 'spawn_interval': 3},
+    2: {'target_score': 475, 'time': 120, 'spawn_interval': 3},
+    3: {'target_score': 750, 'time': 110, 'spawn_interval': 3},
+}
+
+MAX_PLAYERS = 8
+MAX_PLATE_SIZE = 6
+CONVEYOR_CAPACITY = 8 # วัตถุดิบสูงสุดที่ผู้เล่น 1 คนถือได้ (บนสายพาน + ในเครื่องแปรรูป) เต็มแล้วจะไม่ได้รับวัตถุดิบใหม่
+ABILITY_PROCESSING_SECONDS = 6
+LEVEL_INTERMISSION_SECONDS = 5 # ช่วงพักระหว่างด่าน (หน้า "ผ่านด่าน!")
+MAX_ACK_BATCH = 64 # จำนวน id สูงสุดใน ack_items หนึ่งข้อความ
+
+# --- สร้างข้อมูลอ้างอิงเพื่อการค้นหาที่รวดเร็ว ---
+TRANSFORMED_TO_BASE_INGREDIENT = {transformed: base for ability_config in ABILITIES_CONFIG.values() for base, transformed in ability_config['transformations'].items()}
+TRANSFORMED_ING_INFO = {transformed: ability for ability, config in ABILITIES_CONFIG.items() for transformed in config['transformations'].values()}
+ALL_INGREDIENTS = sorted(set(ing for recipe in RECIPES.values() for ing in recipe['ingredients']))
+# วัตถุดิบทุกชนิดที่มีอยู่ในเกม (ในสูตร + วัตถุดิบตั้งต้นและผลลัพธ์ของทุกความสามารถ) ใช้ตรวจ payload จาก client
+INGREDIENT_CATALOG = frozenset(ALL_INGREDIENTS).union(TRANSFORMED_TO_BASE_INGREDIENT, TRANSFORMED_TO_BASE_INGREDIENT.values())
+NORMAL_RECIPES_KEYS = [k for k, v in RECIPES.items() if not any(ing in TRANSFORMED_TO_BASE_INGREDIENT for ing in v['ingredients'])]
+ABILITY_TO_RECIPES = {
+    ability: [
+        recipe_name for recipe_name, recipe_data in RECIPES.items()
+        if any(ing in recipe_data['ingredients'] for ing in config['transformations'].values())
+    ]
+    for ability, config in ABILITIES_CONFIG.items()
+}
+
+
+# --- Transport: ช่องทางส่งข้อความออกจาก engine ---
+
+class Transport(ABC):
+    """Interface สำหรับส่งข้อความจาก engine ไปยังผู้เล่น (`to` คือ sid หรือ room id)"""
+    @abstractmethod
+    def emit(self, event, data, to):
+        ...
+
+    def broadcast_state(self, room):
+        """ส่ง state ล่าสุดของห้องให้ทุกคน (adapter ที่ไม่ต้องการ payload จริงสามารถ override เพื่อข้ามการสร้างได้)"""
+        ui_state = room.get_augmented_state_for_ui()
+        if ui_state:
+            self.emit('update_game_state', ui_state, to=room.id)
+
+
+class NullTransport(Transport):
+    """Transport ที่ทิ้งทุกข้อความ ใช้เมื่อไม่ต้องการผลลัพธ์ขาออก"""
+    def emit(self, event, data, to):
+        pass
+
+    def broadcast_state(self, room):
+        pass
+
+
+# --- โครงสร้างหลักแบบ OOP ---
+
+class Player:
+    """เก็บข้อมูลและสถานะของผู้เล่นแต่ละคน"""
+    def __init__(self, sid, name, bot=False):
+        self.sid = sid
+        self.name = name
+        self.bot = bot # บอทของเซิร์ฟเวอร์ (ไม่มี connection)
+        self.plate = []
+        self.objective = None
+        self.ability = None
+        self.ability_processing = None # {'input': str, 'output': str, 'end_time': float, 'item_id': int}
+        self.away_since = None # เวลาที่หลุดการเชื่อมต่อ (None = เชื่อมต่ออยู่)
+
+    def assign_new_objective(self, possible_recipes, rng=random):
+        """สุ่มเป้าหมายใหม่ให้ผู้เล่น"""
+        if not possible_recipes:
+            possible_recipes = list(RECIPES.keys())
+        objective_name = rng.choice(possible_recipes)
+        self.objective = {'name': objective_name}
+
+# ตำแหน่งของวัตถุดิบที่ผู้เล่นถืออยู่
+ON_CONVEYOR = 'conveyor'
+IN_ABILITY = 'ability'
+
+class Item:
+    """วัตถุดิบ 1 ชิ้น: id ไม่ซ้ำภายในด่าน, ชื่อ, sid ของเจ้าของ และตำแหน่ง"""
+    __slots__ = ('id', 'name', 'owner', 'location')
+
+    def __init__(self, item_id, name, owner, location=ON_CONVEYOR):
+        self.id = item_id
+        self.name = name
+        self.owner = owner
+        self.location = location
+
+    def as_dict(self):
+        return {'type': 'ingredient', 'name': self.name, 'id': self.id}
+
+class GameState:
+    """จัดการสถานะโดยรวมของเกมในห้องนั้นๆ เช่น ด่าน, คะแนน, เวลา"""
+    def __init__(self, player_sids, players_map, level=1, now=None):
+        self.is_active = True
+        self.level = level
+        self.score = 0
+        self.total_score = 0
+        self.target_score = LEVEL_DEFINITIONS[level]['target_score']
+        self.time_left = LEVEL_DEFINITIONS[level]['time']
+        self.player_order_sids = player_sids
+        self.players_map = players_map # {sid: Player object}
+        self.last_spawn_time = time.time() if now is None else now
+        self.items = {} # {item_id: Item} วัตถุดิบทุกชิ้นที่ผู้เล่นถืออยู่ (ของที่ใส่จานหรือทิ้งแล้วจะถูกลบออก)
+        self.held = {sid: {} for sid in player_sids} # {sid: {item_id: Item}} ดัชนีตามเจ้าของ (ไม่เกิน CONVEYOR_CAPACITY ต่อคน)
+        self.unacked = {sid: {} for sid in player_sids} # {sid: {item_id: เวลาที่ส่งล่าสุด}} บัฟเฟอร์ส่งซ้ำ
+        self._next_item_id = 1
+
+    # --- สมุดบัญชีวัตถุดิบ: ทุกการเปลี่ยนแปลงเป็น O(1) ---
+    def has_room(self, sid):
+        held = self.held.get(sid)
+        return held is not None and len(held) < CONVEYOR_CAPACITY
+
+    def create_item(self, sid, name):
+        item = Item(self._next_item_id, name, sid)
+        self._next_item_id += 1
+        self.items[item.id] = item
+        self.held[sid][item.id] = item
+        return item
+
+    def held_item(self, sid, item_id, location=ON_CONVEYOR):
+        """วัตถุดิบ `item_id` ถ้าผู้เล่น `sid` ถืออยู่ที่ `location` จริง ไม่เช่นนั้นคืน None"""
+        item = self.items.get(item_id)
+        if item is None or item.owner != sid or item.location != location:
+            return None
+        return item
+
+    def conveyor(self, sid):
+        """วัตถุดิบบนสายพานของ `sid` (ไม่รวมชิ้นที่อยู่ในเครื่องแปรรูป)"""
+        return [item for item in self.held.get(sid, {}).values() if item.location == ON_CONVEYOR]
+
+    def transfer(self, item, sid):
+        del self.held[item.owner][item.id]
+        self.held[sid][item.id] = item
+        self.unacked[item.owner].pop(item.id, None)
+        item.owner = sid
+
+    def discard(self, item):
+        del self.items[item.id]
+        del self.held[item.owner][item.id]
+        self.unacked[item.owner].pop(item.id, None)
+
+    def drop_player(self, sid):
+        """ทิ้งวัตถุดิบทั้งหมดของผู้เล่นที่ออกจากเกม"""
+        for item_id in self.held.pop(sid, ()):
+            del self.items[item_id]
+        self.unacked.pop(sid, None)
+
+    # --- บัฟเฟอร์ส่งซ้ำ: ชิ้นที่ส่งให้เจ้าของแล้วแต่ยังไม่ได้รับ ack (ชิ้นที่ออกจากสายพานแล้วถูกลบออกเอง) ---
+    def mark_sent(self, item, now):
+        self.unacked[item.owner][item.id] = now
+
+    def ack(self, sid, item_ids):
+        pending = self.unacked.get(sid)
+        if pending:
+            for item_id in item_ids:
+                pending.pop(item_id, None)
+
+    def rebind(self, old_sid, new_sid):
+        """เปลี่ยน sid ของผู้เล่นในลำดับที่นั่งและสมุดบัญชีวัตถุดิบ (ผู้เล่นกลับมาด้วย connection ใหม่)"""
+        order = self.player_order_sids
+        if old_sid in order:
+            order[order.index(old_sid)] = new_sid
+        if old_sid in self.held:
+            held = self.held[new_sid] = self.held.pop(old_sid)
+            for item in held.values():
+                item.owner = new_sid
+        if old_sid in self.unacked:
+            self.unacked[new_sid] = self.unacked.pop(old_sid)
+
+    def due_for_retransmit(self, sid, cutoff):
+        """ชิ้นของ `sid` ที่ส่งครั้งล่าสุดก่อนเวลา `cutoff` และยังไม่ได้รับ ack"""
+        return [self.items[item_id] for item_id, sent_at in self.unacked.get(sid, {}).items() if sent_at <= cutoff]
+
+    def tick(self):
+        """อัปเดตสถานะเกมในแต่ละวินาที (ถูกเรียกโดย Master Game Loop)"""
+        if not self.is_active:
+            return
+        self.time_left -= 1
+
+    def check_ability_processing(self, current_time):
+        """ตรวจสอบการแปรรูปวัตถุดิบที่เสร็จสิ้น"""
+        finished_players = []
+        for player in self.players_map.values():
+            if player.ability_processing and current_time >= player.ability_processing['end_time']:
+                finished_players.append(player)
+        return finished_players
+
+    def get_spawnable_ingredients(self):
+        """รวบรวมวัตถุดิบที่จำเป็นสำหรับผู้เล่นทุกคนเพื่อนำไปสุ่ม"""
+        return _spawn_pool(frozenset(player.objective.get('name') for player in self.players_map.values() if player.objective))
+
+
+@lru_cache(maxsize=4096)
+def _spawn_pool(objective_names):
+    """วัตถุดิบตั้งต้นที่ต้องใช้สำหรับชุดเมนู `objective_names` (คำนวณครั้งเดียวต่อชุด ชุดที่เป็นไปได้มีไม่เกิน 2^len(RECIPES))"""
+    required_pool = set()
+    for name in objective_names:
+        if name in RECIPES:
+            for ing in RECIPES[name]['ingredients']:
+                required_pool.add(TRANSFORMED_TO_BASE_INGREDIENT.get(ing, ing))
+
+    if not required_pool: # กรณีไม่มีเป้าหมาย ให้สุ่มจากวัตถุดิบพื้นฐานทั้งหมด
+        return tuple(ing for ing in ALL_INGREDIENTS if ing not in TRANSFORMED_TO_BASE_INGREDIENT)
+
+    return tuple(sorted(required_pool)) # เรียงเพื่อให้ผลการสุ่มขึ้นกับ seed เท่านั้น
+
+class GameRoom:
+    """Class หลักในการจัดการห้องเกม 1 ห้อง"""
+    def __init__(self, room_id, host_sid, host_name, transport, clock=time.time, seed=None):
+        self.id = room_id
+        self.host_sid = host_sid
+        self.players = {host_sid: Player(host_sid, host_name)}
+        self.game_state = None
+        self.intermission_until = None # เวลาที่ช่วงพักระหว่างด่านจะจบ (None = ไม่ได้พักอยู่)
+        self.transport = transport
+        self.clock = clock
+        self.now = clock() # เวลาของคำสั่งที่กำลังประมวลผลอยู่
+        self.recorder = None # RoomJournal (ถ้าเปิดการบันทึกไว้) ดู journal.py
+        self.analytics = None # AnalyticsSink (ถ้าเปิดไว้) ดู analytics.py
+        self.on_finish = None # callback(room, outcome, level, total_score) เมื่อเกมจบ ตั้งค่าโดยเซิร์ฟเวอร์ (เช่น leaderboard)
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(63)
+        self.rng = random.Random(self.seed)
+        self.last_action_at = self.now # เวลาของ action/ability ล่าสุด (ใช้ตัดสินว่าห้องไม่มีความเคลื่อนไหว)
+        self.spawn_batch = 1 # รวมการสุ่มวัตถุดิบกี่รอบเป็นข้อความเดียว (ปรับโดย overload controller ของเซิร์ฟเวอร์)
+        self.retransmit_after = None # วินาทีที่รอ ack ก่อนส่งวัตถุดิบซ้ำ (None = ไม่ส่งซ้ำ) ตั้งค่าโดยเซิร์ฟเวอร์
+        self.public = False # แสดงในรายการห้องสาธารณะตอนรอเริ่มเกม (ดู room_browser.py)
+        self.lock = Lock() # ป้องกัน Race Condition เมื่อมีการเข้าถึงข้อมูลพร้อมกัน
+
+    @property
+    def needs_update(self):
+        """ห้องที่ Master Game Loop ต้องเรียก update() (กำลังเล่น หรือรอเริ่มด่านถัดไป)"""
+        return bool(self.game_state and (self.game_state.is_active or self.intermission_until is not None))
+
+    @property
+    def phase(self):
+        """สถานะของห้อง: 'lobby' (รอเริ่มเกม), 'active' (กำลังเล่น) หรือ 'intermission' (พักระหว่างด่าน)"""
+        if self.intermission_until is not None:
+            return 'intermission'
+        if self.game_state and self.game_state.is_active:
+            return 'active'
+        return 'lobby'
+
+    def add_player(self, sid, name, bot=False):
+        with self.lock:
+            if len(self.players) < MAX_PLAYERS:
+                self.now = self.clock()
+                if self.recorder: self.recorder.record_join(self.now, sid, name, bot)
+                self.players[sid] = Player(sid, name, bot)
+                return True
+            return False
+
+    def remove_player(self, sid):
+        with self.lock:
+            self.now = self.clock()
+            if self.recorder: self.recorder.record_leave(self.now, sid)
+            if sid in self.players:
+                del self.players[sid]
+            if not self.players:
+                return 'delete_room' # สัญญาณให้ลบห้องนี้ทิ้ง
+            if sid == self.host_sid: # host คนใหม่เป็นผู้เล่นจริงคนแรก (ถ้ามี)
+                self.host_sid = next((p.sid for p in self.players.values() if not p.bot), next(iter(self.players)))
+            if self.game_state:
+                self.game_state.drop_player(sid)
+            if self.game_state and self.game_state.is_active:
+                if sid in self.game_state.player_order_sids:
+                    self.game_state.player_order_sids.remove(sid)
+                if sid in self.game_state.players_map:
+                    del self.game_state.players_map[sid]
+                if len(self.game_state.player_order_sids) < 1:
+                    self.game_state.is_active = False
+                    return 'game_over_disconnect'
+        return 'ok'
+
+    def suspend_player(self, sid):
+        """ผู้เล่นหลุดการเชื่อมต่อ: เก็บที่นั่งและของทั้งหมดไว้รอ resume_player (เกมของคนอื่นเดินต่อตามปกติ)"""
+        with self.lock:
+            player = self.players.get(sid)
+            if player is None:
+                return False
+            player.away_since = self.clock()
+        self.transport.emit('update_lobby', self.get_lobby_info(), to=self.id)
+        return True
+
+    def resume_player(self, old_sid, new_sid):
+        """ย้ายผู้เล่นจาก `old_sid` ไปยัง connection ใหม่ คืน snapshot สำหรับ client (None = ไม่มีที่นั่งนี้แล้ว)"""
+        with self.lock:
+            player = self.players.get(old_sid)
+            if player is None:
+                return None
+            self.now = self.clock()
+            if self.recorder: self.recorder.record_resume(self.now, old_sid, new_sid)
+            # dict ใหม่ที่ลำดับเดิม (ลำดับของ players มีผลกับการแจกความสามารถ)
+            self.players = {(new_sid if sid == old_sid else sid): p for sid, p in self.players.items()}
+            player.sid = new_sid
+            player.away_since = None
+            if self.host_sid == old_sid:
+                self.host_sid = new_sid
+            snapshot = {'room_id': self.id, 'your_sid': new_sid, 'your_name': player.name, 'phase': self.phase,
+                        'lobby': self.get_lobby_info(), 'state': None, 'items': []}
+            game_state = self.game_state
+            if game_state:
+                game_state.players_map = self.players
+                game_state.rebind(old_sid, new_sid)
+                snapshot['state'] = self.get_augmented_state_for_ui()
+                # วัตถุดิบบนสายพานทั้งหมดอยู่ใน snapshot แล้ว ถือว่าเพิ่งส่ง (ถ้า snapshot หายจะถูกส่งซ้ำตามปกติ)
+                items = game_state.conveyor(new_sid)
+                for item in items:
+                    game_state.mark_sent(item, self.now)
+                snapshot['items'] = [item.as_dict() for item in items]
+                order = game_state.player_order_sids
+                if new_sid in order:
+                    index = order.index(new_sid)
+                    snapshot['left_neighbor'] = self.players[order[index - 1]].name
+                    snapshot['right_neighbor'] = self.players[order[(index + 1) % len(order)]].name
+        self.transport.emit('update_lobby', snapshot['lobby'], to=self.id)
+        if self.game_state and self.game_state.is_active:
+            self.transport.broadcast_state(self)
+        return snapshot
+
+    def handle_player_left(self, sid):
+        """นำผู้เล่นออกจากห้องแล้วแจ้งผู้เล่นที่เหลือ คืนผลลัพธ์จาก remove_player"""
+        was_host = sid == self.host_sid
+        result = self.remove_player(sid)
+        if result == 'delete_room':
+            return result
+
+        if result == 'game_over_disconnect':
+            total_final_score = self.game_state.total_score + self.game_state.score if self.game_state else 0
+            self.transport.emit('game_over', {'total_score': total_final_score, 'message': 'ผู้เล่นไม่พอที่จะเล่นต่อ เกมจบลง'}, to=self.id)
+            self._finished('abandoned', total_final_score)
+            self.game_state = None
+            self.intermission_until = None
+
+        # อัปเดตข้อมูล Lobby และเพื่อนบ้าน
+        self.transport.emit('update_lobby', self.get_lobby_info(), to=self.id)
+        if was_host: # ถ้า host เดิมออก
+            self.transport.emit('new_host', {'host_sid': self.host_sid}, to=self.id)
+
+        if self.game_state and self.game_state.is_active:
+            self._emit_neighbors('update_neighbors')
+            self.transport.broadcast_state(self)
+        return result
+
+    def _emit_neighbors(self, event, extra_for_sid=None):
+        """ส่งชื่อเพื่อนบ้านซ้าย/ขวาให้ผู้เล่นแต่ละคนตามลำดับที่นั่ง"""
+        player_sids = self.game_state.player_order_sids
+        for i, sid in enumerate(player_sids):
+            left_sid = player_sids[i - 1]
+            right_sid = player_sids[(i + 1) % len(player_sids)]
+            payload = extra_for_sid(sid) if extra_for_sid else {}
+            payload['left_neighbor'] = self.players[left_sid].name
+            payload['right_neighbor'] = self.players[right_sid].name
+            self.transport.emit(event, payload, to=sid)
+
+    def start_game(self):
+        with self.lock:
+            self.now = self.clock()
+            if self.recorder: self.recorder.record_start(self.now)
+            player_sids = list(self.players.keys())
+            self.rng.shuffle(player_sids)
+            self.game_state = GameState(player_sids, self.players, now=self.now)
+            self.intermission_until = None
+            if self.analytics: self.analytics.record(self.now, 'level_start', self.id, 1, len(player_sids))
+            self._assign_abilities()
+            self._assign_all_objectives()
+
+            # ส่งข้อมูลเริ่มต้นเกมให้ผู้เล่นทุกคน
+            ui_state = self.get_augmented_state_for_ui()
+            self._emit_neighbors('game_started', lambda sid: {
+                'initial_state': ui_state,
+                'your_sid': sid,
+                'your_name': self.players[sid].name,
+            })
+
+    def _assign_abilities(self):
+        """สุ่มความสามารถให้ผู้เล่นในห้อง"""
+        abilities_pool = list(ABILITIES_CONFIG.keys())
+        self.rng.shuffle(abilities_pool)
+        for i, player in enumerate(self.players.values()):
+            player.ability = abilities_pool[i] if i < len(abilities_pool) else None
+            player.ability_processing = None
+
+    def _assign_all_objectives(self):
+        """สุ่มเป้าหมายให้ผู้เล่นทุกคน"""
+        active_abilities = {p.ability for p in self.players.values() if p.ability}
+        possible_recipes = list(NORMAL_RECIPES_KEYS)
+        for ability in ABILITIES_CONFIG: # วนตามลำดับคงที่เพื่อให้ผลการสุ่มขึ้นกับ seed เท่านั้น
+            if ability in active_abilities:
+                possible_recipes.extend(ABILITY_TO_RECIPES.get(ability, []))
+
+        for player in self.players.values():
+            player.assign_new_objective(possible_recipes, self.rng)
+            if self.analytics: self.analytics.record(self.now, 'objective', self.id, self.game_state.level, player.objective['name'])
+
+    def update(self):
+        """ฟังก์ชันที่ถูกเรียกโดย Master Game Loop ทุกๆ 1 วินาที"""
+        with self.lock:
+            if not self.game_state:
+                return
+            self.now = self.clock()
+            if self.recorder: self.recorder.record_tick(self.now, self.spawn_batch)
+            if self.intermission_until is not None:
+                if self.now >= self.intermission_until:
+                    self._start_next_level()
+                return
+            game_state = self.game_state
+            if not game_state.is_active:
+                return
+
+            game_state.tick()
+            now = self.now
+
+            # 1. ตรวจสอบการแปรรูปวัตถุดิบ
+            for player in game_state.check_ability_processing(now):
+                item = game_state.held_item(player.sid, player.ability_processing['item_id'], IN_ABILITY)
+                if item is not None:
+                    item.name = player.ability_processing['output']
+                    item.location = ON_CONVEYOR
+                    self._deliver(item)
+                player.ability_processing = None
+
+            # 2. สุ่มวัตถุดิบ (ถ้า spawn_batch > 1 จะสุ่มห่างขึ้นแต่ได้ครั้งละหลายชิ้นในข้อความเดียว อัตราวัตถุดิบเท่าเดิม)
+            #    ผู้เล่นที่สายพานเต็มจะไม่ได้รับวัตถุดิบ (ไม่มีข้อความส่งออก)
+            spawn_batch = self.spawn_batch
+            if now - game_state.last_spawn_time > LEVEL_DEFINITIONS[game_state.level]['spawn_interval'] * spawn_batch:
+                spawnable_ings = game_state.get_spawnable_ingredients()
+                if spawnable_ings:
+                    choice = self.rng.choice
+                    held = game_state.held
+                    for sid in game_state.player_order_sids:
+                        free = CONVEYOR_CAPACITY - len(held[sid])
+                        if free <= 0:
+                            continue
+                        if spawn_batch == 1:
+                            self._deliver(game_state.create_item(sid, choice(spawnable_ings)))
+                        else:
+                            self._deliver_many(sid, [game_state.create_item(sid, choice(spawnable_ings))
+                                                     for _ in range(min(spawn_batch, free))])
+                game_state.last_spawn_time = now
+
+            # 3. ส่งซ้ำวัตถุดิบที่ client ยังไม่ตอบรับภายในเวลาที่กำหนด
+            if self.retransmit_after is not None:
+                cutoff = now - self.retransmit_after
+                for sid in game_state.player_order_sids:
+                    items = game_state.due_for_retransmit(sid, cutoff)
+                    if items:
+                        self._deliver_many(sid, items, retransmit=True)
+
+            # 4. ตรวจสอบเงื่อนไขจบเกม (หมดเวลา)
+            if game_state.time_left <= 0:
+                game_state.is_active = False
+                total_final_score = game_state.total_score + game_state.score
+                self.transport.emit('game_over', {'total_score': total_final_score, 'message': 'หมดเวลา!'}, to=self.id)
+                self._finished('timeout', total_final_score)
+                self.game_state = None # รีเซ็ตสถานะเกม
+
+    def _deliver(self, item):
+        """ส่งวัตถุดิบ 1 ชิ้นให้เจ้าของ และเก็บไว้ในบัฟเฟอร์ส่งซ้ำจนกว่าจะได้ ack (บอทอ่านจาก GameState.conveyor เอง)"""
+        if self.players[item.owner].bot:
+            return
+        self.game_state.mark_sent(item, self.now)
+        self.transport.emit('receive_item', {'item': item.as_dict()}, to=item.owner)
+
+    def _deliver_many(self, sid, items, retransmit=False):
+        if self.players[sid].bot:
+            return
+        for item in items:
+            self.game_state.mark_sent(item, self.now)
+        payload = {'items': [item.as_dict() for item in items]}
+        if retransmit:
+            payload['retransmit'] = True
+        self.transport.emit('receive_items', payload, to=sid)
+
+    def ack_items(self, sid, level, item_ids):
+        """client ยืนยันว่าได้รับวัตถุดิบแล้ว (ack ของด่านอื่นถูกทิ้ง เพราะ id เริ่มใหม่ทุกด่าน)
+        ไม่เปลี่ยนสถานะของเกม จึงไม่ถูกบันทึกลง journal"""
+        with self.lock:
+            if self.game_state and self.game_state.level == level:
+                self.game_state.ack(sid, item_ids)
+
+    def broadcast_state(self):
+        """ส่ง state ล่าสุดให้ผู้เล่นทุกคนในห้อง (ถูกเรียกโดย Master Game Loop หลัง update)"""
+        if self.game_state:
+            self.transport.broadcast_state(self)
+
+    def get_lobby_info(self):
+        """สร้างข้อมูลสำหรับหน้า Lobby"""
+        return {
+            'players': [{'sid': p.sid, 'name': p.name, 'away': p.away_since is not None, 'bot': p.bot} for p in self.players.values()],
+            'host_sid': self.host_sid,
+            'room_id': self.id
+        }
+
+    def get_resync_state(self, sid):
+        """สถานะล่าสุด + วัตถุดิบบนสายพานของ `sid` สำหรับ client ที่ตามข้อความไม่ทัน (แทนข้อความที่ค้างทั้งหมด)"""
+        with self.lock:
+            if not self.game_state:
+                return {'state': None, 'items': []}
+            items = [item.as_dict() for item in self.game_state.conveyor(sid)]
+            return {'state': self.get_augmented_state_for_ui(), 'items': items}
+
+    def get_augmented_state_for_ui(self):
+        """สร้างข้อมูลเกมทั้งหมดเพื่อส่งไปอัปเดตหน้า UI"""
+        if not self.game_state: return None
+
+        # สร้างสำเนาข้อมูลพื้นฐาน
+        ui_state = {
+            'is_active': self.game_state.is_active,
+            'level': self.game_state.level,
+            'score': self.game_state.score,
+            'total_score': self.game_state.total_score,
+            'target_score': self.game_state.target_score,
+            'time_left': self.game_state.time_left,
+            'player_order_sids': self.game_state.player_order_sids,
+        }
+
+        # สร้างข้อมูลผู้เล่นและเป้าหมาย
+        ui_state['players_state'] = {
+            sid: {
+                'plate': p.plate,
+                'objective': p.objective,
+                'ability': p.ability,
+                'ability_processing': p.ability_processing
+            } for sid, p in self.players.items() if sid in self.game_state.players_map
+        }
+
+        # สร้างข้อมูลเป้าหมายพร้อมคำใบ้
+        all_player_objectives = []
+        for player in self.game_state.players_map.values():
+            if player.objective and 'name' in player.objective:
+                recipe_details = RECIPES[player.objective['name']]
+                ingredients_with_hints = [
+                    {'name': ing, 'hint': TRANSFORMED_ING_INFO.get(ing), 'base': TRANSFORMED_TO_BASE_INGREDIENT.get(ing)}
+                    for ing in recipe_details['ingredients']
+                ]
+                all_player_objectives.append({
+                    'player_name': player.name,
+                    'objective_name': player.objective['name'],
+                    'ingredients': ingredients_with_hints,
+                    'points': recipe_details['points']
+                })
+        ui_state['all_player_objectives'] = all_player_objectives
+        return ui_state
+
+    def handle_player_action(self, sid, data):
+        """จัดการ Action ต่างๆ จากผู้เล่น"""
+        with self.lock:
+            self.now = self.clock()
+            if self.recorder: self.recorder.record_action(self.now, sid, data)
+            self.last_action_at = self.now
+            player = self.players.get(sid)
+            if not player or not self.game_state or not self.game_state.is_active:
+                return
+
+            action_type = data.get('type')
+            game_state = self.game_state
+
+            if action_type in ('pass_item', 'add_to_plate', 'trash_item'):
+                item = game_state.held_item(sid, data.get('item_id'))
+                if item is None:
+                    # client อ้างถึงวัตถุดิบที่ไม่ได้ถืออยู่ (เช่น ข้อความค้างจากด่านก่อน) ไม่มีอะไรเปลี่ยน
+                    self.transport.emit('action_fail', {'message': 'ไม่พบวัตถุดิบนี้บนสายพานของคุณ', 'sound': 'error'}, to=sid)
+                    return
+
+            if action_type == 'pass_item':
+                player_sids = game_state.player_order_sids
+                if len(player_sids) <= 1:
+                    self._deliver(item) # ส่งคืน
+                    return
+
+                player_index = player_sids.index(sid)
+                direction = data.get('direction')
+                target_sid = player_sids[player_index - 1] if direction == 'left' else player_sids[(player_index + 1) % len(player_sids)]
+                if not game_state.has_room(target_sid):
+                    self.transport.emit('action_fail', {'message': f'สายพานของ {self.players[target_sid].name} เต็มแล้ว!', 'sound': 'error'}, to=sid)
+                    self._deliver(item) # ส่งคืน
+                    return
+                game_state.transfer(item, target_sid)
+                self._deliver(item)
+                if self.analytics: self.analytics.record(self.now, 'passed', self.id, game_state.level, item.name)
+
+            elif action_type == 'add_to_plate':
+                if len(player.plate) >= MAX_PLATE_SIZE:
+                    self.transport.emit('action_fail', {'message': 'จานเต็มแล้ว!', 'sound': 'error'}, to=sid)
+                    self._deliver(item) # ส่งคืน
+                    return
+                game_state.discard(item)
+                player.plate = player.plate + [item.name]
+
+            elif action_type == 'remove_from_plate':
+                plate = list(player.plate)
+                for name in data.get('ingredients', ()):
+                    if name in plate:
+                        plate.remove(name)
+                player.plate = plate
+
+            elif action_type == 'trash_item':
+                game_state.discard(item)
+
+            elif action_type == 'submit_order':
+                self._handle_submit_order(player)
+
+            # ส่ง state ล่าสุดให้ทุกคนหลัง action
+            if self.game_state:
+                self.transport.broadcast_state(self)
+
+    def _handle_submit_order(self, player):
+        """ตรรกะการส่งอาหาร"""
+        player_plate = sorted(player.plate)
+        objective_name = player.objective.get('name')
+        if not objective_name or objective_name not in RECIPES:
+            return
+
+        required_ingredients = RECIPES[objective_name]['ingredients']
+        if player_plate == required_ingredients:
+            # ทำอาหารสำเร็จ
+            recipe_data = RECIPES[objective_name]
+            if self.analytics: self.analytics.record(self.now, 'submitted', self.id, self.game_state.level, objective_name)
+            self.game_state.score += recipe_data['points']
+            self.game_state.time_left = min(self.game_state.time_left + recipe_data['time_bonus'], 999)
+
+            player.plate = []
+            self._assign_all_objectives() # สุ่มเป้าหมายใหม่ให้ทุกคน
+
+            self.transport.emit('action_success', {'message': f'ทำ {objective_name} สำเร็จ! (+{recipe_data["points"]} คะแนน)', 'sound': 'success'}, to=player.sid)
+
+            # ตรวจสอบเงื่อนไขผ่านด่าน
+            if self.game_state.score >= self.game_state.target_score:
+                self._level_up()
+        else:
+            if self.analytics: self.analytics.record(self.now, 'failed', self.id, self.game_state.level, objective_name)
+            self.transport.emit('action_fail', {'message': 'สูตรไม่ถูกต้อง! ลองอีกครั้ง', 'sound': 'error'}, to=player.sid)
+
+    def _level_up(self):
+        """ตรรกะการเลื่อนขึ้นด่านใหม่"""
+        current_level = self.game_state.level
+        self.game_state.total_score += self.game_state.score
+        if self.analytics: self.analytics.record(self.now, 'level_complete', self.id, current_level, self.game_state.score)
+        next_level = current_level + 1
+
+        if next_level in LEVEL_DEFINITIONS:
+            # ไปด่านต่อไป: หยุดเกมชั่วคราว แล้วให้ update() เริ่มด่านใหม่เมื่อครบช่วงพัก
+            self.game_state.is_active = False
+            self.intermission_until = self.now + LEVEL_INTERMISSION_SECONDS
+            self.transport.emit('level_complete', {'level': current_level, 'level_score': self.game_state.score, 'total_score': self.game_state.total_score}, to=self.id)
+        else:
+            # ชนะเกม
+            self.game_state.is_active = False
+            self.transport.emit('game_won', {'total_score': self.game_state.total_score}, to=self.id)
+            self._finished('won', self.game_state.total_score)
+            self.game_state = None
+
+    def _finished(self, outcome, total_score):
+        """แจ้งผลของเกมที่จบแล้ว ('won', 'timeout' หรือ 'abandoned') ให้ on_finish (เรียกก่อนล้าง game_state)"""
+        if self.on_finish:
+            self.on_finish(self, outcome, self.game_state.level if self.game_state else 1, total_score)
+
+    def _start_next_level(self):
+        """รีเซ็ตสำหรับด่านใหม่หลังจบช่วงพัก (ถูกเรียกจาก update() ขณะถือ lock)"""
+        next_level = self.game_state.level + 1
+        total_score = self.game_state.total_score # ใช้ total_score เดิม
+        player_sids = list(self.players.keys())
+        self.rng.shuffle(player_sids)
+        self.game_state = GameState(player_sids, self.players, level=next_level, now=self.now)
+        self.game_state.total_score = total_score
+        self.intermission_until = None
+        if self.analytics: self.analytics.record(self.now, 'level_start', self.id, next_level, len(player_sids))
+        self._assign_abilities()
+        self._assign_all_objectives()
+
+        self.transport.emit('clear_all_items', {}, to=self.id)
+        self.transport.emit('start_next_level', self.get_augmented_state_for_ui(), to=self.id)
+
+    def use_ability(self, sid, item_id):
+        with self.lock:
+            self.now = self.clock()
+            if self.recorder: self.recorder.record_ability(self.now, sid, item_id)
+            self.last_action_at = self.now
+            player = self.players.get(sid)
+            if not player or not self.game_state or not self.game_state.is_active: return
+
+            item = self.game_state.held_item(sid, item_id)
+            if item is None:
+                self.transport.emit('action_fail', {'message': 'ไม่พบวัตถุดิบนี้บนสายพานของคุณ', 'sound': 'error'}, to=sid)
+                return
+            item_name = item.name
+
+            if not player.ability or player.ability_processing:
+                self.transport.emit('action_fail', {'message': 'ไม่สามารถใช้ความสามารถได้ในขณะนี้', 'sound': 'error'}, to=sid)
+                # [FIX] ส่งวัตถุดิบกลับคืนถ้าใช้ความสามารถไม่ได้
+                self._deliver(item)
+                return
+
+            ability_config = ABILITIES_CONFIG.get(player.ability)
+            if not ability_config or item_name not in ability_config['transformations']:
+                self.transport.emit('action_fail', {'message': 'วัตถุดิบนี้ใช้กับความสามารถของคุณไม่ได้', 'sound': 'error'}, to=sid)
+                # [FIX] ส่งวัตถุดิบกลับคืนถ้าวัตถุดิบไม่ถูกต้อง
+                self._deliver(item)
+                return
+
+            output_item = ability_config['transformations'][item_name]
+            item.location = IN_ABILITY # ยังนับเป็นของที่ผู้เล่นถืออยู่ ผลลัพธ์จึงกลับเข้าสายพานได้เสมอ
+            self.game_state.unacked[sid].pop(item.id, None)
+            player.ability_processing = {'input': item_name, 'output': output_item, 'end_time': self.now + ABILITY_PROCESSING_SECONDS,
+                                         'item_id': item.id}
+
+            if self.analytics: self.analytics.record(self.now, 'ability', self.id, self.game_state.level, item_name)
+            verb = ability_config['verb']
+            self.transport.emit('action_success', {'message': f'กำลัง{verb}{item_name}...', 'sound': 'click'}, to=sid)
+
+            self.transport.broadcast_state(self)
@@ -0,0 +1,105 @@
+# hub_watchdog.py
+#
+# --- ตรวจจับ greenlet ที่ยึด hub ของ eventlet ไว้นานเกินไป ---
+# ทุกห้องทำงานบน hub เดียว ถ้ามีโค้ดที่ block (print ไปยัง stdout ที่ช้า, สร้าง state ที่ใช้ CPU มาก) ทุกห้องจะค้างไปด้วย
+# 1. heartbeat greenlet ตื่นทุก `interval` วินาทีแล้วบันทึกเวลา พร้อมวัดว่าตื่นช้ากว่ากำหนดเท่าไร (hub latency)
+# 2. watchdog เป็น OS thread จริง (ไม่ถูก monkey patch) คอยดูว่า heartbeat หยุดไปนานเกิน `threshold` หรือไม่
+#    ถ้าใช่ จะจับ stack ของ hub thread ด้วย sys._current_frames() ซึ่งก็คือ stack ของ greenlet ที่กำลังยึด hub อยู่
+#    พร้อม handler/ห้องที่กำลังทำงาน (อ่านจาก stack เดียวกันนั้น ดู instrumentation.context_from_stack)
+# 3. เหตุการณ์ล่าสุดเก็บไว้ในหน่วยความจำ (ดูได้ที่ /admin/blocking) และเขียนลงไฟล์ log แบบ JSON lines ที่หมุนไฟล์ตามขนาด
+
+import json
+import sys
+import time
+import traceback
+from collections import deque
+
+from event_log import RotatingFile
+from metrics import Counter, Histogram
+from os_threads import original
+
+HUB_LATENCY = Histogram('game_hub_latency_seconds', 'heartbeat ของ hub ตื่นช้ากว่ากำหนดเท่าไร')
+HUB_BLOCKED = Counter('game_hub_blocked_total', 'จำนวนครั้งที่มี greenlet ยึด hub นานเกิน threshold')
+
+
+class BlockingWatchdog:
+    """ตรวจจับการ block ของ hub แล้วเก็บ stack ของ greenlet ต้นเหตุ"""
+    def __init__(self, threshold=0.1, interval=0.02, log_path=None, context=None, history=100):
+        self.threshold = threshold
+        self.interval = interval
+        self.log = RotatingFile(log_path) if log_path else None
+        self.context = context # callable(frame) ที่คืน dict ของ handler/ห้องจาก stack ของ hub (หรือ None)
+        self.events = deque(maxlen=history)
+        self.hub_thread_id = None
+        self.last_beat = time.monotonic()
+        self._current = None # เหตุการณ์ที่ยังไม่จบ (hub ยังถูกยึดอยู่)
+        self._next_id = 1
+
+    def start(self, start_background_task, sleep):
+        """เริ่ม heartbeat greenlet บน hub และ watchdog thread (ส่ง socketio.start_background_task/socketio.sleep มา)"""
+        start_background_task(self._heartbeat, sleep)
+        thread = original('threading').Thread(target=self._watch, name='hub-watchdog', daemon=True)
+        thread.start()
+        return thread
+
+    def _heartbeat(self, sleep):
+        self.hub_thread_id = original('_thread').get_ident()
+        while True:
+            expected = time.monotonic() + self.interval
+            sleep(self.interval)
+            now = time.monotonic()
+            HUB_LATENCY.observe(max(0.0, now - expected))
+            self.last_beat = now
+
+    def _watch(self):
+        sleep = original('time').sleep
+        while True:
+            sleep(self.interval / 2)
+            self.check()
+
+    def check(self):
+        """ตรวจหนึ่งครั้ง (ถูกเรียกจาก watchdog thread)"""
+        beat = self.last_beat
+        stalled = time.monotonic() - beat - self.interval
+        if self._current is None:
+            if stalled > self.threshold and self.hub_thread_id is not None:
+                self._capture(beat, stalled)
+        elif beat != self._current['_beat']:
+            self._finish(beat)
+
+    def _capture(self, beat, stalled):
+        frame = sys._current_frames().get(self.hub_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        event = {
+            'id': self._next_id,
+            'detected_at': time.time(),
+            'blocked_ms': round(stalled * 1000, 1),
+            'finished': False,
+            'context': self.context(frame) if self.context and frame is not None else None,
+            'stack': [line.rstrip('\n') for line in stack],
+            '_beat': beat,
+        }
+        self._next_id += 1
+        self._current = event
+        self.events.append(event)
+        HUB_BLOCKED.inc()
+        self._write(event)
+
+    def _finish(self, beat):
+        event = self._current
+        event['blocked_ms'] = round(max(0.0, beat - event['_beat'] - self.interval) * 1000, 1)
+        event['finished'] = True
+        self._current = None
+        self._write({'id': event['id'], 'finished': True, 'blocked_ms': event['blocked_ms']})
+
+    def _write(self, event):
+        if self.log:
+            record = {key: value for key, value in event.items() if not key.startswith('_')}
+            self.log.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+
+    def report(self):
+        return {
+            'threshold_ms': self.threshold * 1000,
+            'events': [{key: value for key, value in event.items() if not key.startswith('_')}
+                       for event in reversed(list(self.events))],
+        }
@@ -0,0 +1,339 @@
+# instrumentation.py
+#
+# --- Middleware วัดผลของทุก Socket.IO handler และทุกข้อความขาออก ---
+# 1. `Instrumentation.on(event)` ใช้แทน @socketio.on: จับเวลา handler, เวลารอ lock, ห้องที่เกี่ยวข้อง
+#    และข้อความ/ไบต์ที่ handler ส่งออก (นับจาก context ของ greenlet ที่กำลังทำงาน)
+# 2. ขนาดข้อความขาเข้า/ขาออกนับที่ชั้น engine.io จากข้อความที่ encode แล้ว จึงไม่ต้อง encode ซ้ำ
+# 3. ผลถูกรวมเป็นช่วงเวลาย้อนหลัง (rolling window) ใช้ดูรายงาน "handler ที่ช้าที่สุด" (เรียงตาม p99) ได้ขณะรัน
+#
+# 4. ถ้าส่ง logger (event_log.StructuredLogger) มา ทุก call จะถูกบันทึกเป็น log พร้อม sid/ห้อง/เวลา (สุ่มเก็บตาม sample_rates)
+#
+# ทุกอย่างถูกเขียนจาก hub ของ eventlet (thread เดียว) จึงไม่ใช้ lock เหมือนกับ metrics.py
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+from flask import has_request_context, request
+
+from metrics import Counter, Histogram
+from validation import ROOM_ID_LENGTH
+
+HANDLER_SECONDS = Histogram('game_handler_seconds', 'เวลาที่ใช้ใน Socket.IO handler แยกตาม event (tick = update ของแต่ละห้องใน Master Game Loop)', ['event'])
+LOCK_WAIT_SECONDS = Histogram('game_lock_wait_seconds', 'เวลาที่รอ lock (rooms = rooms_lock, room = GameRoom.lock)', ['lock'])
+MESSAGES_SENT = Counter('game_messages_sent_total', 'จำนวนข้อความที่ส่งถึง client แยกตาม event (นับต่อผู้รับ)', ['event'])
+BYTES_SENT = Counter('game_bytes_sent_total', 'จำนวนไบต์ที่ส่งถึง client แยกตาม event (นับต่อผู้รับ)', ['event'])
+MESSAGES_RECEIVED = Counter('game_messages_received_total', 'จำนวนข้อความที่ได้รับจาก client แยกตาม event', ['event'])
+BYTES_RECEIVED = Counter('game_bytes_received_total', 'จำนวนไบต์ที่ได้รับจาก client แยกตาม event', ['event'])
+
+# bucket แบบ geometric (ห่างกัน 20%) ตั้งแต่ 10µs ถึงราว 20 วินาที ใช้ประมาณค่า percentile ใน rolling window
+PERCENTILE_BUCKETS = tuple(1e-5 * 1.2 ** i for i in range(80))
+
+
+def packet_event(data):
+    """ดึงชื่อ event จากข้อความ Socket.IO ที่ encode แล้ว เช่น '2["player_action",{...}]'"""
+    start = data.find('["')
+    if start == -1:
+        return 'other'
+    end = data.find('"', start + 2)
+    return data[start + 2:end] if end != -1 else 'other'
+
+
+def _room_key(value):
+    """room_id จาก payload ที่ยังไม่ผ่านการตรวจ: ใช้เป็น key ของสถิติ/log เฉพาะเมื่อเป็นรหัสห้องที่ถูกรูปแบบ"""
+    return value if value.__class__ is str and len(value) == ROOM_ID_LENGTH else None
+
+
+def _text_size(data):
+    return len(data) if data.isascii() else len(data.encode('utf-8'))
+
+
+class EventWindow:
+    """สถิติของ event หนึ่งภายใน slot เดียวของ rolling window"""
+    __slots__ = ('calls', 'seconds', 'max_seconds', 'buckets', 'lock_wait', 'max_lock_wait',
+                 'messages_in', 'bytes_in', 'messages_out', 'bytes_out')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(PERCENTILE_BUCKETS) + 1)
+        self.lock_wait = 0.0
+        self.max_lock_wait = 0.0
+        self.messages_in = self.bytes_in = self.messages_out = self.bytes_out = 0
+
+    def merge(self, other):
+        self.calls += other.calls
+        self.seconds += other.seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+        self.lock_wait += other.lock_wait
+        self.max_lock_wait = max(self.max_lock_wait, other.max_lock_wait)
+        self.messages_in += other.messages_in
+        self.bytes_in += other.bytes_in
+        self.messages_out += other.messages_out
+        self.bytes_out += other.bytes_out
+
+    def percentile(self, p):
+        """ค่าประมาณของ percentile (ขอบบนของ bucket ที่ครอบคลุม แต่ไม่เกินค่าสูงสุดที่พบจริง)"""
+        if not self.calls:
+            return 0.0
+        rank = p / 100.0 * self.calls
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                bound = PERCENTILE_BUCKETS[i] if i < len(PERCENTILE_BUCKETS) else self.max_seconds
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+
+    def summary(self, seconds):
+        calls = self.calls
+        return {
+            'calls': calls,
+            'calls_per_second': round(calls / seconds, 2),
+            'mean_ms': round(self.seconds / calls * 1000, 3) if calls else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'total_ms': round(self.seconds * 1000, 3),
+            'lock_wait_mean_ms': round(self.lock_wait / calls * 1000, 3) if calls else 0.0,
+            'lock_wait_max_ms': round(self.max_lock_wait * 1000, 3),
+            'messages_in': self.messages_in,
+            'bytes_in': self.bytes_in,
+            'messages_out': self.messages_out,
+            'bytes_out': self.bytes_out,
+        }
+
+
+class RollingWindow:
+    """เก็บสถิติเป็น slot ละ `slot_seconds` วินาที ย้อนหลังได้สูงสุด `window_seconds` วินาที"""
+    def __init__(self, window_seconds=60, slot_seconds=5, clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.slot_seconds = slot_seconds
+        self.clock = clock
+        self._slots = [None] * (int(window_seconds // slot_seconds) + 1) # [(slot id, {event: EventWindow}, {room: [วินาที, ไบต์]})]
+
+    def _current(self):
+        slot_id = int(self.clock() // self.slot_seconds)
+        index = slot_id % len(self._slots)
+        slot = self._slots[index]
+        if slot is None or slot[0] != slot_id:
+            slot = self._slots[index] = (slot_id, {}, {})
+        return slot
+
+    def _event(self, event):
+        events = self._current()[1]
+        stats = events.get(event)
+        if stats is None:
+            stats = events[event] = EventWindow()
+        return stats
+
+    def record_call(self, event, room, seconds, lock_wait, messages_out, bytes_out):
+        _, events, rooms = self._current()
+        stats = events.get(event)
+        if stats is None:
+            stats = events[event] = EventWindow()
+        stats.calls += 1
+        stats.seconds += seconds
+        if seconds > stats.max_seconds:
+            stats.max_seconds = seconds
+        stats.buckets[bisect_left(PERCENTILE_BUCKETS, seconds)] += 1
+        stats.lock_wait += lock_wait
+        if lock_wait > stats.max_lock_wait:
+            stats.max_lock_wait = lock_wait
+        stats.messages_out += messages_out
+        stats.bytes_out += bytes_out
+        if room is not None:
+            totals = rooms.get(room)
+            if totals is None:
+                totals = rooms[room] = [0.0, 0]
+            totals[0] += seconds
+            totals[1] += bytes_out
+
+    def record_inbound(self, event, size):
+        stats = self._event(event)
+        stats.messages_in += 1
+        stats.bytes_in += size
+
+    def record_outbound(self, event, size):
+        """ข้อความที่ส่งออกนอก context ของ handler (เช่น ping ของ engine.io) นับรวมไว้กับชื่อ event ของมันเอง"""
+        stats = self._event(event)
+        stats.messages_out += 1
+        stats.bytes_out += size
+
+    def _merged(self, seconds):
+        newest = int(self.clock() // self.slot_seconds)
+        oldest = newest - max(1, int(seconds // self.slot_seconds)) + 1
+        events, rooms = {}, {}
+        for slot in list(self._slots):
+            if slot is None or not oldest <= slot[0] <= newest:
+                continue
+            for event, stats in list(slot[1].items()):
+                events.setdefault(event, EventWindow()).merge(stats)
+            for room, (room_seconds, room_bytes) in list(slot[2].items()):
+                totals = rooms.setdefault(room, [0.0, 0])
+                totals[0] += room_seconds
+                totals[1] += room_bytes
+        return events, rooms
+
+    def report(self, seconds=None, k=None):
+        """รายงานของ `seconds` วินาทีล่าสุด: handler เรียงตาม p99 จากมากไปน้อย และห้องที่ใช้เวลา handler มากที่สุด"""
+        seconds = min(seconds or self.window_seconds, self.window_seconds)
+        events, rooms = self._merged(seconds)
+        handlers = [dict(event=event, **stats.summary(seconds)) for event, stats in events.items()]
+        handlers.sort(key=lambda h: (h['p99_ms'], h['total_ms']), reverse=True)
+        top_rooms = sorted(rooms.items(), key=lambda item: item[1][0], reverse=True)
+        return {
+            'window_seconds': seconds,
+            'handlers': handlers[:k] if k else handlers,
+            'rooms': [{'room_id': room, 'handler_ms': round(s * 1000, 3), 'bytes_out': b}
+                      for room, (s, b) in top_rooms[:k or 10]],
+        }
+
+
+class _CallContext:
+    """ข้อมูลของ handler ที่กำลังทำงานอยู่ใน greenlet ปัจจุบัน"""
+    __slots__ = ('event', 'room', 'sid', 'lock_wait', 'messages_out', 'bytes_out')
+
+    def __init__(self, event, room, sid=None):
+        self.event = event
+        self.room = room
+        self.sid = sid
+        self.lock_wait = 0.0
+        self.messages_out = 0
+        self.bytes_out = 0
+
+
+def context_from_stack(frame):
+    """_CallContext ของ handler/งานที่วัดผลอยู่ซึ่งใกล้ `frame` ที่สุด (เดินตาม f_back) หรือ None
+    ใช้จาก thread อื่น (hub_watchdog.py) กับ stack ของ greenlet ที่กำลังยึด hub อยู่
+    จึงได้ context ของ greenlet นั้นเสมอ แม้ handler หลายตัวจะสลับกันทำงานระหว่างรอ lock หรือส่งข้อความ"""
+    while frame is not None:
+        for value in frame.f_locals.values():
+            if isinstance(value, _CallContext):
+                return value
+            if isinstance(value, _Tracked):
+                return value.context
+        frame = frame.f_back
+    return None
+
+
+class Instrumentation:
+    """ห่อ handler และชั้นส่ง/รับข้อความของ Socket.IO server เพื่อเก็บสถิติลง Prometheus metrics และ rolling window"""
+    def __init__(self, socketio, window=None, logger=None):
+        self.socketio = socketio
+        self.window = window or RollingWindow()
+        self.logger = logger
+        self._local = threading.local() # หลัง monkey_patch จะเป็นข้อมูลเฉพาะของแต่ละ greenlet
+
+    def install(self):
+        """ห่อ send_packet และ handler 'message' ของ engine.io (เรียกครั้งเดียวหลังสร้าง SocketIO)"""
+        eio = self.socketio.server.eio
+        eio.send_packet = self._count_sent(eio.send_packet)
+        eio.handlers['message'] = self._count_received(eio.handlers['message'])
+
+    def current(self):
+        return getattr(self._local, 'context', None)
+
+    def set_room(self, room_id):
+        """ระบุห้องของ handler ที่กำลังทำงาน (สำหรับ handler ที่ไม่ได้ส่ง room_id มาใน payload)"""
+        context = self.current()
+        if context is not None:
+            context.room = room_id
+
+    def lock_waited(self, seconds):
+        """callback ของ TimedLock: บวกเวลารอ lock ให้ handler ที่กำลังทำงาน"""
+        context = self.current()
+        if context is not None:
+            context.lock_wait += seconds
+
+    def track(self, event, room=None):
+        """context manager สำหรับงานที่ไม่ใช่ handler (เช่น update ของแต่ละห้องใน Master Game Loop)"""
+        return _Tracked(self, event, room)
+
+    def on(self, event, guard=None):
+        """ใช้แทน @socketio.on(event)
+        `guard(payload)` (ถ้ามี) ถูกเรียกก่อนเริ่มวัดผล คืน payload ที่ผ่านการตรวจ หรือ None เพื่อทิ้งข้อความ
+        ข้อความที่ถูกทิ้งจึงไม่เข้า metrics, rolling window หรือ log ของ handler"""
+        def decorator(handler):
+            max_args = handler.__code__.co_argcount
+
+            @functools.wraps(handler)
+            def instrumented_handler(*args):
+                if guard is not None:
+                    data = guard(args[0] if args else None)
+                    if data is None:
+                        return
+                    args = (data,)
+                room = None
+                if args and isinstance(args[0], dict):
+                    room = _room_key(args[0].get('room_id'))
+                sid = request.sid if has_request_context() else None
+                with _Tracked(self, event, room, sid) as context: # ชื่อ local นี้ให้ context_from_stack หาเจอ
+                    return handler(*args[:max_args])
+            self.socketio.on(event)(instrumented_handler)
+            return handler
+        return decorator
+
+    def _count_sent(self, send_packet):
+        @functools.wraps(send_packet)
+        def wrapper(eio_sid, pkt):
+            data = pkt.data
+            if isinstance(data, str):
+                event, size = packet_event(data), _text_size(data)
+            elif data is not None:
+                event, size = 'binary', len(data)
+            else:
+                return send_packet(eio_sid, pkt)
+            MESSAGES_SENT.inc((event,))
+            BYTES_SENT.inc((event,), size)
+            context = self.current()
+            if context is not None:
+                context.messages_out += 1
+                context.bytes_out += size
+            else:
+                self.window.record_outbound(event, size)
+            return send_packet(eio_sid, pkt)
+        return wrapper
+
+    def _count_received(self, handle_message):
+        @functools.wraps(handle_message)
+        def wrapper(eio_sid, data):
+            if isinstance(data, str):
+                event, size = packet_event(data), _text_size(data)
+            else:
+                event, size = 'binary', len(data)
+            MESSAGES_RECEIVED.inc((event,))
+            BYTES_RECEIVED.inc((event,), size)
+            self.window.record_inbound(event, size)
+            return handle_message(eio_sid, data)
+        return wrapper
+
+
+class _Tracked:
+    def __init__(self, instrumentation, event, room, sid=None):
+        self.instrumentation = instrumentation
+        self.context = _CallContext(event, room, sid)
+
+    def __enter__(self):
+        local = self.instrumentation._local
+        self.previous = getattr(local, 'context', None)
+        local.context = self.context
+        self.started = time.perf_counter()
+        return self.context
+
+    def __exit__(self, *exc_info):
+        elapsed = self.elapsed = time.perf_counter() - self.started
+        self.instrumentation._local.context = self.previous
+        context = self.context
+        HANDLER_SECONDS.observe(elapsed, (context.event,))
+        self.instrumentation.window.record_call(context.event, context.room, elapsed, context.lock_wait,
+                                                context.messages_out, context.bytes_out)
+        logger = self.instrumentation.logger
+        if logger:
+            logger.log(context.event, sid=context.sid, room=context.room, duration_ms=round(elapsed * 1000, 3),
+                       lock_wait_ms=round(context.lock_wait * 1000, 3), messages_out=context.messages_out,
+                       bytes_out=context.bytes_out, error=exc_info[0].__name__ if exc_info[0] else None)
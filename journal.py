@@ -0,0 +1,171 @@
+# journal.py
+#
+# --- บันทึกเหตุการณ์ของห้องเกมแบบ Append-only (Event Journal) ---
+# ใช้ตรวจสอบย้อนหลังเมื่อห้องทำงานผิดปกติ: บันทึกทุกคำสั่งขาเข้าของห้อง (join/leave/start/action/ability/tick)
+# (รวมถึงการกลับเข้าห้องด้วย connection ใหม่) พร้อม timestamp และ seed ของ RNG แล้วนำไปเล่นซ้ำแบบ offline ได้ด้วย `python -m tools.replay`
+#
+# รูปแบบไฟล์ (binary):
+#   MAGIC (4 ไบต์) ตามด้วย record ต่อกันไปเรื่อยๆ
+#   record = kind (uint8) | timestamp (float64) | ความยาว payload (uint32) | payload (JSON แบบ utf-8)
+#   sid จะถูกแทนด้วยเลขลำดับเล็กๆ หลังจากปรากฏครั้งแรก (ใน CREATE/JOIN) เพื่อให้ไฟล์มีขนาดเล็ก
+#
+# การเขียนบน hot path เป็นเพียงการต่อท้าย bytearray ในหน่วยความจำ
+# ส่วนการเขียนลงไฟล์จริงทำโดย `JournalWriter.run()` ที่ทำงานเป็น background greenlet
+
+import json
+import os
+import struct
+import time
+
+MAGIC = b'GWJ2' # GWJ2: action/ability อ้างถึงวัตถุดิบด้วย item_id
+RECORD_HEADER = struct.Struct('<BdI')
+
+KIND_CREATE = 1   # [room_id, seed, host_sid, host_name]
+KIND_JOIN = 2     # [sid_index, sid, name] ต่อท้ายด้วย true ถ้าเป็นบอทของเซิร์ฟเวอร์
+KIND_LEAVE = 3    # sid_index
+KIND_START = 4    # null
+KIND_ACTION = 5   # [sid_index, data]
+KIND_ABILITY = 6  # [sid_index, item_id]
+KIND_TICK = 7     # null หรือ spawn_batch (เมื่อไม่ใช่ 1)
+KIND_RESUME = 8   # [sid_index, sid ใหม่]
+
+KIND_NAMES = {
+    KIND_CREATE: 'create', KIND_JOIN: 'join', KIND_LEAVE: 'leave', KIND_START: 'start',
+    KIND_ACTION: 'player_action', KIND_ABILITY: 'use_ability', KIND_TICK: 'tick', KIND_RESUME: 'resume',
+}
+
+
+def _encode(payload):
+    if payload is None:
+        return b''
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class RoomJournal:
+    """บัฟเฟอร์ journal ของห้องเดียว (ถูกเรียกจาก GameRoom ขณะถือ lock ของห้อง)"""
+    def __init__(self, path):
+        self.path = path
+        self.buffer = bytearray(MAGIC)
+        self.sid_index = {} # {sid: เลขลำดับ}
+        self.closed = False
+
+    def _append(self, kind, timestamp, payload=None):
+        body = _encode(payload)
+        self.buffer += RECORD_HEADER.pack(kind, timestamp, len(body))
+        self.buffer += body
+
+    def _sid(self, sid):
+        index = self.sid_index.get(sid)
+        if index is None: # sid ที่ไม่เคยเห็น (เช่น action จากคนนอกห้อง) บันทึกเป็นข้อความเต็ม
+            return sid
+        return index
+
+    def record_create(self, timestamp, room_id, seed, host_sid, host_name):
+        self.sid_index[host_sid] = 0
+        self._append(KIND_CREATE, timestamp, [room_id, seed, host_sid, host_name])
+
+    def record_join(self, timestamp, sid, name, bot=False):
+        index = self.sid_index.setdefault(sid, len(self.sid_index))
+        self._append(KIND_JOIN, timestamp, [index, sid, name, True] if bot else [index, sid, name])
+
+    def record_leave(self, timestamp, sid):
+        self._append(KIND_LEAVE, timestamp, self._sid(sid))
+
+    def record_start(self, timestamp):
+        self._append(KIND_START, timestamp)
+
+    def record_action(self, timestamp, sid, data):
+        self._append(KIND_ACTION, timestamp, [self._sid(sid), data])
+
+    def record_ability(self, timestamp, sid, item_id):
+        self._append(KIND_ABILITY, timestamp, [self._sid(sid), item_id])
+
+    def record_resume(self, timestamp, old_sid, new_sid):
+        index = self._sid(old_sid)
+        if old_sid in self.sid_index:
+            self.sid_index[new_sid] = self.sid_index.pop(old_sid)
+        self._append(KIND_RESUME, timestamp, [index, new_sid])
+
+    def record_tick(self, timestamp, spawn_batch=1):
+        self._append(KIND_TICK, timestamp, spawn_batch if spawn_batch != 1 else None)
+
+    def take_buffer(self):
+        """สลับบัฟเฟอร์ออกมาเพื่อนำไปเขียนไฟล์ (ไม่มีการ yield ระหว่างสลับ จึงไม่ต้องใช้ lock)"""
+        data, self.buffer = self.buffer, bytearray()
+        return data
+
+
+class JournalWriter:
+    """จัดการ journal ของทุกห้องและเขียนบัฟเฟอร์ลงไฟล์เป็นระยะ"""
+    def __init__(self, directory, flush_interval=0.5):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.journals = {} # {room_id: RoomJournal}
+        os.makedirs(directory, exist_ok=True)
+
+    def open(self, room):
+        """เริ่มบันทึก journal ให้ห้อง (เรียกหลังสร้าง GameRoom ก่อนมีผู้เล่นคนอื่นเข้า)"""
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        journal = RoomJournal(os.path.join(self.directory, f'{room.id}-{stamp}-{room.seed & 0xffff:04x}.journal'))
+        host = room.players[room.host_sid]
+        journal.record_create(room.now, room.id, room.seed, host.sid, host.name)
+        self.journals[room.id] = journal
+        room.recorder = journal
+        return journal
+
+    def close(self, room):
+        """หยุดบันทึก journal ของห้อง (ข้อมูลที่ค้างอยู่จะถูกเขียนใน flush รอบถัดไป)"""
+        if room.recorder:
+            room.recorder.closed = True
+            room.recorder = None
+
+    def flush(self):
+        for room_id, journal in list(self.journals.items()):
+            data = journal.take_buffer()
+            if data:
+                with open(journal.path, 'ab') as f:
+                    f.write(data)
+            if journal.closed and self.journals.get(room_id) is journal:
+                del self.journals[room_id]
+
+    def run(self, sleep):
+        """ลูปเขียนไฟล์เบื้องหลัง (`sleep` คือ socketio.sleep เพื่อให้ทำงานเป็น greenlet)"""
+        while True:
+            sleep(self.flush_interval)
+            self.flush()
+
+
+def read_journal(path):
+    """อ่าน journal แล้วคืนค่า list ของ (kind, timestamp, payload) โดยแปลงเลขลำดับกลับเป็น sid แล้ว"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f'{path}: ไม่ใช่ไฟล์ journal')
+
+    records = []
+    sids = {}
+    offset = len(MAGIC)
+    header_size = RECORD_HEADER.size
+    while offset + header_size <= len(data):
+        kind, timestamp, length = RECORD_HEADER.unpack_from(data, offset)
+        offset += header_size
+        if offset + length > len(data): # record สุดท้ายเขียนไม่ครบ (เช่น เซิร์ฟเวอร์ดับ)
+            break
+        payload = json.loads(data[offset:offset + length]) if length else None
+        offset += length
+
+        if kind == KIND_CREATE:
+            sids[0] = payload[2]
+        elif kind == KIND_JOIN:
+            sids[payload[0]] = payload[1]
+            payload = [payload[1], payload[2], len(payload) > 3 and payload[3]]
+        elif kind == KIND_LEAVE:
+            payload = sids.get(payload, payload)
+        elif kind == KIND_RESUME:
+            old_sid = sids.get(payload[0], payload[0])
+            sids[payload[0]] = payload[1]
+            payload = [old_sid, payload[1]]
+        elif kind in (KIND_ACTION, KIND_ABILITY):
+            payload = [sids.get(payload[0], payload[0]), payload[1]]
+        records.append((kind, timestamp, payload))
+    return records
@@ -0,0 +1,66 @@
+# latency.py
+#
+# --- Latency ที่ผู้เล่นพบจริง (วัดจากฝั่ง client) ---
+# 1. client แนบ `seq` และ `sent_at` ไปกับ player_action/use_ability
+# 2. เซิร์ฟเวอร์แนบ `ack` = {sid, seq, server_ms} ไปกับข้อความแรกที่ผู้ส่งได้รับจาก action นั้น
+#    (update_game_state, receive_item, action_success/action_fail) โดย server_ms คือเวลาตั้งแต่ handler เริ่มจนส่งข้อความ
+# 3. client คำนวณ round-trip แล้วส่งกลับมาเป็นชุดด้วย event `latency_report`
+# 4. `LatencyTracker` เก็บตัวอย่างล่าสุดของแต่ละห้องแบบจำกัดขนาด และคำนวณ percentile เมื่อถูกถามเท่านั้น
+
+from collections import deque
+
+from metrics import Histogram
+
+CLIENT_RTT_SECONDS = Histogram('game_client_rtt_seconds', 'round-trip ของ action ที่ client วัดได้ (ส่ง action ถึงได้รับ ack)')
+CLIENT_NETWORK_SECONDS = Histogram('game_client_network_seconds', 'round-trip ลบเวลาที่เซิร์ฟเวอร์ใช้ (เครือข่าย + คิวฝั่ง client)')
+
+MAX_RTT_MS = 60000
+
+
+def _percentile(values, p):
+    return values[min(len(values) - 1, int(p / 100.0 * len(values)))] if values else 0.0
+
+
+def parse_samples(samples):
+    """คืนคู่ (rtt_ms, server_ms) ที่สมเหตุสมผลจาก [[seq, rtt_ms, server_ms], ...]
+    (รูปแบบและจำนวนถูกตรวจแล้วโดย validation.SCHEMAS['latency_report'])"""
+    return [(float(rtt), float(server)) for _, rtt, server in samples if 0 <= server <= rtt <= MAX_RTT_MS]
+
+
+class LatencyTracker:
+    """ตัวอย่าง latency ล่าสุด (สูงสุด `per_room` ตัวอย่าง) ของแต่ละห้อง"""
+    def __init__(self, per_room=512):
+        self.per_room = per_room
+        self.rooms = {} # {room_id: deque[(rtt_ms, server_ms)]}
+
+    def record(self, room_id, samples):
+        window = self.rooms.get(room_id)
+        if window is None:
+            window = self.rooms[room_id] = deque(maxlen=self.per_room)
+        for rtt, server in samples:
+            window.append((rtt, server))
+            CLIENT_RTT_SECONDS.observe(rtt / 1000)
+            CLIENT_NETWORK_SECONDS.observe((rtt - server) / 1000)
+
+    def forget(self, room_id):
+        self.rooms.pop(room_id, None)
+
+    def room_summary(self, room_id):
+        samples = list(self.rooms.get(room_id, ()))
+        rtts = sorted(s[0] for s in samples)
+        servers = sorted(s[1] for s in samples)
+        networks = sorted(s[0] - s[1] for s in samples)
+        return {
+            'samples': len(samples),
+            'rtt_ms': {p: _percentile(rtts, int(p[1:])) for p in ('p50', 'p95', 'p99')},
+            'server_ms': {p: _percentile(servers, int(p[1:])) for p in ('p50', 'p95', 'p99')},
+            'network_ms': {p: _percentile(networks, int(p[1:])) for p in ('p50', 'p95', 'p99')},
+        }
+
+    def report(self, room_id=None, k=20):
+        """สรุปของห้องที่ระบุ หรือ `k` ห้องที่ p99 ของ round-trip สูงที่สุด"""
+        if room_id:
+            return {room_id: self.room_summary(room_id)}
+        summaries = {room: self.room_summary(room) for room in list(self.rooms)}
+        worst = sorted(summaries.items(), key=lambda item: item[1]['rtt_ms']['p99'], reverse=True)[:k]
+        return dict(worst)
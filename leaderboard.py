@@ -0,0 +1,173 @@
+# leaderboard.py
+#
+# --- ตารางคะแนนสูงสุดถาวร (SQLite) ---
+# 1. `record()` บน hub เป็นเพียงการต่อท้าย deque (ไม่มี I/O) ถ้าคิวเต็มผลใหม่จะถูกทิ้งและนับไว้ใน game_leaderboard_dropped_total
+# 2. OS thread จริงดึงผลออกมาเป็นชุดทุก `flush_interval` วินาที แล้วเขียนด้วย executemany ใน transaction เดียว
+#    ฐานข้อมูลเปิดแบบ WAL และ synchronous=NORMAL: เขียนต่อท้าย log ไม่ต้อง fsync ทุก transaction และผู้อ่านไม่ถูก block
+# 3. คะแนนสูงสุด K อันดับต่อ (ด่านที่ไปถึง, ช่วงเวลา) อยู่ในหน่วยความจำ
+#    - thread เดียวกันนำผลที่เพิ่งเขียนมา merge เข้าตารางที่เกี่ยวข้องทันที (แทนการ query ใหม่)
+#    - ตารางแบบมีช่วงเวลา (วันนี้/สัปดาห์นี้) ถูกโหลดใหม่จาก DB ทุก `refresh_interval` วินาที เพื่อให้ผลที่เก่าเกินหลุดออกไป
+#    ตารางถูกแทนที่ทั้ง list (ไม่แก้ไขของเดิม) `top()` บน hub จึงอ่านได้โดยไม่ต้องใช้ lock และไม่แตะ DB
+# 4. flush/refresh/close ถือ lock เดียวกันตลอดงาน (รวม merge) เพราะ flush() ถูกเรียกได้ทั้งจาก writer thread และตอนปิดเซิร์ฟเวอร์
+# ด่าน 0 = ทุกด่านรวมกัน
+
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+
+from metrics import Counter
+from os_threads import original
+
+WINDOWS = {'all': None, 'week': 7 * 24 * 3600, 'day': 24 * 3600} # {ชื่อ: ความยาวช่วงเวลาเป็นวินาที (None = ตลอดกาล)}
+
+RESULTS_WRITTEN = Counter('game_leaderboard_results_total', 'จำนวนผลการเล่นที่เขียนลงฐานข้อมูลแล้ว')
+RESULTS_DROPPED = Counter('game_leaderboard_dropped_total', 'จำนวนผลการเล่นที่ถูกทิ้งเพราะคิวเต็ม')
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS results (id INTEGER PRIMARY KEY, finished_at REAL NOT NULL, room_id TEXT NOT NULL,'
+    ' outcome TEXT NOT NULL, level INTEGER NOT NULL, score INTEGER NOT NULL, players TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS results_by_level ON results (level, score DESC, finished_at)',
+    'CREATE INDEX IF NOT EXISTS results_by_score ON results (score DESC, finished_at)',
+)
+
+
+def _rank(entry):
+    return -entry['score'], entry['finished_at'] # คะแนนมากก่อน ถ้าเท่ากันใครทำได้ก่อนอยู่อันดับสูงกว่า
+
+
+class Leaderboard:
+    """ผลการเล่นที่บันทึกลง SQLite จาก background thread พร้อม top-K ในหน่วยความจำ"""
+    def __init__(self, path, top_k=10, levels=(), flush_interval=1.0, refresh_interval=60.0,
+                 max_queue=10000, clock=time.time):
+        self.path = path
+        self.top_k = top_k
+        self.levels = (0,) + tuple(levels)
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self.max_queue = max_queue
+        self.clock = clock
+        self.boards = {(level, window): [] for level in self.levels for window in WINDOWS} # {(level, window): [entry, ...]}
+        self._queue = deque() # append/popleft ของ deque ปลอดภัยข้าม thread โดยไม่ต้องใช้ lock
+        self._db = None
+        self._lock = original('threading').Lock()
+        self._thread = None
+
+    # --- ฝั่ง hub ---
+
+    def record(self, room_id, outcome, level, score, players):
+        """ผลของเกมที่จบแล้ว (`players` = list ของชื่อ) เข้าคิวรอเขียน"""
+        if len(self._queue) >= self.max_queue:
+            RESULTS_DROPPED.inc()
+            return
+        self._queue.append({'finished_at': self.clock(), 'room_id': room_id, 'outcome': outcome,
+                            'level': level, 'score': score, 'players': list(players)})
+
+    def top(self, level=0, window='all', limit=None):
+        """คะแนนสูงสุดจากหน่วยความจำ (ผลที่เก่ากว่าช่วงเวลาถูกกรองออกระหว่างรอโหลดใหม่)"""
+        board = self.boards.get((level, window))
+        if board is None:
+            return []
+        span = WINDOWS[window]
+        if span is not None:
+            cutoff = self.clock() - span
+            board = [entry for entry in board if entry['finished_at'] >= cutoff]
+        return board[:limit or self.top_k]
+
+    def pending(self):
+        return len(self._queue)
+
+    # --- ฝั่ง writer thread ---
+
+    def start(self):
+        if self._thread is None:
+            self._thread = original('threading').Thread(target=self._run, name='leaderboard-writer', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def _run(self):
+        sleep = original('time').sleep
+        self.refresh()
+        next_refresh = self.clock() + self.refresh_interval
+        while True:
+            sleep(self.flush_interval)
+            self.flush()
+            if self.clock() >= next_refresh:
+                self.refresh(windowed_only=True)
+                next_refresh = self.clock() + self.refresh_interval
+
+    def _connect(self):
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                db.execute(statement)
+            db.commit()
+            self._db = db
+        return self._db
+
+    def flush(self):
+        """เขียนทุกผลที่ค้างอยู่ในคิวเป็นชุดเดียว แล้ว merge เข้าตารางในหน่วยความจำ"""
+        with self._lock:
+            queue = self._queue
+            batch = []
+            while queue:
+                batch.append(queue.popleft())
+            if not batch:
+                return 0
+            db = self._connect()
+            with db:
+                db.executemany(
+                    'INSERT INTO results (finished_at, room_id, outcome, level, score, players) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(entry['finished_at'], entry['room_id'], entry['outcome'], entry['level'], entry['score'],
+                      json.dumps(entry['players'], ensure_ascii=False)) for entry in batch])
+            RESULTS_WRITTEN.inc(amount=len(batch))
+            self._merge(batch)
+            return len(batch)
+
+    def _merge(self, batch):
+        """(เรียกขณะถือ self._lock)"""
+        for key in self.boards:
+            level, _ = key
+            candidates = [entry for entry in batch if level == 0 or entry['level'] == level]
+            if not candidates:
+                continue
+            board = self.boards[key]
+            if len(board) >= self.top_k:
+                floor = _rank(board[-1])
+                candidates = [entry for entry in candidates if _rank(entry) < floor]
+                if not candidates:
+                    continue
+            self.boards[key] = sorted(board + candidates, key=_rank)[:self.top_k]
+
+    def refresh(self, windowed_only=False):
+        """โหลดตารางใหม่จาก DB (ตอนเริ่ม และเป็นระยะสำหรับตารางที่มีช่วงเวลา)"""
+        now = self.clock()
+        with self._lock:
+            db = self._connect()
+            for level, window in self.boards:
+                span = WINDOWS[window]
+                if windowed_only and span is None:
+                    continue
+                where, params = ['finished_at >= ?'], [now - span if span is not None else 0]
+                if level:
+                    where.append('level = ?')
+                    params.append(level)
+                rows = db.execute(
+                    f'SELECT finished_at, room_id, outcome, level, score, players FROM results'
+                    f' WHERE {" AND ".join(where)} ORDER BY score DESC, finished_at LIMIT ?',
+                    params + [self.top_k]).fetchall()
+                self.boards[(level, window)] = [
+                    {'finished_at': row[0], 'room_id': row[1], 'outcome': row[2], 'level': row[3],
+                     'score': row[4], 'players': json.loads(row[5])} for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
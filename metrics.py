@@ -0,0 +1,207 @@
+# metrics.py
+#
+# --- ตัวเก็บ Metrics แบบ Prometheus (ไม่มี lock บน hot path) ---
+# 1. Counter/Histogram เก็บค่าแยกเป็น shard ตาม OS thread: greenlet ทุกตัวของ eventlet อยู่บน thread เดียวกัน
+#    และสลับกันเฉพาะตอนทำ I/O จึงบวกค่าใน dict ของ shard ได้เลยโดยไม่ต้องใช้ lock
+# 2. ตอน scrape (`/metrics`) จึงค่อยรวมค่าจากทุก shard แล้วแปลงเป็น text exposition format
+# 3. Gauge เป็น callback ที่ถูกเรียกเฉพาะตอน scrape ไม่มีต้นทุนระหว่างเล่นเกม
+
+import time
+from bisect import bisect_left
+
+from os_threads import original
+
+# id ของ OS thread จริง (threading.get_ident ถูก patch ให้คืน id ของ greenlet)
+_get_ident = original('_thread').get_ident
+
+# ขอบเขต bucket (วินาที) สำหรับเวลาที่ใช้ประมวลผล ตั้งแต่ 50µs ถึง 5 วินาที
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """รวม metric ทั้งหมดของ process และสร้างข้อความสำหรับ `/metrics`"""
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def get(self, name):
+        for metric in self.metrics:
+            if metric.name == name:
+                return metric
+        return None
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Sharded:
+    """ฐานของ metric ที่เก็บค่าแยกตาม OS thread"""
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._shards = {} # {thread id: {label values: ค่า}}
+        if registry is not None:
+            registry.register(self)
+
+    def _shard(self):
+        shard = self._shards.get(_get_ident())
+        if shard is None:
+            shard = self._shards.setdefault(_get_ident(), {})
+        return shard
+
+    def _snapshot(self):
+        """คัดลอกค่าของทุก shard (ใช้ตอน scrape เท่านั้น)"""
+        return [dict(shard) for shard in list(self._shards.values())]
+
+
+class Counter(_Sharded):
+    type = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self):
+        """คืนค่า {label values: ผลรวม} จากทุก shard"""
+        totals = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self):
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+                for labels, value in sorted(self.values().items())]
+
+
+class Histogram(_Sharded):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help, labelnames, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            # ช่องสุดท้ายของ bucket คือ +Inf ตามด้วยผลรวมและจำนวนครั้ง
+            counts = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def values(self):
+        """คืนค่า {label values: [จำนวนในแต่ละ bucket (ไม่สะสม)..., ผลรวม, จำนวนครั้ง]}"""
+        totals = {}
+        for shard in self._snapshot():
+            for labels, counts in shard.items():
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = list(counts)
+                else:
+                    for i, value in enumerate(counts):
+                        total[i] += value
+        return totals
+
+    def render(self):
+        lines = []
+        for labels, counts in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, ("le", _format_value(bound)))} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(counts[-2])}')
+            lines.append(f'{self.name}_count{label_text} {counts[-1]}')
+        return lines
+
+
+class Gauge:
+    """ค่า ณ ขณะ scrape: `callback()` คืนค่าตัวเลข หรือ dict {label values: ตัวเลข}"""
+    type = 'gauge'
+
+    def __init__(self, name, help, callback, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        if registry is not None:
+            registry.register(self)
+
+    def render(self):
+        value = self.callback()
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}'
+                for labels, v in sorted(value.items())]
+
+
+class TimedLock:
+    """ห่อ Lock เพื่อวัดเวลารอ: ถ้าได้ lock ทันทีจะไม่จับเวลา (กรณีส่วนใหญ่) นับเป็นการรอ 0 วินาที
+    `on_wait(วินาที)` จะถูกเรียกเมื่อต้องรอจริงเท่านั้น"""
+    def __init__(self, lock, histogram, labels=(), on_wait=None):
+        self._lock = lock
+        self._histogram = histogram
+        self._labels = labels
+        self._on_wait = on_wait
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(False):
+            self._histogram.observe(0.0, self._labels)
+            return True
+        if not blocking:
+            return False
+        started = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        waited = time.perf_counter() - started
+        self._histogram.observe(waited, self._labels)
+        if self._on_wait:
+            self._on_wait(waited)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
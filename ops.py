@@ -0,0 +1,75 @@
+# ops.py
+#
+# --- ข้อมูลสรุปของแต่ละห้องสำหรับหน้า Operations Console (/admin) ---
+# สรุปถูกอัปเดตเฉพาะห้องที่มีการเปลี่ยนแปลง (ตอนสร้าง/เข้า/ออก/เริ่มเกม, หลัง action และหลัง tick ของห้องนั้น)
+# จึงไม่ต้องวนอ่าน GameRoom ทุกห้องหรือถือ lock ของห้องทุกครั้งที่หน้า console ขอข้อมูล
+# จำนวนห้องแยกตามสถานะก็ถูกนับแบบเพิ่ม/ลดตามการเปลี่ยนสถานะ
+
+import heapq
+import time
+
+PHASES = ('lobby', 'active', 'intermission')
+TICK_COST_ALPHA = 0.2 # น้ำหนักของค่าใหม่ในค่าเฉลี่ยแบบ EWMA ของต้นทุน tick
+
+
+class RoomSummary:
+    """ข้อมูลล่าสุดของห้องหนึ่ง (อ่านจาก GameRoom ตอนที่ห้องเปลี่ยน)"""
+    __slots__ = ('room_id', 'phase', 'players', 'level', 'score', 'target_score', 'total_score', 'time_left',
+                 'tick_ms', 'created_at', 'updated_at')
+
+    def __init__(self, room_id):
+        self.room_id = room_id
+        self.phase = None
+        self.players = 0
+        self.level = self.score = self.target_score = self.total_score = self.time_left = None
+        self.tick_ms = 0.0
+        self.created_at = self.updated_at = time.time()
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class OpsBoard:
+    """สรุปของทุกห้อง + จำนวนห้องแยกตามสถานะ (ถูกเรียกจาก hub เท่านั้น)"""
+    def __init__(self):
+        self.rooms = {} # {room_id: RoomSummary}
+        self.phase_counts = dict.fromkeys(PHASES, 0)
+
+    def update(self, room):
+        summary = self.rooms.get(room.id)
+        if summary is None:
+            summary = self.rooms[room.id] = RoomSummary(room.id)
+        phase = room.phase
+        if phase != summary.phase:
+            if summary.phase is not None:
+                self.phase_counts[summary.phase] -= 1
+            self.phase_counts[phase] += 1
+            summary.phase = phase
+        summary.players = len(room.players)
+        game_state = room.game_state
+        if game_state:
+            summary.level = game_state.level
+            summary.score = game_state.score
+            summary.target_score = game_state.target_score
+            summary.total_score = game_state.total_score
+            summary.time_left = game_state.time_left
+        summary.updated_at = time.time()
+
+    def record_tick(self, room_id, seconds):
+        summary = self.rooms.get(room_id)
+        if summary is not None:
+            summary.tick_ms += TICK_COST_ALPHA * (seconds * 1000 - summary.tick_ms)
+
+    def remove(self, room_id):
+        summary = self.rooms.pop(room_id, None)
+        if summary is not None and summary.phase is not None:
+            self.phase_counts[summary.phase] -= 1
+
+    def phase_gauge(self):
+        """ค่าสำหรับ Gauge game_rooms{state=...}"""
+        return {(phase,): count for phase, count in self.phase_counts.items()}
+
+    def top_rooms(self, k):
+        """`k` ห้องที่มีต้นทุน tick สูงที่สุด (ห้องที่ยังไม่เคย tick เรียงตามจำนวนผู้เล่น)"""
+        return [summary.as_dict() for summary in
+                heapq.nlargest(k, list(self.rooms.values()), key=lambda s: (s.tick_ms, s.players))]
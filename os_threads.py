@@ -0,0 +1,19 @@
+# os_threads.py
+#
+# --- เข้าถึง threading/time/_thread ตัวจริงของ OS แม้ eventlet จะ monkey patch แล้ว ---
+# งานเบื้องหลังที่ต้องเป็น OS thread จริง (writer ของ log/analytics/leaderboard, watchdog, profiler) และ metrics ที่แยก shard ตาม OS thread
+# ใช้ `original(name)` แทนการ import eventlet.patcher ที่ระดับโมดูล:
+# ถ้ายังไม่มีใคร import eventlet ก็ยังไม่มีอะไรถูก patch จึงใช้โมดูลของ stdlib ได้เลย เครื่องมือที่ไม่ใช้ Socket
+# (simulation.py, tools.balance_tuner) จึงไม่โหลด eventlet และไม่เห็นคำเตือน deprecation ของมัน
+# โมดูล (เช่น threading) ควรถูกขอตอนใช้งาน ไม่ใช่ตอน import เพราะ monkey_patch แก้ object ของโมดูลเดิมใน sys.modules
+
+import importlib
+import sys
+
+
+def original(name):
+    """โมดูล `name` ของ stdlib ที่ไม่ถูก monkey patch"""
+    if 'eventlet' in sys.modules:
+        from eventlet.patcher import original as eventlet_original
+        return eventlet_original(name)
+    return importlib.import_module(name)
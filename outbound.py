@@ -0,0 +1,163 @@
+# outbound.py
+#
+# --- ป้องกัน client ที่รับข้อความไม่ทัน (Slow Consumer) ---
+# ทุกข้อความขาออกผ่าน `OutboundQueues.send` ซึ่งห่อ eio.send_packet ไว้
+# 1. ปกติส่งต่อเข้า queue ของ engine.io ทันที (ต้นทุนเพียงเช็คความยาว queue)
+# 2. ถ้า queue ของ engine.io ของ client นั้นยาวถึง `high_water` ข้อความใหม่จะถูกพักไว้ใน backlog ของ client แทน
+#    backlog เป็นคิวเดียวตามลำดับที่ส่ง ข้อความที่แทนที่กันได้ (state snapshot, lobby) เหลือเฉพาะฉบับล่าสุด
+#    ซึ่งอยู่ในตำแหน่งของฉบับล่าสุดนั้น (ฉบับเก่าถูกข้ามตอนส่ง) จึงไม่มี update_lobby เก่ามาถึงหลัง game_started
+# 3. `run()` (background greenlet) ทยอยส่ง backlog เมื่อ queue ของ engine.io สั้นลง
+# 4. ถ้าข้อความที่แทนที่กันไม่ได้ค้างเกิน `max_backlog` ชิ้น จะทิ้งเฉพาะข้อความที่ resync ครอบคลุม (`RESYNC_COVERED`)
+#    แล้วให้ `on_resync` ส่งสถานะล่าสุดต่อท้ายครั้งเดียวแทน ข้อความเปลี่ยนช่วงเกม (game_started, level_complete,
+#    game_over, clear_all_items ฯลฯ) ถูกเก็บไว้ตามลำดับเดิมเสมอ
+#    ถ้ายังมี backlog ค้างต่อเนื่องนานเกิน `disconnect_after` วินาที จะเรียก `on_disconnect` ตัดการเชื่อมต่อ
+# client ที่ช้าจึงใช้หน่วยความจำได้ไม่เกินขอบเขต และการส่งให้ผู้เล่นคนอื่นในห้องไม่ต้องรอ client นั้น
+
+import time
+from collections import deque
+
+from instrumentation import packet_event
+from metrics import Counter
+
+REPLACEABLE_EVENTS = frozenset({'update_game_state', 'update_lobby'})
+# ข้อความที่ถูกทิ้งได้เมื่อต้อง resync เพราะ payload ของ resync (state + ของบนสายพาน) ครอบคลุมแล้ว
+RESYNC_COVERED = frozenset({'update_game_state', 'receive_item', 'receive_items', 'action_success', 'action_fail'})
+
+MESSAGES_REPLACED = Counter('game_outbound_replaced_total', 'ข้อความที่ถูกแทนด้วยฉบับใหม่กว่าขณะรอใน backlog', ['event'])
+MESSAGES_DISCARDED = Counter('game_outbound_discarded_total', 'ข้อความที่ถูกทิ้งเพราะ client ค้างจนต้อง resync')
+RESYNCS = Counter('game_outbound_resyncs_total', 'จำนวนครั้งที่ส่งสถานะใหม่ทั้งหมดแทน backlog ที่ยาวเกินไป')
+SLOW_DISCONNECTS = Counter('game_outbound_slow_disconnects_total', 'จำนวน client ที่ถูกตัดเพราะมี backlog ค้างนานเกินไป')
+
+
+class _Backlog:
+    """ข้อความที่รอส่งให้ client หนึ่ง"""
+    __slots__ = ('queue', 'latest', 'held', 'since', 'resync')
+
+    def __init__(self, now):
+        self.queue = deque()  # [(event, packet)] ตามลำดับที่ส่ง (รวมฉบับเก่าของข้อความที่แทนที่กันได้ ซึ่งจะถูกข้าม)
+        self.latest = {}      # {event: packet} ฉบับล่าสุดของข้อความที่แทนที่กันได้
+        self.held = 0         # จำนวนข้อความที่แทนที่กันไม่ได้ใน queue
+        self.since = now      # เวลาที่เริ่มมี backlog
+        self.resync = False   # รอส่งสถานะใหม่ทั้งหมด (ข้อความใน RESYNC_COVERED ระหว่างนี้ถูกทิ้ง)
+
+    def __len__(self):
+        return self.held + len(self.latest)
+
+
+class OutboundQueues:
+    """backlog แยกตาม eio sid (ถูกเรียกจาก hub เท่านั้น)"""
+    def __init__(self, high_water=32, max_backlog=256, disconnect_after=30.0, clock=time.monotonic):
+        self.high_water = high_water
+        self.max_backlog = max_backlog
+        self.disconnect_after = disconnect_after
+        self.clock = clock
+        self.backlogs = {} # {eio_sid: _Backlog}
+        self.eio = None
+        self._send = None
+        self.on_resync = None     # callback(eio_sid): ส่งสถานะล่าสุดให้ client
+        self.on_disconnect = None # callback(eio_sid)
+
+    def install(self, eio, on_resync, on_disconnect):
+        """ห่อ eio.send_packet (เรียกหลัง Instrumentation.install เพื่อให้ตัวนับเห็นเฉพาะข้อความที่ส่งจริง)"""
+        self.eio = eio
+        self._send = eio.send_packet
+        self.on_resync = on_resync
+        self.on_disconnect = on_disconnect
+        eio.send_packet = self.send
+
+    def depth(self, eio_sid):
+        """ความยาว queue ของ engine.io สำหรับ client นี้ (None = client หลุดไปแล้ว)"""
+        socket = self.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket is not None else None
+
+    def pending(self, eio_sid):
+        """ข้อความที่ยังไม่ถึง client ทั้งหมด (queue ของ engine.io + backlog)"""
+        backlog = self.backlogs.get(eio_sid)
+        return (self.depth(eio_sid) or 0) + (len(backlog) if backlog is not None else 0)
+
+    def send(self, eio_sid, pkt):
+        backlog = self.backlogs.get(eio_sid)
+        if backlog is None:
+            depth = self.depth(eio_sid)
+            if depth is None or depth < self.high_water:
+                return self._send(eio_sid, pkt)
+            backlog = self.backlogs[eio_sid] = _Backlog(self.clock())
+        self._hold(backlog, pkt)
+
+    def _hold(self, backlog, pkt):
+        data = pkt.data
+        event = packet_event(data) if isinstance(data, str) else None
+        if event in REPLACEABLE_EVENTS:
+            if event in backlog.latest:
+                MESSAGES_REPLACED.inc((event,))
+            backlog.latest[event] = pkt
+        elif backlog.resync and event in RESYNC_COVERED:
+            MESSAGES_DISCARDED.inc()
+            return
+        else:
+            backlog.held += 1
+        backlog.queue.append((event, pkt))
+        if backlog.held > self.max_backlog and not backlog.resync:
+            self._overflow(backlog)
+
+    def _overflow(self, backlog):
+        """ทิ้งข้อความที่ resync ครอบคลุม (ที่เหลือคงลำดับเดิม) แล้วรอส่ง resync"""
+        before = len(backlog)
+        latest = backlog.latest
+        kept = deque()
+        for event, pkt in backlog.queue:
+            if event in REPLACEABLE_EVENTS:
+                if latest.get(event) is not pkt:
+                    continue
+                if event in RESYNC_COVERED:
+                    del latest[event]
+                    continue
+            elif event in RESYNC_COVERED:
+                continue
+            kept.append((event, pkt))
+        backlog.queue = kept
+        backlog.held = len(kept) - len(latest)
+        backlog.resync = True
+        MESSAGES_DISCARDED.inc(amount=before - len(backlog))
+
+    def flush(self):
+        """ส่ง backlog ของทุก client เท่าที่ queue ของ engine.io รับได้ และจัดการ client ที่ค้างนานเกินไป"""
+        now = self.clock()
+        for eio_sid, backlog in list(self.backlogs.items()):
+            depth = self.depth(eio_sid)
+            if depth is None:
+                del self.backlogs[eio_sid]
+                continue
+            if now - backlog.since > self.disconnect_after:
+                del self.backlogs[eio_sid]
+                SLOW_DISCONNECTS.inc()
+                self.on_disconnect(eio_sid)
+                continue
+            if backlog.resync:
+                backlog.resync = False
+                RESYNCS.inc()
+                self.on_resync(eio_sid) # ข้อความ resync จะเข้ามาต่อท้าย backlog
+            budget = self.high_water - depth
+            queue, latest = backlog.queue, backlog.latest
+            while budget > 0 and queue:
+                event, pkt = queue.popleft()
+                if event in REPLACEABLE_EVENTS:
+                    if latest.get(event) is not pkt:
+                        continue # มีฉบับใหม่กว่าอยู่หลังจากนี้
+                    del latest[event]
+                else:
+                    backlog.held -= 1
+                self._send(eio_sid, pkt)
+                budget -= 1
+            if not backlog:
+                del self.backlogs[eio_sid]
+
+    def run(self, sleep, interval=0.05):
+        """ลูปเบื้องหลัง (`sleep` คือ socketio.sleep เพื่อให้ทำงานเป็น greenlet)"""
+        while True:
+            sleep(interval)
+            self.flush()
+
+    def stats(self):
+        """ค่าสำหรับ Gauge: (จำนวน client ที่มี backlog, จำนวนข้อความใน backlog ทั้งหมด)"""
+        return len(self.backlogs), sum(len(backlog) for backlog in self.backlogs.values())
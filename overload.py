@@ -0,0 +1,78 @@
+# overload.py
+#
+# --- ลดงานที่ไม่จำเป็นเมื่อ Master Game Loop ทำงานไม่ทัน (Load Shedding) ---
+# ดูค่าเฉลี่ย (EWMA) ของ (เวลาที่ใช้ใน 1 รอบ + เวลาที่เริ่มรอบช้า) เทียบกับงบ 1 วินาทีต่อรอบ แล้วปรับระดับทีละขั้น
+#   ระดับ 0 (normal)        : ทำงานตามปกติ
+#   ระดับ 1 (throttle_idle) : ห้องที่ไม่มี action ล่าสุดส่ง state ทุก 2 รอบ
+#   ระดับ 2 (coalesce)      : ห้องที่ไม่มี action ล่าสุดส่ง state ทุก 4 รอบ และรวมการสุ่มวัตถุดิบ 2 รอบเป็นข้อความเดียว
+#   ระดับ 3 (shed)          : เหมือนระดับ 2 และหยุดรับการสร้างห้องใหม่ (ตอบกลับว่าเซิร์ฟเวอร์ทำงานหนัก)
+# ขึ้นระดับเมื่อเกิน threshold ติดกัน `raise_after` รอบ (ทั้งรอบนั้นเองและค่าเฉลี่ย รอบที่ช้ามากครั้งเดียว เช่น GC pause
+# จึงไม่ดันค่าเฉลี่ยจนขึ้นระดับ) และลดระดับเมื่อค่าเฉลี่ยต่ำกว่า threshold ของระดับก่อนหน้า (คูณ `lower_ratio`)
+# ติดกัน `lower_after` รอบ เพื่อไม่ให้สลับระดับไปมา
+
+LEVEL_NAMES = ('normal', 'throttle_idle', 'coalesce', 'shed')
+IDLE_BROADCAST_EVERY = (1, 2, 4, 4) # ส่ง state ของห้องที่ไม่มีความเคลื่อนไหวทุกกี่รอบ
+SPAWN_BATCH = (1, 1, 2, 2)
+
+
+class OverloadController:
+    """ตัดสินระดับการลดงานจากเวลาของ Master Game Loop (ถูกเรียกจาก loop เท่านั้น)"""
+    def __init__(self, budget=1.0, raise_at=(0.5, 0.75, 0.9), lower_ratio=0.7, raise_after=2, lower_after=5,
+                 alpha=0.3, idle_seconds=5.0, on_change=None):
+        self.budget = budget
+        self.raise_at = raise_at
+        self.lower_ratio = lower_ratio
+        self.raise_after = raise_after
+        self.lower_after = lower_after
+        self.alpha = alpha
+        self.idle_seconds = idle_seconds
+        self.on_change = on_change # callback(ระดับเดิม, ระดับใหม่, load)
+        self.level = 0
+        self.load = 0.0
+        self._above = 0
+        self._below = 0
+
+    def observe(self, iteration_seconds, lateness_seconds):
+        """บันทึกผลของ loop 1 รอบแล้วปรับระดับถ้าจำเป็น คืนค่าระดับปัจจุบัน"""
+        sample = (iteration_seconds + lateness_seconds) / self.budget
+        self.load += self.alpha * (sample - self.load)
+
+        if self.level < len(self.raise_at) and min(sample, self.load) > self.raise_at[self.level]:
+            self._above += 1
+            self._below = 0
+            if self._above >= self.raise_after:
+                self._set_level(self.level + 1)
+        elif self.level > 0 and self.load < self.raise_at[self.level - 1] * self.lower_ratio:
+            self._below += 1
+            self._above = 0
+            if self._below >= self.lower_after:
+                self._set_level(self.level - 1)
+        else:
+            self._above = self._below = 0
+        return self.level
+
+    def _set_level(self, level):
+        previous, self.level = self.level, level
+        self._above = self._below = 0
+        if self.on_change:
+            self.on_change(previous, level, self.load)
+
+    @property
+    def level_name(self):
+        return LEVEL_NAMES[self.level]
+
+    @property
+    def spawn_batch(self):
+        return SPAWN_BATCH[self.level]
+
+    @property
+    def accepting_rooms(self):
+        return self.level < 3
+
+    def should_broadcast(self, room, tick):
+        """ห้องที่มี action ภายใน `idle_seconds` ได้ state ทุกรอบเสมอ ห้องอื่นถูกลดความถี่ตามระดับ
+        (เลื่อนรอบของแต่ละห้องตาม hash ของ room id เพื่อไม่ให้ทุกห้องส่งพร้อมกันในรอบเดียว)"""
+        every = IDLE_BROADCAST_EVERY[self.level]
+        if every == 1 or room.now - room.last_action_at < self.idle_seconds:
+            return True
+        return (tick + hash(room.id)) % every == 0
@@ -0,0 +1,78 @@
+# profiler.py
+#
+# --- Sampling profiler สำหรับเซิร์ฟเวอร์ที่กำลังรันอยู่ ---
+# ใช้ OS thread จริงสุ่มอ่าน stack ของ hub thread ด้วย sys._current_frames() ตามความถี่ที่กำหนด
+# stack ที่ได้คือของ greenlet ที่กำลังใช้ CPU อยู่ในขณะนั้น (greenlet ที่หลับอยู่ไม่ได้ใช้ CPU จึงไม่ต้องนับ)
+# ผลลัพธ์เป็น collapsed stack ("root;...;leaf จำนวน" บรรทัดละ stack) ใช้กับ flamegraph.pl หรือ speedscope ได้ทันที
+# ช่วงที่ hub ว่างจะปรากฏเป็น stack ที่จบด้วย eventlet hub wait ทำให้เห็นสัดส่วนเวลาว่างด้วย
+
+import sys
+import time
+from collections import Counter
+
+from os_threads import original
+
+MAX_SECONDS = 120
+MAX_HZ = 1000
+
+
+def frame_label(frame):
+    """ชื่อ frame ในรูป module:Class.method เช่น game_engine:GameRoom.update, engineio.socket:Socket.send"""
+    code = frame.f_code
+    module = frame.f_globals.get('__name__') or code.co_filename
+    return f'{module}:{getattr(code, "co_qualname", code.co_name)}'
+
+
+class Profile:
+    """ผลของการ profile หนึ่งครั้ง (ถูกเติมโดย sampler thread)"""
+    def __init__(self, seconds, hz):
+        self.seconds = seconds
+        self.hz = hz
+        self.stacks = Counter()
+        self.samples = 0
+        self.done = False
+
+    def collapsed(self):
+        lines = [f'{stack} {count}' for stack, count in self.stacks.most_common()]
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """สุ่มอ่าน stack ของ thread `thread_id` (ค่าปกติคือ hub thread) ครั้งละไม่เกิน 1 งาน"""
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.running = None
+
+    def start(self, seconds, hz=100):
+        """เริ่ม profile ใน thread เบื้องหลัง คืนค่า Profile (หรือ None ถ้ามีงานที่ยังไม่จบอยู่)"""
+        if self.running and not self.running.done:
+            return None
+        seconds = min(max(seconds, 0.1), MAX_SECONDS)
+        hz = min(max(hz, 1), MAX_HZ)
+        profile = self.running = Profile(seconds, hz)
+        original('threading').Thread(target=self._sample, args=(profile,), name='sampling-profiler', daemon=True).start()
+        return profile
+
+    def _sample(self, profile):
+        sleep = original('time').sleep
+        labels = {} # cache ชื่อ frame ตาม code object
+        interval = 1.0 / profile.hz
+        deadline = time.monotonic() + profile.seconds
+        try:
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(self.thread_id)
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = frame_label(frame)
+                    names.append(label)
+                    frame = frame.f_back
+                if names:
+                    names.reverse()
+                    profile.stacks[';'.join(names)] += 1
+                    profile.samples += 1
+                sleep(interval)
+        finally:
+            profile.done = True
@@ -0,0 +1,80 @@
+# ratelimit.py
+#
+# --- จำกัดอัตราข้อความต่อ connection (Token Bucket) ---
+# แต่ละ sid มี bucket แยกตามชนิด event: เติม token `rate` ต่อวินาที เก็บได้สูงสุด `burst`
+# ข้อความที่มาตอน bucket ว่างจะถูกทิ้งทันที (ก่อนแตะ lock ใดๆ หรือ GameRoom) และถูกนับใน counter
+# ถ้า sid เดียวถูกทิ้งข้อความเกิน `abuse_drops` ครั้งภายใน `abuse_window` วินาที จะถูกตัดการเชื่อมต่อ
+# ถูกเรียกจาก hub เท่านั้น จึงไม่ต้องใช้ lock
+
+import time
+
+from metrics import Counter
+
+MESSAGES_DROPPED = Counter('game_messages_rate_limited_total', 'จำนวนข้อความที่ถูกทิ้งเพราะเกินอัตราที่กำหนด', ['event'])
+ABUSE_DISCONNECTS = Counter('game_abuse_disconnects_total', 'จำนวน connection ที่ถูกตัดเพราะส่งข้อความเกินอัตราต่อเนื่อง')
+
+ALLOW, DROP, DISCONNECT = 'allow', 'drop', 'disconnect'
+
+
+def parse_limit(value, default):
+    """แปลงค่า "rate,burst" จาก environment variable (ค่าว่างหรือผิดรูปแบบ = ใช้ค่าเริ่มต้น)"""
+    try:
+        rate, burst = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return default
+    return (rate, burst) if rate > 0 and burst >= 1 else default
+
+
+class _Client:
+    """bucket ของ sid หนึ่ง: {event: [tokens, เวลาที่เติมล่าสุด]} + จำนวนข้อความที่ถูกทิ้งในหน้าต่างปัจจุบัน"""
+    __slots__ = ('buckets', 'drops', 'window_start', 'disconnecting')
+
+    def __init__(self, now):
+        self.buckets = {}
+        self.drops = 0
+        self.window_start = now
+        self.disconnecting = False
+
+
+class RateLimiter:
+    """Token bucket ต่อ (sid, event) สำหรับ event ที่อยู่ใน `limits` = {event: (rate ต่อวินาที, burst)}"""
+    def __init__(self, limits, abuse_drops=100, abuse_window=10.0, clock=time.monotonic):
+        self.limits = dict(limits)
+        self.abuse_drops = abuse_drops
+        self.abuse_window = abuse_window
+        self.clock = clock
+        self.clients = {} # {sid: _Client}
+
+    def check(self, sid, event):
+        """ALLOW = ประมวลผลต่อ, DROP = ทิ้งข้อความนี้, DISCONNECT = ทิ้งและตัดการเชื่อมต่อ (คืนค่านี้ครั้งเดียวต่อ sid)"""
+        limit = self.limits.get(event)
+        if limit is None:
+            return ALLOW
+        rate, burst = limit
+        now = self.clock()
+        client = self.clients.get(sid)
+        if client is None:
+            client = self.clients[sid] = _Client(now)
+        bucket = client.buckets.get(event)
+        if bucket is None:
+            bucket = client.buckets[event] = [burst, now]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return ALLOW
+
+        MESSAGES_DROPPED.inc((event,))
+        if now - client.window_start > self.abuse_window:
+            client.window_start = now
+            client.drops = 0
+        client.drops += 1
+        if client.drops >= self.abuse_drops and not client.disconnecting:
+            client.disconnecting = True
+            ABUSE_DISCONNECTS.inc()
+            return DISCONNECT
+        return DROP
+
+    def forget(self, sid):
+        self.clients.pop(sid, None)
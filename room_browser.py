@@ -0,0 +1,112 @@
+# room_browser.py
+#
+# --- รายการห้องสาธารณะที่เข้าร่วมได้ (หน้าค้นหาห้อง) ---
+# 1. ดัชนีถูกอัปเดตเฉพาะห้องที่เปลี่ยน (เรียก `update(room)` ที่จุดเดียวกับ OpsBoard) ไม่ต้องวนอ่าน `rooms` ทุกห้อง
+#    ห้องอยู่ในดัชนีเมื่อเป็นห้องสาธารณะ ยังไม่เริ่มเกม และมีที่ว่างสำหรับผู้เล่นจริง (ที่นั่งของบอทนับเป็นที่ว่าง เพราะบอทสละที่ให้)
+# 2. ลำดับ: ผู้เล่นจริงมากก่อน (ใกล้เริ่มเกมที่สุด) แล้วห้องเก่าก่อน
+#    เก็บเป็น list ของ key ที่เรียงอยู่แล้ว (bisect) การเพิ่ม/ลบเป็น O(log n) + memmove ซึ่งเร็วมากที่ 10,000 ห้อง
+#    และการตัดหน้า (offset/limit) เป็นเพียง slice
+# 3. ข้อมูลที่ client เห็นของแต่ละห้องถูกเก็บไว้ ถ้าไม่เปลี่ยน (เช่น tick ของห้องที่กำลังเล่น) จะไม่แตะดัชนีเลย
+# 4. client ที่เปิดหน้าค้นหาห้องอยู่ (watcher) ได้หน้าเดิมของตัวเองใหม่เมื่อดัชนีเปลี่ยน แต่ไม่เกิน 1 ครั้งต่อ `push_interval`
+#    หน้าที่เหมือนกันถูกสร้างครั้งเดียวต่อรอบ (ส่วนใหญ่ทุกคนดูหน้าแรก)
+# ถูกเรียกจาก hub เท่านั้น จึงไม่ต้องใช้ lock
+
+import bisect
+import itertools
+
+from game_engine import MAX_PLAYERS
+from metrics import Counter
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+PUSHES = Counter('game_room_browser_pushes_total', 'จำนวนรายการห้องที่ถูกส่งให้ client ที่เปิดหน้าค้นหาห้องอยู่')
+
+
+class RoomBrowser:
+    """ดัชนีห้องสาธารณะที่เข้าร่วมได้ + client ที่กำลังดูรายการอยู่"""
+    def __init__(self, push_interval=1.0):
+        self.push_interval = push_interval
+        self.version = 0    # เพิ่มทุกครั้งที่ดัชนีเปลี่ยน
+        self.watchers = {}  # {sid: (offset, limit)}
+        self._keys = []     # [(-ผู้เล่นจริง, ลำดับที่สร้าง, room_id)] เรียงอยู่เสมอ
+        self._entries = {}  # {room_id: (key, ข้อมูลที่ส่งให้ client)}
+        self._order = {}    # {room_id: ลำดับที่สร้าง} (คงอยู่จนห้องถูกลบ ห้องที่เล่นจบแล้วกลับมาจึงได้ลำดับเดิม)
+        self._counter = itertools.count()
+        self._pushed = 0    # version ล่าสุดที่ส่งให้ watcher แล้ว
+
+    def update(self, room):
+        """อ่านสถานะล่าสุดของ `room` แล้วเพิ่ม/ย้าย/ลบในดัชนีตามต้องการ"""
+        old = self._entries.get(room.id)
+        if not room.public or room.phase != 'lobby':
+            if old is not None:
+                self._discard(room.id, old[0])
+            return
+        order = self._order.get(room.id)
+        if order is None:
+            order = self._order[room.id] = next(self._counter)
+        players = room.players
+        humans = sum(not player.bot for player in players.values())
+        if humans >= MAX_PLAYERS:
+            if old is not None:
+                self._discard(room.id, old[0])
+            return
+        host = players.get(room.host_sid)
+        entry = {'room_id': room.id, 'host': host.name if host else '', 'players': len(players),
+                 'bots': len(players) - humans, 'max_players': MAX_PLAYERS}
+        if old is not None:
+            if old[1] == entry:
+                return
+            self._discard(room.id, old[0])
+        key = (-humans, order, room.id)
+        bisect.insort(self._keys, key)
+        self._entries[room.id] = (key, entry)
+        self.version += 1
+
+    def _discard(self, room_id, key):
+        index = bisect.bisect_left(self._keys, key)
+        del self._keys[index]
+        del self._entries[room_id]
+        self.version += 1
+
+    def remove(self, room_id):
+        """ห้องถูกลบทิ้ง"""
+        old = self._entries.get(room_id)
+        if old is not None:
+            self._discard(room_id, old[0])
+        self._order.pop(room_id, None)
+
+    def page(self, offset=0, limit=PAGE_SIZE):
+        """รายการห้องหน้าหนึ่งในรูปที่ส่งให้ client"""
+        entries = self._entries
+        return {'rooms': [entries[key[2]][1] for key in self._keys[offset:offset + limit]],
+                'offset': offset, 'total': len(self._keys)}
+
+    def watch(self, sid, offset=0, limit=PAGE_SIZE):
+        self.watchers[sid] = (offset, limit)
+
+    def unwatch(self, sid):
+        self.watchers.pop(sid, None)
+
+    def push(self, emit):
+        """ส่งหน้าของแต่ละ watcher ใหม่ถ้าดัชนีเปลี่ยนตั้งแต่ครั้งก่อน (`emit(event, data, to)` คือ transport.emit)"""
+        if self._pushed == self.version:
+            return 0
+        self._pushed = self.version
+        pages = {}
+        for sid, window in list(self.watchers.items()):
+            data = pages.get(window)
+            if data is None:
+                data = pages[window] = self.page(*window)
+            emit('room_list', data, to=sid)
+        PUSHES.inc(amount=len(self.watchers))
+        return len(self.watchers)
+
+    def run(self, emit, sleep):
+        """ลูปเบื้องหลัง (`sleep` คือ socketio.sleep เพื่อให้ทำงานเป็น greenlet)"""
+        while True:
+            sleep(self.push_interval)
+            self.push(emit)
+
+    def __len__(self):
+        return len(self._keys)
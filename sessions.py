@@ -0,0 +1,88 @@
+# sessions.py
+#
+# --- Resume token: กลับเข้าห้องเดิมหลังการเชื่อมต่อหลุด ---
+# 1. ทุกครั้งที่สร้างหรือเข้าห้อง ผู้เล่นได้ token สุ่ม (client เก็บไว้ใน sessionStorage)
+# 2. เมื่อ connection หลุด ที่นั่งถูกพักไว้ `grace_seconds` วินาที (GameRoom.suspend_player)
+# 3. client ที่เชื่อมต่อใหม่ส่ง token มาใน event `resume` เพื่อย้ายที่นั่งไปยัง sid ใหม่ (GameRoom.resume_player)
+#    รองรับกรณีที่เซิร์ฟเวอร์ยังไม่รู้ว่า connection เดิมหลุด (Wi-Fi กระตุกสั้นๆ): sid เดิมจะถูกตัดทิ้งหลัง resume
+# 4. ที่นั่งที่หมดเวลาผ่อนผันจะถูกนำออกจากห้องตามปกติ (`expired()` ถูกเรียกจาก Master Game Loop)
+# ถูกเรียกจาก hub เท่านั้น จึงไม่ต้องใช้ lock
+
+import secrets
+import time
+
+from metrics import Counter
+
+RESUMES = Counter('game_session_resumes_total', 'จำนวนครั้งที่ผู้เล่นกลับเข้าห้องเดิมด้วย resume token', ['result'])
+SEATS_EXPIRED = Counter('game_session_seats_expired_total', 'จำนวนที่นั่งที่ถูกปล่อยเพราะผู้เล่นไม่กลับมาภายในเวลาผ่อนผัน')
+
+
+class SessionRegistry:
+    """ผูก resume token กับ (room_id, sid) ของผู้เล่น และจำที่นั่งที่รอผู้เล่นกลับมา"""
+    def __init__(self, grace_seconds=30.0, clock=time.monotonic):
+        self.grace_seconds = grace_seconds
+        self.clock = clock
+        self.sessions = {} # {token: [room_id, sid]}
+        self.tokens = {}   # {sid: token}
+        self.away = {}     # {sid: เวลาที่ปล่อยที่นั่ง}
+
+    def issue(self, sid, room_id):
+        """สร้าง token ใหม่ให้ผู้เล่นที่เพิ่งเข้าห้อง (token เดิมของ sid นี้ถูกยกเลิก)"""
+        self.forget(sid)
+        token = secrets.token_urlsafe(16)
+        self.sessions[token] = [room_id, sid]
+        self.tokens[sid] = token
+        return token
+
+    def suspend(self, sid):
+        """connection ของ `sid` หลุด: True = พักที่นั่งไว้ (มี token และเปิดเวลาผ่อนผันอยู่)"""
+        if self.grace_seconds <= 0 or sid not in self.tokens:
+            return False
+        self.away[sid] = self.clock() + self.grace_seconds
+        return True
+
+    def resume(self, token, new_sid):
+        """ย้าย session ไปยัง `new_sid` คืน (room_id, sid เดิม) หรือ None ถ้า token ไม่ถูกต้องหรือหมดอายุแล้ว"""
+        session = self.sessions.get(token)
+        if session is None:
+            RESUMES.inc(('unknown',))
+            return None
+        room_id, old_sid = session
+        self.away.pop(old_sid, None)
+        del self.tokens[old_sid]
+        session[1] = new_sid
+        self.tokens[new_sid] = token
+        RESUMES.inc(('ok',))
+        return room_id, old_sid
+
+    def export(self):
+        """[[token, room_id, sid], ...] สำหรับบันทึกลง snapshot (ดู snapshot.py)"""
+        return [[token, room_id, sid] for token, (room_id, sid) in self.sessions.items()]
+
+    def restore(self, entries, grace_seconds):
+        """กู้คืน session จาก snapshot: ทุกคนถือว่าหลุดการเชื่อมต่อและมีเวลา `grace_seconds` วินาทีให้กลับมา"""
+        deadline = self.clock() + grace_seconds
+        for token, room_id, sid in entries:
+            self.sessions[token] = [room_id, sid]
+            self.tokens[sid] = token
+            self.away[sid] = deadline
+
+    def expired(self):
+        """คืน list ของ (room_id, sid) ที่หมดเวลาผ่อนผันแล้ว และลบ session เหล่านั้นทิ้ง"""
+        now = self.clock()
+        result = []
+        for sid, deadline in list(self.away.items()):
+            if now >= deadline:
+                result.append((self.sessions[self.tokens[sid]][0], sid))
+                self.forget(sid)
+                SEATS_EXPIRED.inc()
+        return result
+
+    def forget(self, sid):
+        token = self.tokens.pop(sid, None)
+        if token is not None:
+            del self.sessions[token]
+        self.away.pop(sid, None)
+
+    def __len__(self):
+        return len(self.away)
@@ -0,0 +1,166 @@
+# simulation.py
+#
+# --- Adapter สำหรับจำลองเกมแบบเร่งเวลา (Fast-forward) ---
+# ใช้ game_engine โดยตรงโดยไม่มี Socket:
+# 1. `ManualClock` เดินเวลาด้วยมือ แทน time.time
+# 2. `SimulationTransport` เก็บวัตถุดิบ (id -> ชื่อ) ที่ส่งถึงผู้เล่นแต่ละคนไว้ในหน่วยความจำ และไม่สร้าง ui_state จริง
+# 3. `GreedyPolicy` เป็นบอทพื้นฐานที่เล่นตามกติกาเหมือนผู้เล่นจริง (ใส่จาน/ส่งต่อ/ใช้ความสามารถ/ส่งอาหาร) ใช้สมองเดียวกับ bots.py
+#    `NovicePolicy` ส่งต่อผิดทิศบ้างเพื่อจำลองผู้เล่นมือใหม่ (ใช้ใน tools/balance_tuner.py)
+#
+# ตัวอย่าง: python simulation.py --games 5000 --players 4 (เพิ่ม --analytics-dir เพื่อเก็บ event ไปสรุปด้วย tools.analytics_report)
+
+import argparse
+import random
+import time
+from collections import Counter, defaultdict
+
+from analytics import AnalyticsSink
+from bots import direction_to, step
+from game_engine import GameRoom, Transport
+
+
+class ManualClock:
+    """นาฬิกาที่เดินเมื่อสั่งเท่านั้น (เรียกใช้เหมือน time.time)"""
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class SimulationTransport(Transport):
+    """Transport ที่เก็บวัตถุดิบขาเข้าของแต่ละ sid และนับจำนวนข้อความแทนการส่งจริง"""
+    def __init__(self):
+        self.inventories = defaultdict(dict) # {sid: {item_id: ingredient}} (เรียงตามลำดับที่ได้รับ)
+        self.message_counts = Counter()
+        self.outcome = None # 'game_over' หรือ 'game_won' เมื่อเกมจบ
+        self.final_score = 0
+        self.received = Counter() # {sid: จำนวนครั้งที่ inventory เพิ่มขึ้น} ใช้บอกบอทว่ามีของใหม่หรือไม่
+
+    def emit(self, event, data, to):
+        self.message_counts[event] += 1
+        if event == 'receive_item':
+            self.inventories[to][data['item']['id']] = data['item']['name']
+            self.received[to] += 1
+        elif event == 'receive_items':
+            self.inventories[to].update((item['id'], item['name']) for item in data['items'])
+            self.received[to] += 1
+        elif event == 'clear_all_items':
+            self.inventories.clear()
+        elif event in ('game_over', 'game_won'):
+            self.outcome = event
+            self.final_score = data['total_score']
+
+    def broadcast_state(self, room):
+        self.message_counts['update_game_state'] += 1
+
+
+class GreedyPolicy:
+    """บอทแบบ greedy: สมองเดียวกับบอทของเซิร์ฟเวอร์ (bots.step) แต่รู้จักเฉพาะวัตถุดิบที่ได้รับผ่าน Transport"""
+    _direction_to = staticmethod(direction_to)
+
+    def act(self, room, sid, inventory):
+        """ทำ 1 action ให้ผู้เล่น `sid` ผ่าน public API ของ GameRoom คืนค่า True ถ้ามีการกระทำ"""
+        action, item_id = step(room, room.players[sid], list(inventory.items()), self._direction_to)
+        if item_id is not None:
+            del inventory[item_id]
+        return action is not None
+
+
+class NovicePolicy(GreedyPolicy):
+    """บอทที่เล่นเหมือน greedy แต่ส่งต่อวัตถุดิบผิดทิศตามสัดส่วน `mistake_rate` (ใช้แทนผู้เล่นมือใหม่)"""
+    def __init__(self, mistake_rate=0.3, seed=0):
+        self.mistake_rate = mistake_rate
+        self.rng = random.Random(seed)
+
+    def _direction_to(self, order, sid, targets):
+        if self.rng.random() < self.mistake_rate:
+            return self.rng.choice(('left', 'right'))
+        return GreedyPolicy._direction_to(order, sid, targets)
+
+
+POLICIES = {'greedy': lambda seed: GreedyPolicy(), 'novice': lambda seed: NovicePolicy(seed=seed)} # {ชื่อ: สร้างบอทจาก seed ของเกม}
+
+
+def play_game(num_players=4, seed=0, actions_per_second=2, policy=None, max_seconds=3600, analytics=None):
+    """เล่นเกม 1 เกมจนจบแบบเร่งเวลา คืนค่า dict สรุปผล (`analytics` = AnalyticsSink ที่รับ event ของเกม)"""
+    policy = policy or GreedyPolicy()
+    clock = ManualClock()
+    transport = SimulationTransport()
+    sids = [f'sim{i}' for i in range(num_players)]
+    room = GameRoom('SIM', sids[0], 'บอท0', transport, clock=clock, seed=seed)
+    room.analytics = analytics
+    for i, sid in enumerate(sids[1:], start=1):
+        room.add_player(sid, f'บอท{i}')
+    room.start_game()
+
+    step = 1.0 / actions_per_second
+    actions = 0
+    max_level = 1
+    seconds = 0
+    # บอทที่ไม่มีอะไรทำไม่ต้องคิดใหม่จนกว่าสิ่งที่ใช้ตัดสินใจจะเปลี่ยน: เป้าหมาย/จานของทุกคน (เปลี่ยนได้จาก action เท่านั้น)
+    # ของที่ได้รับ และเครื่องแปรรูปของตัวเอง
+    idle = {} # {sid: (actions, received, กำลังแปรรูปอยู่, ด่าน)}
+    players = room.players
+    received = transport.received
+    while transport.outcome is None and seconds < max_seconds:
+        for _ in range(actions_per_second):
+            game_state = room.game_state
+            if game_state and game_state.is_active:
+                for sid in list(game_state.player_order_sids):
+                    state = (actions, received[sid], bool(players[sid].ability_processing), game_state.level)
+                    if idle.get(sid) == state:
+                        continue
+                    if policy.act(room, sid, transport.inventories[sid]):
+                        actions += 1
+                    else:
+                        idle[sid] = state
+            clock.advance(step)
+        room.update()
+        room.broadcast_state()
+        seconds += 1
+        if room.game_state:
+            max_level = max(max_level, room.game_state.level)
+
+    return {
+        'outcome': transport.outcome,
+        'won': transport.outcome == 'game_won',
+        'level': max_level,
+        'total_score': transport.final_score,
+        'seconds': seconds,
+        'actions': actions,
+        'messages': sum(transport.message_counts.values()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='จำลองเกมแบบเร่งเวลาเพื่อวัดความเร็วของ engine')
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--actions-per-second', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--analytics-dir', help='เขียน analytics event ของทุกเกมลงไดเรกทอรีนี้ (ดู analytics.py)')
+    args = parser.parse_args(argv)
+
+    analytics = AnalyticsSink(args.analytics_dir) if args.analytics_dir else None
+    started = time.perf_counter()
+    results = []
+    for i in range(args.games):
+        results.append(play_game(args.players, seed=args.seed + i, actions_per_second=args.actions_per_second,
+                                 analytics=analytics))
+        if analytics:
+            analytics.flush()
+    elapsed = time.perf_counter() - started
+    if analytics:
+        analytics.close()
+
+    wins = sum(r['won'] for r in results)
+    print(f"{args.games} เกม ใน {elapsed:.2f} วิ ({args.games / elapsed:.0f} เกม/วิ)")
+    print(f"ชนะ {wins} เกม ({100.0 * wins / args.games:.1f}%), คะแนนเฉลี่ย {sum(r['total_score'] for r in results) / args.games:.0f}")
+
+
+if __name__ == '__main__':
+    main()
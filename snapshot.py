@@ -0,0 +1,151 @@
+# snapshot.py
+#
+# --- บันทึกและกู้คืนห้องเกมทั้งหมด (สำหรับ deploy โดยเกมไม่หลุด) ---
+# 1. ตอนปิดเซิร์ฟเวอร์ (SIGTERM) `save()` แปลงทุกห้องเป็น list ขนาดเล็ก (ไม่มีชื่อ field ซ้ำทุก record) แล้วเขียนเป็น JSON ไฟล์เดียว
+# 2. ตอนเริ่มเซิร์ฟเวอร์ `load()` สร้าง GameRoom/GameState/Player กลับมา ผู้เล่นทุกคนอยู่ในสถานะหลุด (away)
+#    และกลับเข้าที่นั่งเดิมได้ด้วย resume token ที่บันทึกไว้พร้อมกัน (ดู sessions.py) ยกเว้นบอทที่เล่นต่อได้ทันที
+# 3. เวลาทุกค่า (เวลาสุ่มวัตถุดิบ, ความสามารถที่กำลังแปรรูป, ช่วงพักระหว่างด่าน) เก็บเป็นเวลาที่เหลือนับจากตอนบันทึก
+#    ห้องจึงเหมือนถูกหยุดไว้ระหว่างที่เซิร์ฟเวอร์ปิด
+# 4. RNG ของห้องที่กู้คืนใช้ seed ใหม่ที่สุ่มตอนบันทึก (เก็บ state เต็มของ Mersenne Twister จะใหญ่กว่าห้องทั้งห้อง
+#    และการบันทึกไม่แตะ RNG ของห้องที่ยังเล่นอยู่) ห้องที่กู้คืนจึงไม่ถูกบันทึก journal ต่อ เพราะเล่นซ้ำจาก record CREATE ไม่ได้แล้ว
+# 5. บัฟเฟอร์ส่งซ้ำ (`GameState.unacked`) ไม่ถูกบันทึก: ผู้เล่นทุกคนต้องกลับมาด้วย resume ซึ่งส่งวัตถุดิบบนสายพานทั้งหมด
+#    ไปใน snapshot และเริ่มนับ ack ใหม่จากตรงนั้นอยู่แล้ว (ดู GameRoom.resume_player)
+# 6. ปิด garbage collector ระหว่างบันทึก/กู้คืน: object ใหม่หลายแสนชิ้นทำให้ GC สแกนซ้ำโดยไม่ได้อะไรคืน (กู้คืนเร็วขึ้นราว 3 เท่า)
+#
+# ตัวอย่างเวลา: บันทึก + กู้คืน 5,000 ห้อง ห้องละ 4 คน ใช้ไม่ถึง 1 วินาที (ดู benchmarks/bench_snapshot.py)
+
+import contextlib
+import gc
+import json
+import os
+import secrets
+
+from game_engine import GameRoom, GameState, Item, Player
+
+FORMAT_VERSION = 1
+
+
+# --- แปลง object <-> list ---
+
+def _relative(timestamp, now):
+    return None if timestamp is None else timestamp - now
+
+
+def _absolute(offset, now):
+    return None if offset is None else now + offset
+
+
+def dump_player(player, now):
+    processing = player.ability_processing
+    if processing is not None:
+        processing = [processing['input'], processing['output'], processing['end_time'] - now, processing['item_id']]
+    objective = player.objective['name'] if player.objective else None
+    return [player.sid, player.name, player.plate, objective, player.ability, processing, _relative(player.away_since, now),
+            player.bot]
+
+
+def load_player(data, now):
+    sid, name, plate, objective, ability, processing, away, bot = data
+    player = Player(sid, name, bot)
+    player.plate = plate
+    player.objective = {'name': objective} if objective is not None else None
+    player.ability = ability
+    if processing is not None:
+        player.ability_processing = {'input': processing[0], 'output': processing[1],
+                                     'end_time': now + processing[2], 'item_id': processing[3]}
+    player.away_since = _absolute(away, now)
+    return player
+
+
+def dump_game_state(game_state, now):
+    items = [[item.id, item.name, item.owner, item.location] for item in game_state.items.values()]
+    return [game_state.is_active, game_state.level, game_state.score, game_state.total_score, game_state.target_score,
+            game_state.time_left, game_state.player_order_sids, game_state.last_spawn_time - now, items,
+            game_state._next_item_id]
+
+
+def load_game_state(data, players, now):
+    is_active, level, score, total_score, target_score, time_left, order, last_spawn, items, next_item_id = data
+    game_state = GameState(order, players, level=level, now=now + last_spawn)
+    game_state.is_active = is_active
+    game_state.score = score
+    game_state.total_score = total_score
+    game_state.target_score = target_score
+    game_state.time_left = time_left
+    for item_id, name, owner, location in items:
+        item = game_state.items[item_id] = Item(item_id, name, owner, location)
+        game_state.held.setdefault(owner, {})[item_id] = item
+    game_state._next_item_id = next_item_id
+    return game_state
+
+
+def dump_room(room, now):
+    """ห้อง 1 ห้องเป็น list (เรียกขณะถือ lock ของห้อง หรือเมื่อไม่มี greenlet อื่นแตะห้องแล้ว)"""
+    return [room.id, room.host_sid, secrets.randbits(63), room.spawn_batch,
+            _relative(room.intermission_until, now), room.last_action_at - now,
+            [dump_player(player, now) for player in room.players.values()],
+            dump_game_state(room.game_state, now) if room.game_state else None, room.public]
+
+
+def load_room(data, transport, clock, now):
+    room_id, host_sid, seed, spawn_batch, intermission, last_action, players, game_state, public = data
+    players = [load_player(player, now) for player in players]
+    room = GameRoom(room_id, players[0].sid, players[0].name, transport, clock=clock, seed=seed)
+    room.players = {player.sid: player for player in players}
+    room.host_sid = host_sid
+    room.spawn_batch = spawn_batch
+    room.intermission_until = _absolute(intermission, now)
+    room.last_action_at = now + last_action
+    room.public = public
+    if game_state is not None:
+        room.game_state = load_game_state(game_state, room.players, now)
+    return room
+
+
+# --- ไฟล์ ---
+
+@contextlib.contextmanager
+def _gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def save(path, rooms, sessions, now):
+    """เขียนทุกห้องและ resume token ลงไฟล์ (เขียนไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ ไฟล์จึงไม่ขาดครึ่งทาง)
+    แต่ละห้องถูกแปลงขณะถือ lock ของห้องนั้น จึงไม่มีห้องที่ถูกบันทึกกลางคำสั่ง"""
+    dumped = []
+    with _gc_paused():
+        for room in rooms:
+            with room.lock:
+                dumped.append(dump_room(room, now))
+        document = {
+            'version': FORMAT_VERSION,
+            'rooms': dumped,
+            'sessions': sessions, # [[token, room_id, sid], ...]
+        }
+        text = json.dumps(document, ensure_ascii=False, separators=(',', ':'))
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temporary, path)
+    return len(document['rooms'])
+
+
+def load(path, transport, clock, now):
+    """อ่านไฟล์ที่ `save()` เขียนไว้ คืน (list ของ GameRoom, sessions) หรือ ([], []) ถ้าไม่มีไฟล์
+    ไฟล์ต่างเวอร์ชันหรือเสียทำให้เกิด ValueError/KeyError/TypeError/IndexError (ผู้เรียกตัดสินใจว่าจะทำอย่างไร)"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return [], []
+    with _gc_paused():
+        document = json.loads(text)
+        if document.get('version') != FORMAT_VERSION:
+            raise ValueError(f'{path}: ไม่รองรับ snapshot เวอร์ชัน {document.get("version")}')
+        return [load_room(room, transport, clock, now) for room in document['rooms']], document['sessions']
@@ -0,0 +1,95 @@
+// admin.js
+// --- Operations Console ---
+// รับข้อมูลจาก /admin/stream (Server-Sent Events) แล้ววาดตาราง ไม่มีการ poll ซ้ำจากฝั่ง browser
+// token ของผู้ดูแลอ่านจาก ?token= ของหน้านี้ แล้วส่งต่อให้ stream (EventSource ตั้ง header เองไม่ได้)
+
+const params = new URLSearchParams(location.search);
+const adminToken = params.get('token') || '';
+let selectedRoom = params.get('room');
+let eventSource = null;
+
+const summaryCards = document.getElementById('summary-cards');
+const roomsTable = document.getElementById('rooms-table');
+const eventsTable = document.getElementById('events-table');
+const streamStatus = document.getElementById('stream-status');
+const intervalSelect = document.getElementById('interval-select');
+const roomDetail = document.getElementById('room-detail');
+
+function escapeHtml(value) {
+    return String(value ?? '-').replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+}
+
+function card(label, value) {
+    return `<div class="bg-[var(--bg-secondary)] rounded-xl shadow p-3">
+        <div class="text-xs text-[var(--text-secondary)]">${label}</div>
+        <div class="text-2xl font-bold">${escapeHtml(value)}</div></div>`;
+}
+
+function renderOverview(o) {
+    summaryCards.innerHTML = [
+        card('Socket ที่เชื่อมต่อ', o.connected_sockets),
+        card('ห้องทั้งหมด', o.rooms),
+        card('กำลังเล่น / พัก / รอ', `${o.rooms_by_phase.active} / ${o.rooms_by_phase.intermission} / ${o.rooms_by_phase.lobby}`),
+        card('Master Loop (ms)', o.loop.iteration_ms.toFixed(2)),
+        card('Loop ช้ากว่ากำหนด (ms)', o.loop.lateness_ms.toFixed(2)),
+        card('ห้องที่ tick รอบล่าสุด', o.loop.rooms_updated),
+        card('ระดับการลดงาน', `${o.degradation.level} (${o.degradation.name})`),
+    ].join('');
+
+    roomsTable.innerHTML = o.top_rooms.map(r => `
+        <tr class="cursor-pointer hover:bg-[var(--bg-tertiary)]" data-room="${escapeHtml(r.room_id)}">
+            <td class="font-bold">${escapeHtml(r.room_id)}</td><td>${escapeHtml(r.phase)}</td><td>${r.players}</td>
+            <td>${escapeHtml(r.level)}</td><td>${escapeHtml(r.score)} / ${escapeHtml(r.target_score)}</td><td>${escapeHtml(r.time_left)}</td>
+            <td>${r.tick_ms.toFixed(3)}</td><td>${r.outbound_queue}</td>
+        </tr>`).join('');
+
+    eventsTable.innerHTML = o.events.map(e => `
+        <tr><td>${escapeHtml(e.event)}</td><td>${e.in_per_second}</td><td>${e.out_per_second}</td>
+            <td>${(e.bytes_out_per_second / 1024).toFixed(1)}</td><td>${e.p99_ms}</td></tr>`).join('');
+}
+
+function renderRoom(room) {
+    if (!selectedRoom) { roomDetail.classList.add('hidden'); return; }
+    roomDetail.classList.remove('hidden');
+    document.getElementById('room-detail-id').textContent = selectedRoom;
+    if (!room) {
+        document.getElementById('room-detail-summary').textContent = 'ไม่พบห้องนี้ (อาจถูกลบไปแล้ว)';
+        document.getElementById('room-detail-players').innerHTML = '';
+        return;
+    }
+    const rtt = room.latency.rtt_ms;
+    document.getElementById('room-detail-summary').innerHTML =
+        `สถานะ: <b>${escapeHtml(room.phase)}</b> · ด่าน ${escapeHtml(room.level)} · คะแนน ${escapeHtml(room.score)} / ${escapeHtml(room.target_score)}` +
+        ` · คะแนนรวม ${escapeHtml(room.total_score)} · tick ${room.tick_ms.toFixed(3)} ms` +
+        ` · round-trip p50/p95/p99 ${rtt.p50}/${rtt.p95}/${rtt.p99} ms (${room.latency.samples} ตัวอย่าง)`;
+    document.getElementById('room-detail-players').innerHTML = room.player_list.map(p => `
+        <tr><td>${escapeHtml(p.name)}${p.sid === room.host_sid ? ' (Host)' : ''}</td><td>${escapeHtml(p.ability)}</td>
+            <td>${escapeHtml(p.objective)}</td><td>${escapeHtml(p.plate.join(' '))}</td><td>${escapeHtml(p.outbound_queue)}</td></tr>`).join('');
+}
+
+function connect() {
+    if (eventSource) eventSource.close();
+    const query = new URLSearchParams({ token: adminToken, interval: intervalSelect.value });
+    if (selectedRoom) query.set('room', selectedRoom);
+    eventSource = new EventSource(`/admin/stream?${query}`);
+    eventSource.onopen = () => { streamStatus.textContent = 'เชื่อมต่อแล้ว'; };
+    eventSource.onerror = () => { streamStatus.textContent = 'การเชื่อมต่อหลุด กำลังลองใหม่...'; };
+    eventSource.onmessage = (message) => {
+        const data = JSON.parse(message.data);
+        renderOverview(data.overview);
+        renderRoom(data.room);
+        streamStatus.textContent = `อัปเดตล่าสุด ${new Date(data.overview.time * 1000).toLocaleTimeString()}`;
+    };
+}
+
+roomsTable.addEventListener('click', (e) => {
+    const row = e.target.closest('tr[data-room]');
+    if (!row) return;
+    selectedRoom = row.dataset.room;
+    connect();
+});
+document.getElementById('room-detail-close').addEventListener('click', () => { selectedRoom = null; renderRoom(null); connect(); });
+intervalSelect.addEventListener('change', connect);
+
+document.documentElement.classList.toggle('dark', localStorage.getItem('theme') === 'dark');
+connect();
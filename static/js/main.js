@@ -5,6 +5,15 @@
 //    - `updateObjectivesUI`: อัปเดตเฉพาะเป้าหมายเมื่อมีการเปลี่ยนแปลงจริงๆ
 // 2. ปรับปรุงการจัดการ State: แยกฟังก์ชันการอัปเดตส่วนต่างๆ ของ UI ให้ชัดเจนขึ้น
 //    ทำให้โค้ดอ่านง่ายและลดโอกาสเกิดข้อผิดพลาด
+// 3. วัด latency ที่ผู้เล่นพบจริง: แนบ seq ไปกับ action แล้วส่งผล round-trip กลับให้เซิร์ฟเวอร์เป็นชุด
+//    (ปิดได้ด้วย localStorage.setItem('latencyTracing', 'off'))
+// 4. วัตถุดิบทุกชิ้นมี id จากเซิร์ฟเวอร์: action อ้างถึงวัตถุดิบด้วย item_id และสายพานไม่แสดงชิ้นเดิมซ้ำ
+// 5. ตอบรับ (ack_items) วัตถุดิบที่ได้รับเป็นชุด ชิ้นที่เซิร์ฟเวอร์ไม่ได้รับ ack จะถูกส่งซ้ำ (ตัดชิ้นซ้ำด้วย id ตามข้อ 4)
+// 6. การเชื่อมต่อหลุดไม่ต้องโหลดหน้าใหม่: เมื่อ socket.io เชื่อมต่อกลับมาจะส่ง resume token เพื่อกลับเข้าที่นั่งเดิม
+//    แล้วสร้างหน้าจอใหม่จาก snapshot เดียว (token เก็บใน sessionStorage จึงใช้ได้แม้กด refresh)
+// 7. หน้า lobby แสดงคะแนนสูงสุดจาก `/leaderboard` (เซิร์ฟเวอร์ตอบจากหน่วยความจำ) โหลดใหม่ทุกครั้งที่กลับมาหน้า lobby
+// 8. host เพิ่มบอทของเซิร์ฟเวอร์ได้จากหน้า lobby (add_bot) และคลิกที่ชื่อบอทเพื่อนำออก (remove_bot)
+// 9. หน้าแรกแสดงรายการห้องสาธารณะทีละหน้า (list_rooms) เซิร์ฟเวอร์ส่งหน้าเดิมมาใหม่เมื่อรายการเปลี่ยนตราบที่ยังอยู่หน้านี้
 
 const socket = io();
 
@@ -15,6 +24,28 @@ let mySid = '';
 let isHost = false;
 let myAbility = null;
 let myCurrentObjective = null; // เก็บข้อมูล objective ปัจจุบันเพื่อเปรียบเทียบ
+let currentLevel = 1;
+let resumeToken = sessionStorage.getItem('resumeToken');
+const MAX_PLATE_SIZE = 6; // ตรงกับ MAX_PLATE_SIZE ใน game_engine.py
+const MAX_PLAYERS = 8; // ตรงกับ MAX_PLAYERS ใน game_engine.py
+
+// --- Room Browser ---
+const ROOM_PAGE_SIZE = 10;
+let roomListOffset = 0;
+let watchingRooms = false;
+
+// --- Item Acks ---
+const ITEM_ACK_INTERVAL_MS = 500;
+const MAX_ACK_BATCH = 64; // ตรงกับ MAX_ACK_BATCH ใน game_engine.py
+let pendingItemAcks = []; // id ของวัตถุดิบที่ได้รับแล้วแต่ยังไม่ได้ตอบรับ
+
+// --- Latency Tracing ---
+const LATENCY_TRACING = localStorage.getItem('latencyTracing') !== 'off';
+const LATENCY_REPORT_INTERVAL_MS = 5000;
+const LATENCY_PENDING_TIMEOUT_MS = 10000;
+let actionSeq = 0;
+const pendingActions = new Map(); // seq -> เวลาที่ส่ง (performance.now())
+let latencySamples = []; // [[seq, rtt_ms, server_ms], ...]
 
 // --- Audio ---
 let audioInitialized = false;
@@ -31,6 +62,12 @@ const leaveRoomBtn = document.getElementById('leave-room-btn');
 const roomCodeDisplay = document.getElementById('room-code-display');
 const playerList = document.getElementById('player-list');
 const startGameBtn = document.getElementById('start-game-btn');
+const addBotBtn = document.getElementById('add-bot-btn');
+const publicRoomCheckbox = document.getElementById('public-room-checkbox');
+const roomListEl = document.getElementById('room-list');
+const roomListPageEl = document.getElementById('room-list-page');
+const roomListPrevBtn = document.getElementById('room-list-prev');
+const roomListNextBtn = document.getElementById('room-list-next');
 const scoreEl = document.getElementById('score');
 const targetScoreEl = document.getElementById('target-score');
 const timeEl = document.getElementById('time');
@@ -59,6 +96,8 @@ const settingsPopup = document.getElementById('settings-popup');
 const settingsCloseBtn = document.getElementById('settings-close-btn');
 const volumeSlider = document.getElementById('volume-slider');
 const themeToggleBtn = document.getElementById('theme-toggle');
+const leaderboardWindowEl = document.getElementById('leaderboard-window');
+const leaderboardListEl = document.getElementById('leaderboard-list');
 
 // --- Audio Functions ---
 function convertVolumeToDb(value) {
@@ -101,10 +140,133 @@ function playSound(soundName) {
     } catch (e) { console.error(`Error playing sound ${soundName}:`, e); }
 }
 
+// --- Latency Tracing Functions ---
+function emitAction(event, payload) {
+    if (!LATENCY_TRACING) { socket.emit(event, payload); return; }
+    const seq = ++actionSeq;
+    pendingActions.set(seq, performance.now());
+    socket.emit(event, { ...payload, seq, sent_at: Date.now() });
+}
+
+function handleAck(data) {
+    const ack = data && data.ack;
+    if (!ack || ack.sid !== mySid) return;
+    const sentAt = pendingActions.get(ack.seq);
+    if (sentAt === undefined) return;
+    pendingActions.delete(ack.seq);
+    latencySamples.push([ack.seq, Math.round((performance.now() - sentAt) * 10) / 10, ack.server_ms]);
+}
+
+function flushLatencyReport() {
+    const now = performance.now();
+    pendingActions.forEach((sentAt, seq) => { if (now - sentAt > LATENCY_PENDING_TIMEOUT_MS) pendingActions.delete(seq); });
+    if (!latencySamples.length || !currentRoomId || !socket.connected) return;
+    socket.emit('latency_report', { room_id: currentRoomId, samples: latencySamples.splice(0, 100) });
+}
+
+// --- Item Ack Functions ---
+function receiveItems(items) {
+    items.forEach(item => { pendingItemAcks.push(item.id); addToConveyor(item); });
+}
+
+function flushItemAcks() {
+    if (!pendingItemAcks.length || !currentRoomId || !socket.connected) return;
+    socket.emit('ack_items', { room_id: currentRoomId, level: currentLevel, ids: pendingItemAcks.splice(0, MAX_ACK_BATCH) });
+}
+
+// --- Session Resume Functions ---
+function enterRoom(data) {
+    currentRoomId = data.room_id;
+    isHost = data.is_host;
+    roomCodeDisplay.textContent = currentRoomId;
+    resumeToken = data.resume_token;
+    sessionStorage.setItem('resumeToken', resumeToken);
+}
+
+function forgetSession() {
+    resumeToken = null;
+    sessionStorage.removeItem('resumeToken');
+}
+
+function applyResumeSnapshot(data) {
+    currentRoomId = data.room_id;
+    mySid = data.your_sid;
+    isHost = data.lobby.host_sid === mySid;
+    roomCodeDisplay.textContent = currentRoomId;
+    myNameEl.textContent = data.your_name;
+    if (!data.state) {
+        showScreen('lobby');
+        renderLobby(data.lobby);
+        return;
+    }
+    showScreen(data.phase === 'intermission' ? 'level-complete' : 'game');
+    if (data.left_neighbor) { passLeftNameEl.textContent = data.left_neighbor; passRightNameEl.textContent = data.right_neighbor; }
+    updateGameStateUI(data.state);
+    clearConveyor();
+    receiveItems(data.items);
+}
+
 // --- UI Functions ---
 function showScreen(screenName) {
     Object.values(screens).forEach(s => s.classList.add('hidden'));
     if (screens[screenName]) screens[screenName].classList.remove('hidden');
+    if (screenName === 'lobby') loadLeaderboard();
+    if (screenName === 'login') requestRoomList(roomListOffset);
+    else if (watchingRooms) { watchingRooms = false; socket.emit('list_rooms', { watch: false }); }
+}
+
+function requestRoomList(offset) {
+    roomListOffset = Math.max(0, offset);
+    watchingRooms = true;
+    socket.emit('list_rooms', { offset: roomListOffset, limit: ROOM_PAGE_SIZE });
+}
+
+function renderRoomList(data) {
+    if (data.offset !== roomListOffset) return; // คำตอบของหน้าเก่าที่มาถึงช้า
+    if (!data.rooms.length && data.offset > 0) { requestRoomList(data.offset - ROOM_PAGE_SIZE); return; }
+    roomListEl.innerHTML = '';
+    if (!data.rooms.length) {
+        roomListEl.innerHTML = '<li class="text-[var(--text-secondary)]">ยังไม่มีห้องสาธารณะ</li>';
+    }
+    data.rooms.forEach(room => {
+        const li = document.createElement('li');
+        li.className = 'flex items-center justify-between text-[var(--text-primary)]';
+        const label = document.createElement('span');
+        label.textContent = `${room.room_id} - ${room.host} (${room.players - room.bots}/${room.max_players}${room.bots ? `, บอท ${room.bots}` : ''})`;
+        const button = document.createElement('button');
+        button.className = 'bg-blue-500 text-white px-3 py-1 rounded-md font-bold hover:bg-blue-600 dark:bg-blue-600 dark:hover:bg-blue-700 transition';
+        button.textContent = 'เข้าร่วม';
+        button.addEventListener('click', () => {
+            initAudio(); playSound('click'); myName = playerNameInput.value.trim();
+            if (!myName) { showPopup('กรุณาใส่ชื่อของคุณ!'); return; }
+            socket.emit('join_room', { name: myName, room_id: room.room_id });
+        });
+        li.append(label, button);
+        roomListEl.appendChild(li);
+    });
+    const pages = Math.max(1, Math.ceil(data.total / ROOM_PAGE_SIZE));
+    roomListPageEl.textContent = `${Math.floor(data.offset / ROOM_PAGE_SIZE) + 1}/${pages}`;
+    roomListPrevBtn.disabled = data.offset === 0;
+    roomListNextBtn.disabled = data.offset + ROOM_PAGE_SIZE >= data.total;
+}
+
+function loadLeaderboard() {
+    fetch(`/leaderboard?window=${leaderboardWindowEl.value}`)
+        .then(response => response.ok ? response.json() : { entries: [] })
+        .then(data => {
+            leaderboardListEl.innerHTML = '';
+            if (!data.entries.length) {
+                leaderboardListEl.innerHTML = '<li class="list-none text-[var(--text-secondary)]">ยังไม่มีผลการเล่น</li>';
+                return;
+            }
+            data.entries.forEach(entry => {
+                const li = document.createElement('li');
+                li.className = 'text-[var(--text-primary)]';
+                li.textContent = `${entry.score} คะแนน (ด่าน ${entry.level}) - ${entry.players.join(', ')}`;
+                leaderboardListEl.appendChild(li);
+            });
+        })
+        .catch(() => {});
 }
 
 function showToast(message, type = 'info') {
@@ -191,16 +353,16 @@ function handleDrop(zone) {
     switch (targetId) {
         case 'pass-left-zone':
         case 'pass-right-zone':
-            socket.emit('player_action', { room_id: currentRoomId, type: 'pass_item', direction: targetId.includes('left') ? 'left' : 'right', item: draggedData });
+            emitAction('player_action', { room_id: currentRoomId, type: 'pass_item', direction: targetId.includes('left') ? 'left' : 'right', item_id: draggedData.id });
             playSound('receive');
             return true;
         case 'trash-zone':
-            socket.emit('player_action', { room_id: currentRoomId, type: 'trash_item' });
+            emitAction('player_action', { room_id: currentRoomId, type: 'trash_item', item_id: draggedData.id });
             playSound('trash');
             return true;
         case 'ability-station':
             if (draggedData.type === 'ingredient') {
-                socket.emit('use_ability', { room_id: currentRoomId, item_name: draggedData.name });
+                emitAction('use_ability', { room_id: currentRoomId, item_id: draggedData.id });
                 return true; // Assume success, server will send fail message if needed
             }
             return false;
@@ -224,9 +386,8 @@ function handleDrop(zone) {
                     return false;
                 }
                 
-                const newContents = [...plateData, ingredientToAdd];
-                if (newContents.length <= 6) {
-                    socket.emit('player_action', { room_id: currentRoomId, type: 'add_to_plate', new_plate_contents: newContents });
+                if (plateData.length < MAX_PLATE_SIZE) {
+                    emitAction('player_action', { room_id: currentRoomId, type: 'add_to_plate', item_id: draggedData.id });
                     playSound('click');
                     return true;
                 }
@@ -236,17 +397,28 @@ function handleDrop(zone) {
 }
 
 // --- Element Creation ---
-function createItemElement(itemName) {
+function createItemElement(itemData) {
     const item = document.createElement('div');
-    item.textContent = itemName;
+    item.textContent = itemData.name;
     item.className = 'item bg-yellow-200 text-yellow-800 dark:bg-yellow-700 dark:text-yellow-100 font-semibold shadow-sm m-1';
-    item.id = 'item-' + Date.now() + Math.random();
-    const data = {type: 'ingredient', name: itemName};
+    item.id = 'item-' + itemData.id;
+    const data = {type: 'ingredient', name: itemData.name, id: itemData.id};
     item.addEventListener('mousedown', (e) => startDrag(e, data, item));
     item.addEventListener('touchstart', (e) => startDrag(e, data, item));
     return item;
 }
 
+function addToConveyor(itemData) {
+    if (itemData.type !== 'ingredient' || document.getElementById('item-' + itemData.id)) return; // ชิ้นเดิมที่ถูกส่งคืน
+    const placeholder = conveyorBelt.querySelector('span');
+    if (placeholder) placeholder.remove();
+    conveyorBelt.appendChild(createItemElement(itemData));
+}
+
+function clearConveyor() {
+    conveyorBelt.innerHTML = '<span class="text-[var(--text-secondary)] flex-shrink-0">วัตถุดิบที่ได้รับ...</span>';
+}
+
 function createPlateElement(contents = []) {
     const plate = document.createElement('div');
     plate.className = 'plate drop-zone bg-[var(--bg-secondary)] p-3 rounded-lg shadow-md w-4/5 flex flex-col items-center border-[var(--border-color)]';
@@ -272,14 +444,23 @@ function createPlateElement(contents = []) {
 
 // --- Event Listeners ---
 function setupEventListeners() {
-    createBtn.addEventListener('click', () => { initAudio(); playSound('click'); myName = playerNameInput.value.trim(); if (!myName) { showPopup('กรุณาใส่ชื่อของคุณ!'); return; } socket.emit('create_room', { name: myName }); });
+    createBtn.addEventListener('click', () => { initAudio(); playSound('click'); myName = playerNameInput.value.trim(); if (!myName) { showPopup('กรุณาใส่ชื่อของคุณ!'); return; } socket.emit('create_room', { name: myName, public: publicRoomCheckbox.checked }); });
+    roomListPrevBtn.addEventListener('click', () => requestRoomList(roomListOffset - ROOM_PAGE_SIZE));
+    roomListNextBtn.addEventListener('click', () => requestRoomList(roomListOffset + ROOM_PAGE_SIZE));
     joinBtn.addEventListener('click', () => { initAudio(); playSound('click'); myName = playerNameInput.value.trim(); const roomId = roomCodeInput.value.trim().toUpperCase(); if (!myName || !roomId) { showPopup('กรุณาใส่ชื่อและรหัสห้อง!'); return; } socket.emit('join_room', { name: myName, room_id: roomId }); });
-    leaveRoomBtn.addEventListener('click', () => { playSound('click'); location.reload(); });
+    leaveRoomBtn.addEventListener('click', () => {
+        playSound('click');
+        forgetSession();
+        socket.emit('leave_room', { room_id: currentRoomId }, () => location.reload());
+        setTimeout(() => location.reload(), 1000);
+    });
     roomCodeDisplay.addEventListener('click', () => { if(currentRoomId) navigator.clipboard.writeText(currentRoomId).then(() => { showToast('คัดลอกรหัสห้องแล้ว!', 'success'); playSound('click'); }); });
     startGameBtn.addEventListener('click', () => { playSound('levelUp'); socket.emit('start_game', { room_id: currentRoomId }); });
-    submitOrderBtn.addEventListener('click', () => { playSound('click'); socket.emit('player_action', { room_id: currentRoomId, type: 'submit_order' }); });
+    addBotBtn.addEventListener('click', () => { playSound('click'); socket.emit('add_bot', { room_id: currentRoomId }); });
+    submitOrderBtn.addEventListener('click', () => { playSound('click'); emitAction('player_action', { room_id: currentRoomId, type: 'submit_order' }); });
     backToLobbyBtn.addEventListener('click', () => { playSound('click'); showScreen('lobby'); });
     wonBackToLobbyBtn.addEventListener('click', () => { playSound('click'); showScreen('lobby'); });
+    leaderboardWindowEl.addEventListener('change', loadLeaderboard);
     popupCloseBtn.addEventListener('click', () => popupOverlay.classList.add('hidden'));
     settingsBtn.addEventListener('click', () => settingsPopup.classList.remove('hidden'));
     settingsCloseBtn.addEventListener('click', () => settingsPopup.classList.add('hidden'));
@@ -306,6 +487,7 @@ function updateGlobalUI(state) {
     targetScoreEl.textContent = state.target_score;
     timeEl.textContent = state.time_left;
     levelEl.textContent = state.level;
+    currentLevel = state.level;
     playerCountEl.textContent = state.player_order_sids.length;
 }
 
@@ -390,25 +572,53 @@ function updateGameStateUI(state) {
     }
 }
 
+function renderLobby(data) {
+    playerList.innerHTML = '';
+    data.players.forEach(p => {
+        const li = document.createElement('li');
+        li.className = 'text-[var(--text-primary)]';
+        li.textContent = p.name;
+        if (p.sid === data.host_sid) li.innerHTML += ' <span class="player-tag bg-yellow-400 text-yellow-900">Host</span>';
+        if (p.sid === mySid) li.innerHTML += ' <span class="player-tag bg-blue-400 text-white">You</span>';
+        if (p.away) li.innerHTML += ' <span class="player-tag bg-gray-400 text-white">หลุด</span>';
+        if (p.bot) {
+            li.innerHTML += ' <span class="player-tag bg-green-500 text-white">บอท</span>';
+            if (mySid === data.host_sid) {
+                li.classList.add('cursor-pointer');
+                li.title = 'คลิกเพื่อนำบอทออก';
+                li.addEventListener('click', () => { playSound('click'); socket.emit('remove_bot', { room_id: currentRoomId, sid: p.sid }); });
+            }
+        }
+        playerList.appendChild(li);
+    });
+    isHost = (mySid === data.host_sid);
+    startGameBtn.classList.toggle('hidden', !(isHost && data.players.length >= 1));
+    addBotBtn.classList.toggle('hidden', !(isHost && data.players.length < MAX_PLAYERS));
+}
+
 // --- Socket.IO Handlers ---
 function setupSocketListeners() {
-    socket.on('connect', () => { mySid = socket.id; showScreen('login'); });
-    socket.on('disconnect', () => { showPopup('การเชื่อมต่อหลุด!'); showScreen('login'); setTimeout(() => location.reload(), 2000); });
-    socket.on('room_created', (data) => { currentRoomId = data.room_id; isHost = data.is_host; roomCodeDisplay.textContent = currentRoomId; showScreen('lobby'); });
-    socket.on('join_success', (data) => { currentRoomId = data.room_id; isHost = data.is_host; roomCodeDisplay.textContent = currentRoomId; showScreen('lobby'); });
+    socket.on('connect', () => {
+        mySid = socket.id;
+        if (resumeToken) socket.emit('resume', { token: resumeToken });
+        else showScreen('login');
+    });
+    socket.on('disconnect', () => {
+        if (resumeToken) { showToast('การเชื่อมต่อหลุด! กำลังเชื่อมต่อใหม่...', 'error'); return; }
+        showPopup('การเชื่อมต่อหลุด!'); showScreen('login'); setTimeout(() => location.reload(), 2000);
+    });
+    socket.on('resume_success', (data) => { showToast('เชื่อมต่อกลับเข้าห้องแล้ว', 'success'); applyResumeSnapshot(data); });
+    socket.on('resume_failed', () => {
+        forgetSession();
+        if (!currentRoomId) { showScreen('login'); return; }
+        showPopup('ไม่สามารถกลับเข้าห้องเดิมได้'); showScreen('login'); setTimeout(() => location.reload(), 2000);
+    });
+    socket.on('room_created', (data) => { enterRoom(data); showScreen('lobby'); });
+    socket.on('join_success', (data) => { enterRoom(data); showScreen('lobby'); });
+    socket.on('room_list', renderRoomList);
     socket.on('update_lobby', (data) => {
         if (screens.lobby.classList.contains('hidden') || currentRoomId !== data.room_id) return;
-        playerList.innerHTML = '';
-        data.players.forEach(p => {
-            const li = document.createElement('li');
-            li.className = 'text-[var(--text-primary)]';
-            li.textContent = p.name;
-            if (p.sid === data.host_sid) li.innerHTML += ' <span class="player-tag bg-yellow-400 text-yellow-900">Host</span>';
-            if (p.sid === mySid) li.innerHTML += ' <span class="player-tag bg-blue-400 text-white">You</span>';
-            playerList.appendChild(li);
-        });
-        isHost = (mySid === data.host_sid);
-        startGameBtn.classList.toggle('hidden', !(isHost && data.players.length >= 1));
+        renderLobby(data);
     });
     socket.on('new_host', (data) => { isHost = (mySid === data.host_sid); if (isHost) showToast('คุณได้รับตำแหน่ง Host!', 'info'); });
     socket.on('error_message', (data) => { showPopup(data.message); playSound('error'); });
@@ -420,19 +630,27 @@ function setupSocketListeners() {
         myNameEl.textContent = data.your_name;
         updateGameStateUI(data.initial_state);
     });
-    socket.on('update_game_state', updateGameStateUI);
+    socket.on('update_game_state', (data) => { handleAck(data); updateGameStateUI(data); });
     socket.on('update_neighbors', (data) => { passLeftNameEl.textContent = data.left_neighbor; passRightNameEl.textContent = data.right_neighbor; });
     socket.on('receive_item', (data) => {
+        handleAck(data);
         playSound('receive');
-        const placeholder = conveyorBelt.querySelector('span');
-        if (placeholder) placeholder.remove();
-        if (data.item.type === 'ingredient') {
-            conveyorBelt.appendChild(createItemElement(data.item.name));
-        }
+        receiveItems([data.item]);
+    });
+    socket.on('receive_items', (data) => {
+        // วัตถุดิบหลายชิ้นในข้อความเดียว (เซิร์ฟเวอร์รวมการสุ่มเมื่อทำงานหนัก หรือส่งซ้ำชิ้นที่ยังไม่ได้ ack)
+        if (!data.retransmit) playSound('receive');
+        receiveItems(data.items);
+    });
+    socket.on('action_success', (data) => { handleAck(data); showToast(data.message, 'success'); if (data.sound) playSound(data.sound); });
+    socket.on('action_fail', (data) => { handleAck(data); showToast(data.message, 'error'); if (data.sound) playSound(data.sound); });
+    socket.on('clear_all_items', () => { clearConveyor(); pendingItemAcks = []; }); // id เริ่มใหม่ทุกด่าน
+    socket.on('resync', (data) => {
+        // เซิร์ฟเวอร์ทิ้งข้อความที่ค้างส่งให้เรา แล้วส่งสถานะล่าสุดทั้งหมดมาแทน
+        clearConveyor();
+        receiveItems(data.items);
+        if (data.state) updateGameStateUI(data.state);
     });
-    socket.on('action_success', (data) => { showToast(data.message, 'success'); if (data.sound) playSound(data.sound); });
-    socket.on('action_fail', (data) => { showToast(data.message, 'error'); if (data.sound) playSound(data.sound); });
-    socket.on('clear_all_items', () => { conveyorBelt.innerHTML = '<span class="text-[var(--text-secondary)] flex-shrink-0">วัตถุดิบที่ได้รับ...</span>'; });
     socket.on('level_complete', (data) => { playSound('levelUp'); levelCompleteMessageEl.textContent = `คะแนนในด่าน ${data.level}: ${data.level_score}`; totalScoreMessageEl.textContent = `คะแนนรวม: ${data.total_score}`; showScreen('level-complete'); });
     socket.on('start_next_level', (data) => { showScreen('game'); updateGameStateUI(data); });
     socket.on('game_over', (data) => { playSound('gameOver'); finalTotalScoreEl.textContent = data.total_score; gameOverMessageEl.textContent = data.message || ''; gameOverMessageEl.classList.toggle('hidden', !data.message); showScreen('game-over'); });
@@ -447,4 +665,6 @@ document.addEventListener('DOMContentLoaded', () => {
     volumeSlider.value = savedVolume;
     setupEventListeners();
     setupSocketListeners();
+    if (LATENCY_TRACING) setInterval(flushLatencyReport, LATENCY_REPORT_INTERVAL_MS);
+    setInterval(flushItemAcks, ITEM_ACK_INTERVAL_MS);
 });
@@ -0,0 +1,8 @@
+# tests/conftest.py
+#
+# โมดูลของเกมอยู่ที่รากของ repo (ไม่ใช่ package) จึงเพิ่มรากเข้า sys.path ก่อน import ในทุกไฟล์ทดสอบ
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
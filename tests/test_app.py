@@ -0,0 +1,65 @@
+# tests/test_app.py
+#
+# ทดสอบ handler ผ่าน Socket.IO test client ของ Flask-SocketIO (ไม่เปิด socket จริง)
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client():
+    clients = []
+
+    def connect():
+        test_client = app.socketio.test_client(app.app)
+        clients.append(test_client)
+        return test_client
+    yield connect
+    for test_client in clients:
+        if test_client.is_connected():
+            test_client.disconnect()
+
+
+def received(test_client, name):
+    return [message['args'][0] for message in test_client.get_received() if message['name'] == name]
+
+
+def create_room(test_client, name='host', **fields):
+    test_client.emit('create_room', {'name': name, **fields})
+    return received(test_client, 'room_created')[0]
+
+
+def test_resume_twice_on_same_connection_keeps_it(client):
+    host = client()
+    created = create_room(host)
+    host.emit('resume', {'token': created['resume_token']})
+    host.emit('resume', {'token': created['resume_token']})
+    assert len(received(host, 'resume_success')) == 2
+    assert host.is_connected()
+    room = app.rooms[created['room_id']]
+    assert room.players[room.host_sid].away_since is None
+
+
+def test_join_rejected_during_intermission(client):
+    host = client()
+    created = create_room(host)
+    room = app.rooms[created['room_id']]
+    host.emit('start_game', {'room_id': created['room_id']})
+    room.game_state.is_active = False
+    room.intermission_until = room.clock() + 5  # ผ่านด่านแล้ว รอเริ่มด่านถัดไป
+    assert room.phase == 'intermission'
+    guest = client()
+    guest.emit('join_room', {'room_id': created['room_id'], 'name': 'guest'})
+    assert received(guest, 'join_success') == []
+    assert len(room.players) == 1
+
+
+def test_restore_rejects_snapshot_of_other_version(tmp_path, monkeypatch):
+    path = tmp_path / 'rooms.json'
+    path.write_text('{"version": 0, "rooms": [], "sessions": []}', encoding='utf-8')
+    monkeypatch.setattr(app, 'SNAPSHOT_FILE', str(path))
+    before = dict(app.rooms)
+    app.restore_rooms()
+    assert app.rooms == before
+    assert not path.exists() and (tmp_path / 'rooms.json.rejected').exists()
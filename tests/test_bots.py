@@ -0,0 +1,48 @@
+from bots import act, direction_to, recipe_plan
+from game_engine import RECIPES, GameRoom, NullTransport
+from simulation import GreedyPolicy, ManualClock
+
+
+def test_direction_to_picks_nearest_target_around_the_table():
+    order = ['a', 'b', 'c', 'd', 'e']
+    assert direction_to(order, 'a', ['b']) == 'right'
+    assert direction_to(order, 'a', ['e']) == 'left'
+    assert direction_to(order, 'a', ['c', 'e']) == 'left' # c อยู่ขวา 2 ที่ e อยู่ซ้าย 1 ที่
+
+
+def test_recipe_plan_splits_missing_and_stale():
+    name = 'ไอศกรีม'
+    assert recipe_plan(name, ('🍒', '🥕')) == (('🍨',), ('🥕',))
+    assert recipe_plan(name, tuple(RECIPES[name]['ingredients'])) == ((), ())
+
+
+def make_room():
+    room = GameRoom('BOTS', 'b0', 'บอท0', NullTransport(), clock=ManualClock(100.0), seed=3)
+    room.players['b0'].bot = True
+    room.add_player('b1', 'บอท1', bot=True)
+    room.start_game()
+    return room
+
+
+def test_bot_adds_a_missing_ingredient_from_its_own_conveyor():
+    room = make_room()
+    bot = room.players['b0']
+    needed = recipe_plan(bot.objective['name'], ())[0][0]
+    other = room.game_state.create_item('b1', needed)
+    assert act(room, bot) is None
+    item = room.game_state.create_item('b0', needed)
+    assert act(room, bot) == 'add_to_plate'
+    assert bot.plate == [needed]
+    assert item.id not in room.game_state.items
+    assert room.game_state.conveyor('b1') == [other]
+
+
+def test_greedy_policy_consumes_its_inventory():
+    room = make_room()
+    bot = room.players['b0']
+    needed = recipe_plan(bot.objective['name'], ())[0][0]
+    item = room.game_state.create_item('b0', needed)
+    inventory = {item.id: item.name}
+    assert GreedyPolicy().act(room, 'b0', inventory)
+    assert inventory == {}
+    assert bot.plate == [needed]
@@ -0,0 +1,111 @@
+from game_engine import CONVEYOR_CAPACITY, GameRoom
+from simulation import ManualClock, SimulationTransport
+
+
+def make_room(players=3):
+    clock = ManualClock(1000.0)
+    transport = SimulationTransport()
+    room = GameRoom('ENG', 'p0', 'p0', transport, clock=clock, seed=5)
+    for i in range(1, players):
+        room.add_player(f'p{i}', f'p{i}')
+    room.start_game()
+    return room, clock, transport
+
+
+def run(room, clock, seconds):
+    for _ in range(seconds):
+        clock.advance(1)
+        room.update()
+
+
+def assert_ledger(game_state):
+    """ดัชนีตามเจ้าของตรงกับ items ทุกชิ้น และไม่มีใครถือเกินความจุ"""
+    indexed = {}
+    for sid, held in game_state.held.items():
+        assert len(held) <= CONVEYOR_CAPACITY
+        for item_id, item in held.items():
+            assert item.owner == sid and item.id == item_id
+            indexed[item_id] = item
+    assert indexed == game_state.items
+    assert set(game_state.unacked) == set(game_state.held)
+    for sid, pending in game_state.unacked.items():
+        assert set(pending) <= set(game_state.held[sid])
+
+
+def test_spawn_fills_conveyors_up_to_capacity():
+    room, clock, transport = make_room()
+    run(room, clock, 60)
+    game_state = room.game_state
+    assert_ledger(game_state)
+    for sid in game_state.player_order_sids:
+        assert len(game_state.held[sid]) == CONVEYOR_CAPACITY
+        assert set(transport.inventories[sid]) == set(game_state.held[sid])
+        assert not game_state.has_room(sid)
+
+
+def test_pass_item_moves_ownership_and_rejects_stale_ids():
+    room, clock, transport = make_room()
+    run(room, clock, 10)
+    game_state = room.game_state
+    item = next(iter(game_state.held['p0'].values()))
+    room.handle_player_action('p0', {'type': 'pass_item', 'item_id': item.id, 'direction': 'right'})
+    assert item.owner == 'p1' and item.id in game_state.held['p1'] and item.id not in game_state.held['p0']
+    assert item.id not in game_state.unacked['p0'] and item.id in game_state.unacked['p1']
+    assert_ledger(game_state)
+    fails = transport.message_counts['action_fail']
+    room.handle_player_action('p0', {'type': 'pass_item', 'item_id': item.id, 'direction': 'right'})
+    assert item.owner == 'p1' and transport.message_counts['action_fail'] == fails + 1
+
+
+def test_pass_to_full_conveyor_returns_item():
+    room, clock, _ = make_room()
+    run(room, clock, 60)
+    game_state = room.game_state
+    item = next(iter(game_state.held['p0'].values()))
+    room.handle_player_action('p0', {'type': 'pass_item', 'item_id': item.id, 'direction': 'left'})
+    assert item.owner == 'p0'
+    assert_ledger(game_state)
+
+
+def test_add_to_plate_and_trash_remove_items():
+    room, clock, _ = make_room()
+    run(room, clock, 10)
+    game_state = room.game_state
+    plated, trashed = list(game_state.held['p0'].values())[:2]
+    room.handle_player_action('p0', {'type': 'add_to_plate', 'item_id': plated.id})
+    room.handle_player_action('p0', {'type': 'trash_item', 'item_id': trashed.id})
+    assert room.players['p0'].plate == [plated.name]
+    assert plated.id not in game_state.items and trashed.id not in game_state.items
+    assert_ledger(game_state)
+
+
+def test_ack_and_retransmit():
+    room, clock, transport = make_room()
+    run(room, clock, 10)
+    game_state = room.game_state
+    acked = list(game_state.unacked['p0'])
+    room.ack_items('p0', game_state.level, acked)
+    room.ack_items('p1', game_state.level + 1, list(game_state.unacked['p1'])) # ack ของด่านอื่นถูกทิ้ง
+    assert not set(acked) & set(game_state.unacked['p0'])
+    assert game_state.unacked['p1']
+    resent = transport.message_counts['receive_items']
+    room.retransmit_after = 3
+    run(room, clock, 1)
+    assert transport.message_counts['receive_items'] == resent + 2 # p1 และ p2 ที่ยังไม่ได้ ack
+    assert not game_state.unacked['p0']
+    assert_ledger(game_state)
+
+
+def test_leave_and_resume_keep_ledger_consistent():
+    room, clock, _ = make_room()
+    run(room, clock, 10)
+    game_state = room.game_state
+    p1_items = set(game_state.held['p1'])
+    room.suspend_player('p1')
+    snapshot = room.resume_player('p1', 'p1b')
+    assert set(game_state.held['p1b']) == p1_items and 'p1' not in game_state.held
+    assert {item['id'] for item in snapshot['items']} == {item.id for item in game_state.conveyor('p1b')}
+    assert_ledger(game_state)
+    room.handle_player_left('p2')
+    assert 'p2' not in game_state.held and 'p2' not in game_state.unacked
+    assert_ledger(game_state)
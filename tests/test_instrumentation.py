@@ -0,0 +1,24 @@
+import sys
+
+from greenlet import getcurrent, greenlet
+
+from instrumentation import Instrumentation, context_from_stack
+
+
+def test_context_comes_from_the_blocking_greenlets_stack():
+    instrumentation = Instrumentation(socketio=None)
+    main = getcurrent()
+
+    def work(event, room):
+        tracked = instrumentation.track(event, room)
+        with tracked:
+            main.switch() # สลับไป greenlet อื่นกลางงาน (เช่น รอ lock หรือส่งข้อความ)
+
+    a, b = greenlet(work), greenlet(work)
+    a.switch('a', 'R1')
+    b.switch('b', 'R2')
+    a.switch() # a จบก่อน b
+    assert context_from_stack(b.gr_frame).event == 'b'
+    assert context_from_stack(b.gr_frame).room == 'R2'
+    b.switch()
+    assert context_from_stack(sys._getframe()) is None
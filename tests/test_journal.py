@@ -0,0 +1,67 @@
+from bots import act
+from game_engine import GameRoom
+from journal import KIND_JOIN, RoomJournal, read_journal
+from simulation import GreedyPolicy, ManualClock, SimulationTransport
+from tools.replay import replay
+
+
+def play_recorded(path, seconds=120):
+    """เล่นห้องที่มีผู้เล่นจริง 2 คนกับบอท 1 ตัวพร้อมบันทึก journal คืนห้องที่เล่นแล้ว"""
+    clock = ManualClock(1000.0)
+    transport = SimulationTransport()
+    room = GameRoom('JRNL', 'h0', 'host', transport, clock=clock, seed=7)
+    journal = RoomJournal(str(path))
+    journal.record_create(room.now, room.id, room.seed, 'h0', 'host')
+    room.recorder = journal
+    room.add_player('bot-1', 'บอท', bot=True)
+    room.add_player('p2', 'guest')
+    room.start_game()
+    policy = GreedyPolicy()
+    for _ in range(seconds):
+        for sid in list(room.game_state.player_order_sids) if room.game_state else ():
+            if room.players[sid].bot:
+                act(room, room.players[sid])
+            else:
+                policy.act(room, sid, transport.inventories[sid])
+        clock.advance(1)
+        room.update()
+    room.handle_player_left('p2')
+    with open(path, 'wb') as f:
+        f.write(journal.take_buffer())
+    return room
+
+
+def test_join_records_bot_flag(tmp_path):
+    path = tmp_path / 'room.journal'
+    play_recorded(path, seconds=0)
+    joins = [payload for kind, _, payload in read_journal(path) if kind == KIND_JOIN]
+    assert joins == [['bot-1', 'บอท', True], ['p2', 'guest', False]]
+
+
+def test_replay_reproduces_the_room(tmp_path):
+    path = tmp_path / 'room.journal'
+    room = play_recorded(path)
+    assert room.game_state is not None
+    states = list(replay(read_journal(path)))
+    assert states[-1][2] == room.get_augmented_state_for_ui()
+
+
+def test_replayed_room_matches_ledger_and_lobby(tmp_path, monkeypatch):
+    path = tmp_path / 'room.journal'
+    room = play_recorded(path)
+    replayed = []
+
+    class CapturedRoom(GameRoom):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            replayed.append(self)
+
+    monkeypatch.setattr('tools.replay.GameRoom', CapturedRoom)
+    list(replay(read_journal(path)))
+    other = replayed[0]
+    assert other.get_lobby_info() == room.get_lobby_info()
+    assert [p.plate for p in other.players.values()] == [p.plate for p in room.players.values()]
+    assert {i: (item.name, item.owner, item.location) for i, item in other.game_state.items.items()} == \
+           {i: (item.name, item.owner, item.location) for i, item in room.game_state.items.items()}
+    assert other.game_state.unacked.keys() == room.game_state.unacked.keys()
+    assert not other.game_state.unacked['bot-1'] # บอทไม่ได้รับ receive_item จึงไม่มีอะไรรอ ack
@@ -0,0 +1,6 @@
+from latency import MAX_RTT_MS, parse_samples
+
+
+def test_parse_samples_keeps_only_plausible_pairs():
+    samples = [[1, 20, 3], [2, 5, 8], [3, MAX_RTT_MS + 1, 0], [4, 7.5, 7.5]]
+    assert parse_samples(samples) == [(20.0, 3.0), (7.5, 7.5)] # server_ms เกิน rtt หรือ rtt เกินเพดานถูกทิ้ง
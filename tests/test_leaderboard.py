@@ -0,0 +1,42 @@
+import threading
+
+from leaderboard import Leaderboard
+
+
+def make_board(tmp_path):
+    return Leaderboard(str(tmp_path / 'board.db'), top_k=5, levels=(1, 2), max_queue=100000)
+
+
+def test_flush_merges_top_k(tmp_path):
+    board = make_board(tmp_path)
+    for score in (30, 10, 50, 20):
+        board.record('ROOM', 'won', 1, score, ['a'])
+    assert board.flush() == 4
+    assert [entry['score'] for entry in board.top()] == [50, 30, 20, 10]
+    assert [entry['score'] for entry in board.top(level=1, window='day')] == [50, 30, 20, 10]
+    assert board.top(level=2) == []
+
+
+def test_refresh_reloads_from_db(tmp_path):
+    board = make_board(tmp_path)
+    board.record('ROOM', 'won', 2, 40, ['a'])
+    board.flush()
+    board.close()
+    reopened = make_board(tmp_path)
+    reopened.refresh()
+    assert [entry['score'] for entry in reopened.top(level=2)] == [40]
+
+
+def test_concurrent_flushes_write_every_result_once(tmp_path):
+    board = make_board(tmp_path)
+    for i in range(20000):
+        board.record('ROOM', 'won', 1, i, ['a'])
+    threads = [threading.Thread(target=board.flush) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert board.pending() == 0
+    assert board._connect().execute('SELECT COUNT(*) FROM results').fetchone()[0] == 20000
+    assert [entry['score'] for entry in board.top()] == [19999, 19998, 19997, 19996, 19995]
+    board.close()
@@ -0,0 +1,119 @@
+import json
+from types import SimpleNamespace
+
+from outbound import OutboundQueues
+from simulation import ManualClock
+
+SID = 'eio-1'
+
+
+class FakeSocket:
+    def __init__(self):
+        self.queue = SimpleNamespace(qsize=lambda: self.depth)
+        self.depth = 0
+
+
+class FakeEio:
+    def __init__(self):
+        self.sockets = {SID: FakeSocket()}
+        self.sent = []
+
+    def send_packet(self, eio_sid, pkt):
+        self.sent.append(pkt.data)
+
+
+def packet(event, data=None):
+    return SimpleNamespace(data='2' + json.dumps([event, data]))
+
+
+def events(eio):
+    return [json.loads(data[1:])[0] for data in eio.sent]
+
+
+def make_queues(**options):
+    eio = FakeEio()
+    queues = OutboundQueues(clock=ManualClock(), **options)
+    resyncs = []
+
+    def on_resync(eio_sid):
+        resyncs.append(eio_sid)
+        queues.send(eio_sid, packet('resync'))
+    queues.install(eio, on_resync, lambda eio_sid: None)
+    return queues, eio, resyncs
+
+
+def test_sends_directly_below_high_water():
+    queues, eio, _ = make_queues(high_water=4)
+    queues.send(SID, packet('receive_item'))
+    assert events(eio) == ['receive_item']
+    assert queues.stats() == (0, 0)
+
+
+def test_replaceable_keeps_latest_in_its_own_position():
+    queues, eio, _ = make_queues(high_water=4)
+    eio.sockets[SID].depth = 4
+    queues.send(SID, packet('update_lobby', 1))
+    queues.send(SID, packet('game_started'))
+    queues.send(SID, packet('update_game_state', 1))
+    queues.send(SID, packet('update_lobby', 2))
+    queues.send(SID, packet('update_game_state', 2))
+    assert queues.stats() == (1, 3)
+    eio.sockets[SID].depth = 0
+    queues.flush()
+    assert [json.loads(data[1:]) for data in eio.sent] == [
+        ['game_started', None], ['update_lobby', 2], ['update_game_state', 2]]
+    assert queues.stats() == (0, 0)
+
+
+def test_lobby_update_is_not_sent_after_game_started():
+    queues, eio, _ = make_queues(high_water=4)
+    eio.sockets[SID].depth = 4
+    queues.send(SID, packet('update_lobby'))
+    queues.send(SID, packet('game_started'))
+    eio.sockets[SID].depth = 0
+    queues.flush()
+    assert events(eio) == ['update_lobby', 'game_started']
+
+
+def test_flush_respects_budget_and_order():
+    queues, eio, _ = make_queues(high_water=2)
+    eio.sockets[SID].depth = 2
+    for i in range(5):
+        queues.send(SID, packet('receive_item', i))
+    eio.sockets[SID].depth = 0
+    queues.flush()
+    assert [json.loads(data[1:])[1] for data in eio.sent] == [0, 1]
+    queues.flush()
+    queues.flush()
+    assert [json.loads(data[1:])[1] for data in eio.sent] == [0, 1, 2, 3, 4]
+
+
+def test_overflow_keeps_lifecycle_events_then_resyncs():
+    queues, eio, resyncs = make_queues(high_water=1, max_backlog=4)
+    eio.sockets[SID].depth = 1
+    queues.send(SID, packet('update_lobby'))
+    queues.send(SID, packet('game_started'))
+    for i in range(3):
+        queues.send(SID, packet('receive_item', i))
+    queues.send(SID, packet('level_complete'))
+    queues.send(SID, packet('receive_item', 3)) # เกิน max_backlog
+    queues.send(SID, packet('receive_item', 4)) # ถูกทิ้งระหว่างรอ resync
+    queues.send(SID, packet('clear_all_items'))
+    queues.send(SID, packet('game_over'))
+    eio.sockets[SID].depth = -100
+    queues.flush()
+    assert resyncs == [SID]
+    assert events(eio) == ['update_lobby', 'game_started', 'level_complete', 'clear_all_items', 'game_over', 'resync']
+    assert queues.stats() == (0, 0)
+
+
+def test_slow_client_is_disconnected():
+    queues, eio, _ = make_queues(high_water=1, disconnect_after=5.0)
+    disconnected = []
+    queues.on_disconnect = disconnected.append
+    eio.sockets[SID].depth = 1
+    queues.send(SID, packet('receive_item'))
+    queues.clock.advance(6)
+    queues.flush()
+    assert disconnected == [SID]
+    assert queues.stats() == (0, 0)
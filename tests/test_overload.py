@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+from overload import OverloadController
+
+
+def make_controller(**options):
+    changes = []
+    controller = OverloadController(on_change=lambda previous, level, load: changes.append((previous, level)), **options)
+    return controller, changes
+
+
+def feed(controller, samples):
+    return [controller.observe(iteration, lateness) for iteration, lateness in samples]
+
+
+def test_raises_one_level_after_raise_after_samples():
+    controller, changes = make_controller(alpha=1.0) # load = sample ล่าสุด
+    assert feed(controller, [(0.6, 0.0)] * 2) == [0, 1]
+    assert feed(controller, [(0.6, 0.2)] * 2) == [1, 2] # lateness นับรวมด้วย
+    assert feed(controller, [(0.9, 0.1)] * 4) == [2, 3, 3, 3] # ระดับสูงสุดคือ 3
+    assert changes == [(0, 1), (1, 2), (2, 3)]
+    assert controller.level_name == 'shed' and not controller.accepting_rooms and controller.spawn_batch == 2
+
+
+def test_lowers_after_lower_after_samples_below_ratio():
+    controller, changes = make_controller(alpha=1.0)
+    feed(controller, [(0.6, 0.0)] * 2)
+    # ต่ำกว่า 0.5 แต่ไม่ต่ำกว่า 0.5 * 0.7: คงระดับไว้
+    assert feed(controller, [(0.4, 0.0)] * 10) == [1] * 10
+    assert feed(controller, [(0.3, 0.0)] * 5) == [1, 1, 1, 1, 0]
+    assert changes == [(0, 1), (1, 0)]
+
+
+def test_interrupted_streak_starts_over():
+    controller, changes = make_controller(alpha=1.0)
+    assert feed(controller, [(0.6, 0.0), (0.1, 0.0), (0.6, 0.0), (0.1, 0.0)]) == [0, 0, 0, 0]
+    feed(controller, [(0.6, 0.0)] * 2)
+    assert feed(controller, [(0.3, 0.0)] * 4 + [(0.45, 0.0)] + [(0.3, 0.0)] * 4) == [1] * 9
+    assert changes == [(0, 1)]
+
+
+def test_single_spike_does_not_change_level():
+    controller, changes = make_controller()
+    feed(controller, [(0.1, 0.0)] * 20)
+    feed(controller, [(3.0, 2.0)]) # รอบเดียวที่ช้ามาก (เช่น GC pause)
+    feed(controller, [(0.1, 0.0)] * 20)
+    assert controller.level == 0 and changes == []
+
+
+def test_idle_rooms_are_throttled_by_level():
+    controller, _ = make_controller(alpha=1.0)
+    active = SimpleNamespace(id='A', now=100.0, last_action_at=98.0)
+    idle = SimpleNamespace(id='I', now=100.0, last_action_at=0.0)
+    assert all(controller.should_broadcast(idle, tick) for tick in range(8))
+    feed(controller, [(0.6, 0.0)] * 2 + [(0.8, 0.0)] * 2)
+    assert controller.level == 2
+    assert all(controller.should_broadcast(active, tick) for tick in range(8))
+    assert sum(controller.should_broadcast(idle, tick) for tick in range(8)) == 2
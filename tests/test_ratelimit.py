@@ -0,0 +1,57 @@
+from ratelimit import ALLOW, DISCONNECT, DROP, RateLimiter, parse_limit
+from simulation import ManualClock
+
+
+def make_limiter(**options):
+    clock = ManualClock()
+    return RateLimiter({'player_action': (10.0, 5)}, clock=clock, **options), clock
+
+
+def test_burst_then_drop():
+    limiter, _ = make_limiter()
+    assert [limiter.check('a', 'player_action') for _ in range(6)] == [ALLOW] * 5 + [DROP]
+
+
+def test_refills_at_rate_up_to_burst():
+    limiter, clock = make_limiter()
+    for _ in range(5):
+        limiter.check('a', 'player_action')
+    clock.advance(0.2) # 10 ต่อวินาที = 2 token
+    assert [limiter.check('a', 'player_action') for _ in range(3)] == [ALLOW, ALLOW, DROP]
+    clock.advance(60) # เติมได้ไม่เกิน burst
+    assert [limiter.check('a', 'player_action') for _ in range(6)] == [ALLOW] * 5 + [DROP]
+
+
+def test_buckets_are_per_sid_and_unlimited_events_pass():
+    limiter, _ = make_limiter()
+    for _ in range(5):
+        limiter.check('a', 'player_action')
+    assert limiter.check('a', 'player_action') == DROP
+    assert limiter.check('b', 'player_action') == ALLOW
+    assert all(limiter.check('a', 'chat') == ALLOW for _ in range(100))
+
+
+def test_disconnects_once_after_abuse_drops_in_window():
+    limiter, _ = make_limiter(abuse_drops=3, abuse_window=10.0)
+    for _ in range(5):
+        limiter.check('a', 'player_action')
+    assert [limiter.check('a', 'player_action') for _ in range(4)] == [DROP, DROP, DISCONNECT, DROP]
+    limiter.forget('a')
+    assert 'a' not in limiter.clients
+
+
+def test_abuse_window_resets_drop_count():
+    limiter, clock = make_limiter(abuse_drops=3, abuse_window=10.0)
+    for _ in range(5):
+        limiter.check('a', 'player_action')
+    assert [limiter.check('a', 'player_action') for _ in range(2)] == [DROP, DROP]
+    clock.advance(11)
+    for _ in range(5):
+        limiter.check('a', 'player_action')
+    assert [limiter.check('a', 'player_action') for _ in range(2)] == [DROP, DROP]
+
+
+def test_parse_limit():
+    assert parse_limit('20,40', (1.0, 1.0)) == (20.0, 40.0)
+    for value in (None, '', '20', 'x,y', '0,5', '5,0.5'):
+        assert parse_limit(value, (1.0, 1.0)) == (1.0, 1.0)
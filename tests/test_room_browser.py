@@ -0,0 +1,94 @@
+from game_engine import MAX_PLAYERS, GameRoom, NullTransport
+from room_browser import RoomBrowser
+
+
+def make_room(room_id, humans=1, bots=0, public=True):
+    room = GameRoom(room_id, 'h0', f'host-{room_id}', NullTransport(), seed=1)
+    room.public = public
+    for i in range(1, humans):
+        room.add_player(f'p{i}', f'p{i}')
+    for i in range(bots):
+        room.add_player(f'bot-{i}', f'bot{i}', bot=True)
+    return room
+
+
+def ids(page):
+    return [entry['room_id'] for entry in page['rooms']]
+
+
+def test_orders_by_humans_then_age():
+    browser = RoomBrowser()
+    rooms = [make_room('A', 1), make_room('B', 3), make_room('C', 1, bots=3), make_room('D', 3)]
+    for room in rooms:
+        browser.update(room)
+    assert ids(browser.page()) == ['B', 'D', 'A', 'C'] # บอทไม่นับเป็นผู้เล่นจริง
+    rooms[0].add_player('p9', 'p9')
+    rooms[0].add_player('p10', 'p10')
+    rooms[0].add_player('p11', 'p11')
+    browser.update(rooms[0])
+    assert ids(browser.page()) == ['A', 'B', 'D', 'C']
+    rooms[0].remove_player('p9')
+    browser.update(rooms[0])
+    assert ids(browser.page()) == ['A', 'B', 'D', 'C'] # จำนวนเท่ากัน: ห้องเก่าก่อน
+    rooms[0].remove_player('p10')
+    browser.update(rooms[0])
+    assert ids(browser.page()) == ['B', 'D', 'A', 'C']
+
+
+def test_entry_fields():
+    browser = RoomBrowser()
+    browser.update(make_room('A', 2, bots=1))
+    assert browser.page()['rooms'] == [{'room_id': 'A', 'host': 'host-A', 'players': 3, 'bots': 1,
+                                        'max_players': MAX_PLAYERS}]
+
+
+def test_pagination():
+    browser = RoomBrowser()
+    for i in range(25):
+        browser.update(make_room(f'R{i:02d}'))
+    first, second = browser.page(0, 20), browser.page(20, 20)
+    assert first['total'] == second['total'] == len(browser) == 25
+    assert ids(first) + ids(second) == [f'R{i:02d}' for i in range(25)]
+    assert second['offset'] == 20 and browser.page(40, 20)['rooms'] == []
+
+
+def test_only_joinable_public_lobbies_are_listed():
+    browser = RoomBrowser()
+    private, full, started = make_room('P', public=False), make_room('F', MAX_PLAYERS), make_room('S', 2)
+    started.start_game()
+    for room in (private, full, started):
+        browser.update(room)
+    assert len(browser) == 0
+    listed = make_room('L')
+    browser.update(listed)
+    listed.public = False
+    browser.update(listed)
+    assert len(browser) == 0
+
+
+def test_unchanged_room_does_not_bump_version():
+    browser = RoomBrowser()
+    room = make_room('A')
+    browser.update(room)
+    version = browser.version
+    browser.update(room)
+    assert browser.version == version
+    browser.remove('A')
+    assert len(browser) == 0 and browser.version == version + 1
+
+
+def test_push_sends_each_watcher_its_page_once_per_change():
+    browser = RoomBrowser()
+    for i in range(3):
+        browser.update(make_room(f'R{i}'))
+    browser.watch('w1')
+    browser.watch('w2', offset=1, limit=1)
+    sent = []
+    emit = lambda event, data, to: sent.append((event, to, ids(data)))
+    assert browser.push(emit) == 2
+    assert sorted(sent) == [('room_list', 'w1', ['R0', 'R1', 'R2']), ('room_list', 'w2', ['R1'])]
+    assert browser.push(emit) == 0 # ดัชนีไม่เปลี่ยน
+    browser.unwatch('w1')
+    browser.remove('R0')
+    sent.clear()
+    assert browser.push(emit) == 1 and sent == [('room_list', 'w2', ['R2'])]
@@ -0,0 +1,66 @@
+# tests/test_sessions.py
+
+from sessions import SessionRegistry
+from simulation import ManualClock
+
+
+def make_registry(grace_seconds=30.0):
+    clock = ManualClock(100.0)
+    return SessionRegistry(grace_seconds=grace_seconds, clock=clock), clock
+
+
+def test_resume_moves_seat_to_new_sid():
+    sessions, _ = make_registry()
+    token = sessions.issue('old', 'ROOM')
+    assert sessions.suspend('old')
+    assert sessions.resume(token, 'new') == ('ROOM', 'old')
+    assert sessions.tokens == {'new': token}
+    assert len(sessions) == 0  # ไม่อยู่ในสถานะหลุดแล้ว
+    assert sessions.resume(token, 'newer') == ('ROOM', 'new')  # token เดิมยังใช้ได้ต่อ
+
+
+def test_resume_on_same_sid_keeps_session():
+    sessions, _ = make_registry()
+    token = sessions.issue('sid', 'ROOM')
+    assert sessions.resume(token, 'sid') == ('ROOM', 'sid')
+    assert sessions.tokens == {'sid': token}
+
+
+def test_unknown_token_is_rejected():
+    sessions, _ = make_registry()
+    sessions.issue('sid', 'ROOM')
+    assert sessions.resume('bogus', 'other') is None
+
+
+def test_issue_revokes_previous_token():
+    sessions, _ = make_registry()
+    first = sessions.issue('sid', 'AAAA')
+    sessions.issue('sid', 'BBBB')
+    assert sessions.resume(first, 'other') is None
+
+
+def test_seat_expires_after_grace():
+    sessions, clock = make_registry(grace_seconds=30.0)
+    token = sessions.issue('sid', 'ROOM')
+    sessions.suspend('sid')
+    clock.advance(29.9)
+    assert sessions.expired() == []
+    clock.advance(0.1)
+    assert sessions.expired() == [('ROOM', 'sid')]
+    assert sessions.resume(token, 'new') is None
+    assert sessions.expired() == []
+
+
+def test_suspend_without_grace_releases_seat():
+    sessions, _ = make_registry(grace_seconds=0)
+    sessions.issue('sid', 'ROOM')
+    assert not sessions.suspend('sid')
+
+
+def test_restore_marks_everyone_away():
+    sessions, clock = make_registry()
+    sessions.restore([['t1', 'ROOM', 'a'], ['t2', 'ROOM', 'b']], grace_seconds=60.0)
+    assert len(sessions) == 2
+    assert sessions.resume('t1', 'a2') == ('ROOM', 'a')
+    clock.advance(60.0)
+    assert sessions.expired() == [('ROOM', 'b')]
@@ -0,0 +1,72 @@
+import json
+
+import snapshot
+from bots import act
+from game_engine import GameRoom, NullTransport
+from simulation import GreedyPolicy, ManualClock, SimulationTransport
+
+
+def make_room(seconds=30):
+    """ห้องสาธารณะที่เล่นไปแล้วครู่หนึ่ง: ผู้เล่นจริง 2 คน (คนหนึ่งหลุดอยู่) และบอท 1 ตัว"""
+    clock = ManualClock(1000.0)
+    transport = SimulationTransport()
+    room = GameRoom('SNAP', 'h0', 'host', transport, clock=clock, seed=11)
+    room.public = True
+    room.add_player('p1', 'guest')
+    room.add_player('bot-1', 'บอท', bot=True)
+    room.start_game()
+    policy = GreedyPolicy()
+    for _ in range(seconds):
+        for sid in list(room.game_state.player_order_sids):
+            if room.players[sid].bot:
+                act(room, room.players[sid])
+            else:
+                policy.act(room, sid, transport.inventories[sid])
+        clock.advance(1)
+        room.update()
+    room.players['p1'].away_since = clock() - 3
+    return room, clock
+
+
+def round_trip(room, clock):
+    now = clock()
+    data = json.loads(json.dumps(snapshot.dump_room(room, now)))
+    return data, snapshot.load_room(data, NullTransport(), clock, now)
+
+
+def test_dump_load_round_trip():
+    room, clock = make_room()
+    data, restored = round_trip(room, clock)
+    again = snapshot.dump_room(restored, clock())
+    assert again[:2] + again[3:] == data[:2] + data[3:] # [2] คือ seed ใหม่ของ RNG
+    assert restored.public and restored.host_sid == 'h0'
+    assert restored.players['bot-1'].bot and restored.players['p1'].away_since == room.players['p1'].away_since
+    assert restored.get_augmented_state_for_ui() == room.get_augmented_state_for_ui()
+
+
+def test_restored_ledger_keeps_owner_index():
+    room, clock = make_room()
+    _, restored = round_trip(room, clock)
+    held = {sid: sorted(items) for sid, items in room.game_state.held.items()}
+    assert {sid: sorted(items) for sid, items in restored.game_state.held.items()} == held
+    assert restored.game_state.conveyor('p1') == [restored.game_state.items[item.id] for item in room.game_state.conveyor('p1')]
+    # บัฟเฟอร์ส่งซ้ำไม่ถูกบันทึก: resume ส่งวัตถุดิบบนสายพานทั้งหมดใหม่อยู่แล้ว
+    assert not any(restored.game_state.unacked.values())
+
+
+def test_save_does_not_touch_live_rng(tmp_path):
+    room, clock = make_room()
+    state = room.rng.getstate()
+    snapshot.save(str(tmp_path / 'rooms.json'), [room], [], clock())
+    assert room.rng.getstate() == state
+
+
+def test_save_and_load_file(tmp_path):
+    room, clock = make_room()
+    path = str(tmp_path / 'rooms.json')
+    sessions = [['token', room.id, 'p1']]
+    assert snapshot.save(path, [room], sessions, clock()) == 1
+    rooms, loaded_sessions = snapshot.load(path, NullTransport(), clock, clock())
+    assert [r.id for r in rooms] == [room.id]
+    assert loaded_sessions == sessions
+    assert snapshot.load(str(tmp_path / 'missing.json'), NullTransport(), clock, clock()) == ([], [])
@@ -0,0 +1,58 @@
+# tests/test_validation.py
+
+import pytest
+
+from game_engine import MAX_ACK_BATCH, MAX_PLATE_SIZE
+from validation import MAX_LATENCY_SAMPLES, MAX_NAME_LENGTH, SCHEMAS, validate
+
+
+@pytest.mark.parametrize('event, payload', [
+    ('create_room', {}),
+    ('create_room', {'name': 'ผู้เล่น', 'public': True}),
+    ('join_room', {'room_id': 'AB12', 'name': 'ผู้เล่น'}),
+    ('resume', {'token': 't' * 22}),
+    ('list_rooms', {'offset': 20, 'limit': 10, 'watch': False}),
+    ('player_action', {'room_id': 'AB12', 'type': 'pass_item', 'item_id': 7, 'direction': 'left'}),
+    ('player_action', {'room_id': 'AB12', 'type': 'remove_from_plate', 'ingredients': ['🍅'] * MAX_PLATE_SIZE}),
+    ('player_action', {'room_id': 'AB12', 'type': 'submit_order', 'seq': 3, 'sent_at': 1.5}),
+    ('use_ability', {'room_id': 'AB12', 'item_id': 1}),
+    ('ack_items', {'room_id': 'AB12', 'level': 1, 'ids': list(range(1, MAX_ACK_BATCH + 1))}),
+    ('latency_report', {'room_id': 'AB12', 'samples': [[1, 20.5, 3]] * MAX_LATENCY_SAMPLES}),
+])
+def test_accepts_valid_payloads(event, payload):
+    assert validate(event, payload) == payload
+
+
+@pytest.mark.parametrize('event, payload', [
+    ('create_room', None),
+    ('create_room', {'name': 'x' * (MAX_NAME_LENGTH + 1)}),
+    ('create_room', {'public': 'yes'}),
+    ('join_room', {'name': 'ผู้เล่น'}),
+    ('join_room', {'room_id': ['AB12']}),
+    ('join_room', {'room_id': 'x' * 5000}),
+    ('list_rooms', {'limit': 0}),
+    ('list_rooms', {'limit': 1000}),
+    ('player_action', {'room_id': 'AB12', 'type': 'explode'}),
+    ('player_action', {'room_id': 'AB12', 'type': 'pass_item', 'item_id': 7, 'direction': 'up'}),
+    ('player_action', {'room_id': 'AB12', 'type': 'pass_item', 'item_id': True, 'direction': 'left'}),
+    ('player_action', {'room_id': 'AB12', 'type': 'remove_from_plate', 'ingredients': ['🍅'] * (MAX_PLATE_SIZE + 1)}),
+    ('player_action', {'room_id': 'AB12', 'type': 'remove_from_plate', 'ingredients': ['not-an-ingredient']}),
+    ('player_action', {'room_id': 'AB12', 'type': 'submit_order', 'sent_at': float('nan')}),
+    ('ack_items', {'room_id': 'AB12', 'level': 99, 'ids': [1]}),
+    ('ack_items', {'room_id': 'AB12', 'level': 1, 'ids': list(range(1, MAX_ACK_BATCH + 2))}),
+    ('latency_report', {'room_id': 'AB12', 'samples': [[1, 20]]}),
+    ('latency_report', {'room_id': 'AB12', 'samples': [[1, '20', 3]]}),
+    ('latency_report', {'room_id': 'AB12', 'samples': [[1, 20, -3]]}),
+    ('latency_report', {'room_id': 'AB12', 'samples': [[1, 20, 3]] * (MAX_LATENCY_SAMPLES + 1)}),
+])
+def test_rejects_invalid_payloads(event, payload):
+    assert validate(event, payload) is None
+
+
+def test_unknown_fields_are_dropped():
+    assert validate('start_game', {'room_id': 'AB12', 'extra': 'x' * 10000}) == {'room_id': 'AB12'}
+
+
+def test_events_without_schema_are_rejected():
+    assert 'no_such_event' not in SCHEMAS
+    assert validate('no_such_event', {'room_id': 'AB12'}) is None
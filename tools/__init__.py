@@ -0,0 +1,2 @@
+# tools: เครื่องมือบรรทัดคำสั่งสำหรับทดสอบและวิเคราะห์เซิร์ฟเวอร์เกม
+# เรียกใช้ด้วย `python -m tools.<ชื่อเครื่องมือ>` จากโฟลเดอร์หลักของโปรเจกต์
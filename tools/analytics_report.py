@@ -0,0 +1,140 @@
+# tools/analytics_report.py
+#
+# --- สรุป analytics event (ดู analytics.py) แบบ offline ---
+# อ่านทุกไฟล์ตามลำดับเวลาในรอบเดียว (ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ) เก็บเพียงตัวนับและสถานะของห้องที่ยังเล่นด่านอยู่
+# - ด่าน: จำนวนครั้งที่เริ่ม/ผ่าน อัตราการผ่าน และเวลาที่ใช้จนผ่านด่าน
+# - เมนู: จำนวนครั้งที่เป็นเป้าหมาย/ส่งสำเร็จ/ส่งผิดสูตร และจำนวนการส่งต่อวัตถุดิบเฉลี่ยก่อนส่งสำเร็จ
+#   (นับการส่งต่อทั้งห้องนับจากเมนูก่อนหน้าที่ส่งสำเร็จหรือจากต้นด่าน เพราะเป้าหมายของทุกคนถูกสุ่มใหม่พร้อมกัน)
+#
+# ตัวอย่าง: python -m tools.analytics_report analytics/ --json report.json
+
+import argparse
+import glob
+import json
+import os
+import time
+
+from analytics import read_events
+
+
+class Report:
+    """ตัวนับที่อัปเดตทีละ event"""
+    def __init__(self):
+        self.events = 0
+        self.levels = {}   # {level: {'started', 'completed', 'seconds', 'min_seconds', 'max_seconds'}}
+        self.recipes = {}  # {recipe: {'assigned', 'submitted', 'failed', 'passes'}}
+        self.abilities = {} # {วัตถุดิบ: จำนวนครั้งที่แปรรูป}
+        self._playing = {} # {room: (level, เวลาที่เริ่มด่าน)}
+        self._passes = {}  # {room: จำนวนการส่งต่อนับจากเมนูล่าสุดที่ส่งสำเร็จ}
+
+    def _level(self, level):
+        stats = self.levels.get(level)
+        if stats is None:
+            stats = self.levels[level] = {'started': 0, 'completed': 0, 'seconds': 0.0,
+                                          'min_seconds': None, 'max_seconds': None}
+        return stats
+
+    def _recipe(self, recipe):
+        stats = self.recipes.get(recipe)
+        if stats is None:
+            stats = self.recipes[recipe] = {'assigned': 0, 'submitted': 0, 'failed': 0, 'passes': 0}
+        return stats
+
+    def add(self, event):
+        self.events += 1
+        kind, room, level, value = event['k'], event['r'], event['l'], event['v']
+        if kind == 'passed':
+            self._passes[room] = self._passes.get(room, 0) + 1
+        elif kind == 'objective':
+            self._recipe(value)['assigned'] += 1
+        elif kind == 'submitted':
+            stats = self._recipe(value)
+            stats['submitted'] += 1
+            stats['passes'] += self._passes.pop(room, 0)
+        elif kind == 'failed':
+            self._recipe(value)['failed'] += 1
+        elif kind == 'ability':
+            self.abilities[value] = self.abilities.get(value, 0) + 1
+        elif kind == 'level_start':
+            self._level(level)['started'] += 1
+            self._playing[room] = (level, event['t']) # ด่านก่อนหน้าของห้องนี้ที่ยังไม่จบ = ไม่ผ่าน
+            self._passes.pop(room, None)
+        elif kind == 'level_complete':
+            playing = self._playing.pop(room, None)
+            stats = self._level(level)
+            stats['completed'] += 1
+            if playing is not None and playing[0] == level:
+                seconds = event['t'] - playing[1]
+                stats['seconds'] += seconds
+                stats['min_seconds'] = seconds if stats['min_seconds'] is None else min(stats['min_seconds'], seconds)
+                stats['max_seconds'] = seconds if stats['max_seconds'] is None else max(stats['max_seconds'], seconds)
+
+    def summary(self):
+        levels = {}
+        for level, stats in sorted(self.levels.items()):
+            completed = stats['completed']
+            levels[level] = {
+                'started': stats['started'],
+                'completed': completed,
+                'completion_rate': round(completed / stats['started'], 4) if stats['started'] else None,
+                'avg_seconds_to_complete': round(stats['seconds'] / completed, 1) if completed else None,
+                'min_seconds_to_complete': stats['min_seconds'],
+                'max_seconds_to_complete': stats['max_seconds'],
+            }
+        recipes = {}
+        for recipe, stats in sorted(self.recipes.items(), key=lambda item: -item[1]['assigned']):
+            attempts = stats['submitted'] + stats['failed']
+            recipes[recipe] = {
+                'assigned': stats['assigned'],
+                'submitted': stats['submitted'],
+                'failed': stats['failed'],
+                'success_rate': round(stats['submitted'] / attempts, 4) if attempts else None,
+                'avg_passes': round(stats['passes'] / stats['submitted'], 2) if stats['submitted'] else None,
+            }
+        return {'events': self.events, 'levels': levels, 'recipes': recipes,
+                'abilities': dict(sorted(self.abilities.items(), key=lambda item: -item[1]))}
+
+
+def event_files(paths):
+    """ไฟล์ .jsonl.gz จาก path ที่ระบุ (ไดเรกทอรีหรือไฟล์) เรียงตามชื่อ ซึ่งเรียงตามเวลาที่เริ่มเขียน"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, 'events-*.jsonl.gz')))
+        else:
+            files.append(path)
+    return sorted(files, key=os.path.basename)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='สรุป analytics event ของเกม')
+    parser.add_argument('paths', nargs='+', help='ไดเรกทอรีของ GAME_ANALYTICS_DIR หรือไฟล์ .jsonl.gz')
+    parser.add_argument('--json', help='บันทึกผลสรุปเป็นไฟล์ JSON')
+    args = parser.parse_args(argv)
+
+    report = Report()
+    files = event_files(args.paths)
+    started = time.perf_counter()
+    for path in files:
+        for event in read_events(path):
+            report.add(event)
+    elapsed = time.perf_counter() - started
+    summary = report.summary()
+
+    print(f"อ่าน {summary['events']} events จาก {len(files)} ไฟล์ใน {elapsed:.2f} วินาที")
+    print(f"\n{'ด่าน':>4s} {'เริ่ม':>8s} {'ผ่าน':>8s} {'อัตราผ่าน':>10s} {'เวลาเฉลี่ย(วิ)':>14s}")
+    for level, stats in summary['levels'].items():
+        rate = f"{stats['completion_rate']:.1%}" if stats['completion_rate'] is not None else '-'
+        seconds = f"{stats['avg_seconds_to_complete']:.1f}" if stats['avg_seconds_to_complete'] is not None else '-'
+        print(f"{level:>4} {stats['started']:>8d} {stats['completed']:>8d} {rate:>10s} {seconds:>14s}")
+    print(f"\n{'เมนู':20s} {'เป้าหมาย':>8s} {'สำเร็จ':>8s} {'ผิดสูตร':>8s} {'ส่งต่อเฉลี่ย':>12s}")
+    for recipe, stats in summary['recipes'].items():
+        passes = f"{stats['avg_passes']:.2f}" if stats['avg_passes'] is not None else '-'
+        print(f"{recipe:20s} {stats['assigned']:>8d} {stats['submitted']:>8d} {stats['failed']:>8d} {passes:>12s}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# tools/balance_tuner.py
+#
+# --- ปรับสมดุลด่านด้วยการจำลองแบบ Monte Carlo ---
+# 1. สร้างตารางของทุกชุดค่าที่ระบุ (คูณ target_score/time ของทุกด่าน, spawn_interval, คูณคะแนน/เวลาโบนัสของเมนู,
+#    จำนวนผู้เล่น, นโยบายของบอท, ความเร็วของบอท) แล้วกระจายไปให้ ProcessPoolExecutor
+# 2. แต่ละ process เปลี่ยนค่าใน LEVEL_DEFINITIONS/RECIPES ของ game_engine ในที่ (in place) ก่อนเล่นแต่ละชุด
+#    แล้วเล่นเกมแบบเร่งเวลาด้วย simulation.play_game โดยไม่มี Socket
+# 3. ทุกชุดค่าใช้ seed ชุดเดียวกัน (common random numbers) ความต่างของผลจึงมาจากค่าที่เปลี่ยนเป็นหลัก ไม่ใช่จากดวง
+# 4. ส่งงานเป็นก้อน (chunksize) เพื่อลดต้นทุนการส่งข้อมูลระหว่าง process
+#
+# ตัวอย่าง: python -m tools.balance_tuner --target-scale 0.8,1,1.2 --time-scale 0.8,1 --players 2,4 \
+#           --policy greedy,novice --games 20 --target-win-rate 0.7 --json balance.json
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import game_engine
+from simulation import POLICIES, play_game
+
+_BASE_LEVELS = {level: dict(definition) for level, definition in game_engine.LEVEL_DEFINITIONS.items()}
+_BASE_RECIPES = {name: (recipe['points'], recipe['time_bonus']) for name, recipe in game_engine.RECIPES.items()}
+
+GRID_PARAMETERS = (
+    # (ชื่อ, ชนิด, ค่าเริ่มต้น, คำอธิบาย)
+    ('target_scale', float, '1', 'คูณ target_score ของทุกด่าน'),
+    ('time_scale', float, '1', 'คูณเวลาของทุกด่าน'),
+    ('spawn_interval', int, '0', 'spawn_interval ของทุกด่าน (0 = ใช้ค่าเดิมของแต่ละด่าน)'),
+    ('points_scale', float, '1', 'คูณคะแนนของทุกเมนู'),
+    ('time_bonus_scale', float, '1', 'คูณเวลาโบนัสของทุกเมนู'),
+    ('players', int, '4', 'จำนวนผู้เล่น'),
+    ('policy', str, 'greedy', f'นโยบายของบอท ({", ".join(POLICIES)})'),
+    ('actions_per_second', int, '2', 'จำนวน action ต่อวินาทีของบอทแต่ละตัว'),
+)
+
+
+def apply_config(config):
+    """ตั้งค่า LEVEL_DEFINITIONS/RECIPES ของ process นี้ตาม `config` (เริ่มจากค่าเดิมทุกครั้ง)"""
+    for level, base in _BASE_LEVELS.items():
+        definition = game_engine.LEVEL_DEFINITIONS[level]
+        definition['target_score'] = max(1, round(base['target_score'] * config['target_scale']))
+        definition['time'] = max(1, round(base['time'] * config['time_scale']))
+        definition['spawn_interval'] = config['spawn_interval'] or base['spawn_interval']
+    for name, (points, time_bonus) in _BASE_RECIPES.items():
+        recipe = game_engine.RECIPES[name]
+        recipe['points'] = round(points * config['points_scale'])
+        recipe['time_bonus'] = round(time_bonus * config['time_bonus_scale'])
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def evaluate(task):
+    """เล่น `games` เกมด้วยชุดค่า `config` (ทำงานใน worker process) คืนค่า dict สรุปผล"""
+    index, config, games, seed, max_seconds = task
+    apply_config(config)
+    make_policy = POLICIES[config['policy']]
+    results = [play_game(config['players'], seed=seed + i, actions_per_second=config['actions_per_second'],
+                         policy=make_policy(seed + i), max_seconds=max_seconds) for i in range(games)]
+    scores = sorted(result['total_score'] for result in results)
+    levels = {}
+    for result in results:
+        levels[result['level']] = levels.get(result['level'], 0) + 1
+    return {
+        'index': index,
+        'config': config,
+        'games': games,
+        'win_rate': sum(result['won'] for result in results) / games,
+        'score_mean': round(statistics.fmean(scores), 1),
+        'score_stdev': round(statistics.pstdev(scores), 1),
+        'score_p10': _percentile(scores, 0.1),
+        'score_p50': _percentile(scores, 0.5),
+        'score_p90': _percentile(scores, 0.9),
+        'levels_reached': dict(sorted(levels.items())),
+        'seconds_mean': round(statistics.fmean(result['seconds'] for result in results), 1),
+    }
+
+
+def build_grid(args):
+    """ทุกชุดค่าจากตัวเลือกที่คั่นด้วยจุลภาค"""
+    names = [name for name, _, _, _ in GRID_PARAMETERS]
+    values = [[kind(value) for value in getattr(args, name).split(',')] for name, kind, _, _ in GRID_PARAMETERS]
+    for policy in values[names.index('policy')]:
+        if policy not in POLICIES:
+            raise SystemExit(f'ไม่รู้จักนโยบาย {policy!r} (มี {", ".join(POLICIES)})')
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='กวาดค่าพารามิเตอร์ของด่านด้วยการจำลองเกมหลาย process')
+    for name, _, default, help_text in GRID_PARAMETERS:
+        parser.add_argument(f'--{name.replace("_", "-")}', dest=name, default=default, help=f'{help_text} (คั่นด้วย ,)')
+    parser.add_argument('--games', type=int, default=20, help='จำนวนเกมต่อชุดค่า')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-seconds', type=int, default=1800, help='ตัดเกมที่ยาวเกินนี้ (วินาทีในเกม)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='จำนวน process')
+    parser.add_argument('--target-win-rate', type=float, help='เรียงผลตามความใกล้ของอัตราชนะกับค่านี้')
+    parser.add_argument('--top', type=int, default=20, help='จำนวนชุดค่าที่แสดง')
+    parser.add_argument('--json', help='บันทึกผลทุกชุดค่าเป็นไฟล์ JSON')
+    args = parser.parse_args(argv)
+
+    grid = build_grid(args)
+    tasks = [(index, config, args.games, args.seed, args.max_seconds) for index, config in enumerate(grid)]
+    chunksize = max(1, len(tasks) // (args.workers * 8))
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(evaluate, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+
+    games = len(tasks) * args.games
+    print(f"{len(tasks)} ชุดค่า x {args.games} เกม ใน {elapsed:.2f} วิ "
+          f"({len(tasks) / elapsed * 60:.0f} ชุดค่า/นาที, {games / elapsed:.0f} เกม/วิ, {args.workers} process)")
+
+    ranked = results
+    if args.target_win_rate is not None:
+        ranked = sorted(results, key=lambda result: (abs(result['win_rate'] - args.target_win_rate), result['index']))
+    varying = [name for name, _, _, _ in GRID_PARAMETERS if len({str(config[name]) for config in grid}) > 1]
+    header = ' '.join(f'{name:>12.12s}' for name in varying)
+    print(f"\n{header} {'ชนะ':>6s} {'เฉลี่ย':>7s} {'p10':>6s} {'p50':>6s} {'p90':>6s}")
+    for result in ranked[:args.top]:
+        values = ' '.join(f"{str(result['config'][name]):>12.12s}" for name in varying)
+        print(f"{values} {result['win_rate']:>6.1%} {result['score_mean']:>7.0f} {result['score_p10']:>6d} "
+              f"{result['score_p50']:>6d} {result['score_p90']:>6d}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'base_levels': _BASE_LEVELS, 'games_per_config': args.games, 'seed': args.seed,
+                       'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,470 @@
+# tools/loadtest.py
+#
+# --- ตัวสร้างโหลดแบบ Headless ---
+# จำลองผู้เล่นจริงด้วย python-socketio client (ตัวเดียวกับที่อยู่ใน venv)
+# 1. สร้าง N ห้อง ห้องละไม่เกิน 8 บอท ผ่าน flow จริง: create_room -> join_room -> start_game
+# 2. ยิง player_action / use_ability ตามอัตราที่กำหนด โดยเลือก action ให้สมจริงจากของที่บอทถืออยู่
+# 3. วัด connect latency, latency จาก action ถึง update_game_state ถัดไป, ข้อความ/วินาที และไบต์/วินาที
+# 4. ตอบรับวัตถุดิบ (ack_items) เป็นชุดเหมือน browser และแยกนับต้นทุนของ ack กับวัตถุดิบที่ถูกส่งซ้ำ
+#    (--no-ack = ไม่ตอบรับ ใช้เทียบกับเซิร์ฟเวอร์ที่ปิดการส่งซ้ำด้วย GAME_ITEM_RETRANSMIT_SECONDS=0)
+# 5. --server-bots K: host ขอบอทของเซิร์ฟเวอร์ (add_bot) เพิ่มอีกห้องละ K ตัว ใช้วัดต้นทุนของบอทจำนวนมาก
+#    บนเซิร์ฟเวอร์ (ดู game_bots และ game_loop_lateness_seconds ใน /metrics)
+#
+# ตัวอย่าง: python -m tools.loadtest --url http://127.0.0.1:5000 --rooms 20 --players 8 --duration 60
+# หมายเหตุ: client ต้องใช้ `requests` (polling) และ `websocket-client` (websocket) ร่วมด้วย
+#           ทุกอย่างวิ่งบนเครื่อง ไม่ต้องต่ออินเทอร์เน็ต
+
+import argparse
+import json
+import random
+import threading
+import time
+
+import socketio
+
+ACK_INTERVAL = 0.5 # วินาที (เท่ากับ ITEM_ACK_INTERVAL_MS ใน static/js/main.js)
+MAX_ACK_BATCH = 64
+
+def percentile(sorted_values, pct):
+    """คืนค่า percentile แบบ nearest-rank จาก list ที่เรียงแล้ว"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(values):
+    """สรุปค่า latency (วินาที) เป็นมิลลิวินาที"""
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p90_ms': round(percentile(values, 90) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+def payload_size(data):
+    """ประมาณขนาด payload เป็นไบต์ (ขนาด JSON ที่ส่งจริงบนสาย)"""
+    return len(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+class Stats:
+    """เก็บสถิติรวมจากบอททุกตัว (thread-safe)"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connect_latency = []
+        self.action_latency = {}  # {action_type: [seconds]}
+        self.received_messages = 0
+        self.received_bytes = 0
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        self.received_by_event = {}
+        self.ack_messages = 0
+        self.ack_bytes = 0
+        self.retransmitted_items = 0
+        self.errors = []
+
+    def record_received(self, event, data):
+        size = payload_size(data)
+        with self.lock:
+            self.received_messages += 1
+            self.received_bytes += size
+            self.received_by_event[event] = self.received_by_event.get(event, 0) + 1
+
+    def record_sent(self, data, ack=False):
+        size = payload_size(data)
+        with self.lock:
+            self.sent_messages += 1
+            self.sent_bytes += size
+            if ack:
+                self.ack_messages += 1
+                self.ack_bytes += size
+
+    def record_retransmit(self, count):
+        with self.lock:
+            self.retransmitted_items += count
+
+    def record_action_latency(self, action_type, seconds):
+        with self.lock:
+            self.action_latency.setdefault(action_type, []).append(seconds)
+
+    def record_connect(self, seconds):
+        with self.lock:
+            self.connect_latency.append(seconds)
+
+    def record_error(self, message):
+        with self.lock:
+            self.errors.append(message)
+
+    def reset_traffic(self):
+        """ล้างตัวนับ traffic เมื่อเริ่มช่วงวัดผลจริง (หลังเริ่มเกมครบทุกห้อง)"""
+        with self.lock:
+            self.received_messages = self.received_bytes = 0
+            self.sent_messages = self.sent_bytes = 0
+            self.received_by_event = {}
+            self.ack_messages = self.ack_bytes = self.retransmitted_items = 0
+            self.action_latency = {}
+
+
+class Bot:
+    """ผู้เล่นจำลอง 1 คน ใช้ socketio.Client ของตัวเอง"""
+    def __init__(self, name, url, stats, transports, ack=True):
+        self.name = name
+        self.url = url
+        self.stats = stats
+        self.transports = transports
+        self.ack = ack
+        self.client = socketio.Client(reconnection=False)
+        self.lock = threading.Lock()
+
+        self.sid = None
+        self.room_id = None
+        self.inventory = {}    # วัตถุดิบที่อยู่บนสายพานของบอท {item_id: ชื่อ}
+        self.pending_acks = [] # id ของวัตถุดิบที่ได้รับแต่ยังไม่ได้ตอบรับ
+        self.level = 1
+        self.plate = []
+        self.objective_ingredients = []
+        self.ability = None
+        self.ability_inputs = set()
+        self.pending_actions = []  # [(action_type, send_time)] รอ update_game_state ถัดไป
+        self.game_active = False
+        self.game_over = False
+
+        self.room_ready = threading.Event()
+        self.game_started = threading.Event()
+        self._register_handlers()
+
+    # --- การรับข้อความ ---
+    def _register_handlers(self):
+        client = self.client
+
+        @client.on('*')
+        def any_event(event, data=None):
+            self.stats.record_received(event, data)
+
+        # handler เฉพาะจะถูกเรียกแทน catch-all ดังนั้นต้องนับเองด้วย
+        def on(event):
+            def decorator(func):
+                def wrapper(data=None):
+                    self.stats.record_received(event, data)
+                    func(data)
+                client.on(event, wrapper)
+                return func
+            return decorator
+
+        @on('room_created')
+        def room_created(data):
+            self.room_id = data['room_id']
+            self.room_ready.set()
+
+        @on('join_success')
+        def join_success(data):
+            self.room_id = data['room_id']
+            self.room_ready.set()
+
+        @on('error_message')
+        def error_message(data):
+            self.stats.record_error(f"{self.name}: {data.get('message')}")
+            self.room_ready.set()
+
+        @on('game_started')
+        def game_started(data):
+            with self.lock:
+                self.sid = data['your_sid']
+                self.game_active = True
+                self._apply_state(data['initial_state'])
+            self.game_started.set()
+
+        @on('start_next_level')
+        def start_next_level(data):
+            with self.lock:
+                self.inventory = {}
+                self.game_active = True
+                self._apply_state(data)
+
+        @on('update_game_state')
+        def update_game_state(data):
+            now = time.perf_counter()
+            with self.lock:
+                pending, self.pending_actions = self.pending_actions, []
+                self._apply_state(data)
+            for action_type, sent_at in pending:
+                self.stats.record_action_latency(action_type, now - sent_at)
+
+        @on('receive_item')
+        def receive_item(data):
+            self._receive([data.get('item') or {}])
+
+        @on('receive_items')
+        def receive_items(data):
+            if data.get('retransmit'):
+                self.stats.record_retransmit(len(data.get('items', [])))
+            self._receive(data.get('items', []))
+
+        @on('clear_all_items')
+        def clear_all_items(data):
+            with self.lock:
+                self.inventory = {}
+                self.pending_acks = []
+
+        @on('resync')
+        def resync(data):
+            with self.lock:
+                self.inventory = {}
+                if data.get('state'):
+                    self._apply_state(data['state'])
+            self._receive(data.get('items', []))
+
+        @on('level_complete')
+        def level_complete(data):
+            with self.lock:
+                self.game_active = False
+
+        @on('game_over')
+        def game_over(data):
+            with self.lock:
+                self.game_active = False
+                self.game_over = True
+
+        @on('game_won')
+        def game_won(data):
+            with self.lock:
+                self.game_active = False
+                self.game_over = True
+
+    def _receive(self, items):
+        """เพิ่มวัตถุดิบลงสายพาน (ชิ้นที่ส่งซ้ำมี id เดิม จึงไม่ซ้ำ) และจำ id ไว้ตอบรับ"""
+        with self.lock:
+            for item in items:
+                if item.get('type') == 'ingredient':
+                    self.inventory[item.get('id')] = item.get('name')
+                    self.pending_acks.append(item.get('id'))
+
+    def _apply_state(self, state):
+        """อัปเดตข้อมูลที่บอทใช้ตัดสินใจจาก ui_state ที่ได้รับ"""
+        if not state:
+            return
+        self.level = state.get('level', self.level)
+        my_state = (state.get('players_state') or {}).get(self.sid) or {}
+        self.plate = list(my_state.get('plate') or [])
+        self.ability = my_state.get('ability')
+        for objective in state.get('all_player_objectives') or []:
+            if objective.get('player_name') == self.name:
+                self.objective_ingredients = [ing['name'] for ing in objective['ingredients']]
+                self.ability_inputs = {ing['base'] for ing in objective['ingredients'] if ing.get('base')}
+                break
+
+    # --- การส่งข้อความ ---
+    def emit(self, event, data, action_type=None):
+        self.stats.record_sent(data)
+        if action_type:
+            with self.lock:
+                self.pending_actions.append((action_type, time.perf_counter()))
+        self.client.emit(event, data)
+
+    def connect(self):
+        started = time.perf_counter()
+        self.client.connect(self.url, transports=self.transports, wait_timeout=10)
+        self.stats.record_connect(time.perf_counter() - started)
+
+    def disconnect(self):
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+
+    def choose_action(self):
+        """เลือก player_action ที่สมเหตุสมผลจากสถานะปัจจุบัน คืนค่า payload หรือ None"""
+        with self.lock:
+            if not self.game_active:
+                return None
+            missing = list(self.objective_ingredients)
+            for ing in self.plate:
+                if ing in missing:
+                    missing.remove(ing)
+            if self.objective_ingredients and not missing:
+                return {'room_id': self.room_id, 'type': 'submit_order'}
+            for item_id, ing in self.inventory.items():
+                if ing in missing:
+                    del self.inventory[item_id]
+                    return {'room_id': self.room_id, 'type': 'add_to_plate', 'item_id': item_id}
+            if self.inventory:
+                item_id = random.choice(list(self.inventory))
+                del self.inventory[item_id]
+                return {
+                    'room_id': self.room_id, 'type': 'pass_item',
+                    'direction': random.choice(('left', 'right')),
+                    'item_id': item_id,
+                }
+            return None
+
+    def choose_ability_item(self):
+        """เลือกวัตถุดิบที่จะใส่ช่องความสามารถ (ถ้ามี) คืน item_id หรือ None"""
+        with self.lock:
+            if not self.game_active or not self.ability:
+                return None
+            candidates = [item_id for item_id, ing in self.inventory.items() if ing in self.ability_inputs]
+            if not candidates:
+                return None
+            item_id = candidates[0]
+            del self.inventory[item_id]
+            return item_id
+
+    def flush_acks(self):
+        with self.lock:
+            ids, self.pending_acks = self.pending_acks[:MAX_ACK_BATCH], self.pending_acks[MAX_ACK_BATCH:]
+            level = self.level
+        if ids and self.ack:
+            data = {'room_id': self.room_id, 'level': level, 'ids': ids}
+            self.stats.record_sent(data, ack=True)
+            self.client.emit('ack_items', data)
+
+    def play(self, deadline, action_rate, ability_rate):
+        """ลูปหลักของบอท: ยิง action แบบ Poisson ตามอัตราที่กำหนดจนหมดเวลาหรือเกมจบ"""
+        next_action = time.perf_counter() + random.expovariate(action_rate) if action_rate > 0 else float('inf')
+        next_ability = time.perf_counter() + random.expovariate(ability_rate) if ability_rate > 0 else float('inf')
+        next_ack = time.perf_counter() + ACK_INTERVAL
+        while not self.game_over:
+            now = time.perf_counter()
+            if now >= deadline or not self.client.connected:
+                return
+            if now >= next_ack:
+                self.flush_acks()
+                next_ack = now + ACK_INTERVAL
+            wake_at = min(next_action, next_ability, next_ack, deadline)
+            if wake_at > now:
+                time.sleep(min(wake_at - now, 0.25))
+                continue
+            if now >= next_action:
+                payload = self.choose_action()
+                if payload:
+                    self.emit('player_action', payload, action_type=payload['type'])
+                next_action = now + random.expovariate(action_rate)
+            if now >= next_ability:
+                item_id = self.choose_ability_item()
+                if item_id:
+                    self.emit('use_ability', {'room_id': self.room_id, 'item_id': item_id}, action_type='use_ability')
+                next_ability = now + random.expovariate(ability_rate)
+
+
+def setup_room(room_index, args, stats):
+    """สร้างห้อง 1 ห้อง: host สร้าง, บอทที่เหลือเข้าร่วม แล้วคืน list ของบอท"""
+    bots = [Bot(f'bot{room_index}-{i}', args.url, stats, args.transports, ack=args.ack) for i in range(args.players)]
+    host = bots[0]
+    host.connect()
+    host.emit('create_room', {'name': host.name})
+    if not host.room_ready.wait(10) or not host.room_id:
+        raise RuntimeError(f'ห้อง {room_index}: สร้างห้องไม่สำเร็จ')
+    for bot in bots[1:]:
+        bot.connect()
+        bot.emit('join_room', {'name': bot.name, 'room_id': host.room_id})
+        if not bot.room_ready.wait(10) or not bot.room_id:
+            raise RuntimeError(f'ห้อง {room_index}: {bot.name} เข้าห้องไม่สำเร็จ')
+    for _ in range(args.server_bots): # ข้อความของ connection เดียวกันถึงตามลำดับ จึงเสร็จก่อน start_game
+        host.emit('add_bot', {'room_id': host.room_id})
+    return bots
+
+
+def run(args):
+    stats = Stats()
+    rooms = [None] * args.rooms
+    setup_errors = []
+
+    def setup_worker(index):
+        try:
+            rooms[index] = setup_room(index, args, stats)
+        except Exception as exc:
+            setup_errors.append(str(exc))
+
+    # 1. เชื่อมต่อและสร้างห้องพร้อมกันเป็นชุด ๆ
+    setup_started = time.perf_counter()
+    for batch_start in range(0, args.rooms, args.concurrency):
+        threads = [threading.Thread(target=setup_worker, args=(i,)) for i in range(batch_start, min(args.rooms, batch_start + args.concurrency))]
+        for t in threads: t.start()
+        for t in threads: t.join()
+    rooms = [bots for bots in rooms if bots]
+    setup_seconds = time.perf_counter() - setup_started
+
+    # 2. เริ่มเกมทุกห้อง
+    for bots in rooms:
+        bots[0].emit('start_game', {'room_id': bots[0].room_id})
+    for bots in rooms:
+        for bot in bots:
+            if not bot.game_started.wait(10):
+                stats.record_error(f'{bot.name}: ไม่ได้รับ game_started')
+
+    # 3. ช่วงวัดผล
+    stats.reset_traffic()
+    measure_started = time.perf_counter()
+    deadline = measure_started + args.duration
+    all_bots = [bot for bots in rooms for bot in bots]
+    threads = [threading.Thread(target=bot.play, args=(deadline, args.action_rate, args.ability_rate), daemon=True) for bot in all_bots]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - measure_started
+
+    all_latencies = [v for values in stats.action_latency.values() for v in values]
+    result = {
+        'config': {
+            'url': args.url, 'rooms': args.rooms, 'players_per_room': args.players,
+            'duration': args.duration, 'action_rate': args.action_rate, 'ability_rate': args.ability_rate,
+            'transports': args.transports, 'ack': args.ack, 'server_bots': args.server_bots,
+        },
+        'rooms_started': len(rooms),
+        'bots': len(all_bots),
+        'setup_seconds': round(setup_seconds, 3),
+        'connect_latency': summarize(stats.connect_latency),
+        'action_latency': summarize(all_latencies),
+        'action_latency_by_type': {k: summarize(v) for k, v in sorted(stats.action_latency.items())},
+        'received_messages_per_sec': round(stats.received_messages / elapsed, 1),
+        'received_bytes_per_sec': round(stats.received_bytes / elapsed, 1),
+        'sent_messages_per_sec': round(stats.sent_messages / elapsed, 1),
+        'sent_bytes_per_sec': round(stats.sent_bytes / elapsed, 1),
+        'ack_messages_per_sec': round(stats.ack_messages / elapsed, 1),
+        'ack_bytes_per_sec': round(stats.ack_bytes / elapsed, 1),
+        'retransmitted_items': stats.retransmitted_items,
+        'received_by_event': dict(sorted(stats.received_by_event.items())),
+        'errors': (setup_errors + stats.errors)[:50],
+    }
+    for bot in all_bots:
+        bot.disconnect()
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load generator สำหรับเซิร์ฟเวอร์เกมครัวอลหม่าน')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='URL ของเซิร์ฟเวอร์ (ค่าเริ่มต้น: local)')
+    parser.add_argument('--rooms', type=int, default=10, help='จำนวนห้อง')
+    parser.add_argument('--players', type=int, default=4, help='จำนวนบอทต่อห้อง (1-8)')
+    parser.add_argument('--duration', type=float, default=30.0, help='ระยะเวลาวัดผล (วินาที)')
+    parser.add_argument('--action-rate', type=float, default=2.0, help='player_action ต่อวินาทีต่อบอท')
+    parser.add_argument('--ability-rate', type=float, default=0.2, help='use_ability ต่อวินาทีต่อบอท')
+    parser.add_argument('--concurrency', type=int, default=10, help='จำนวนห้องที่ตั้งค่าพร้อมกัน')
+    parser.add_argument('--transport', dest='transports', action='append', choices=['websocket', 'polling'],
+                        help='transport ที่ใช้ (ระบุซ้ำได้, ค่าเริ่มต้น: websocket)')
+    parser.add_argument('--no-ack', dest='ack', action='store_false', help='ไม่ส่ง ack_items (เทียบต้นทุนกับการตอบรับ)')
+    parser.add_argument('--server-bots', type=int, default=0, help='จำนวนบอทของเซิร์ฟเวอร์ต่อห้อง (add_bot)')
+    parser.add_argument('--output', help='บันทึกผลลัพธ์เป็นไฟล์ JSON')
+    args = parser.parse_args(argv)
+    if not 1 <= args.players <= 8:
+        parser.error('--players ต้องอยู่ระหว่าง 1 ถึง 8')
+    if not 0 <= args.server_bots <= 8 - args.players:
+        parser.error('--players + --server-bots ต้องไม่เกิน 8')
+    args.transports = args.transports or ['websocket']
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = run(args)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# tools/replay.py
+#
+# --- เล่นซ้ำ journal ของห้องเกมแบบ offline ---
+# สร้าง GameRoom ขึ้นใหม่ด้วย seed เดิม แล้วป้อนคำสั่งตามลำดับพร้อมตั้งเวลาให้ตรงกับที่บันทึกไว้
+# ทำให้ได้ลำดับ GameState เดียวกับที่เกิดขึ้นจริงบนเซิร์ฟเวอร์ โดยไม่ต้องรอเวลาจริง
+#
+# ตัวอย่าง: python -m tools.replay journals/ABCD-20250101-120000-1a2b.journal --states states.jsonl
+
+import argparse
+import json
+import time
+
+from game_engine import GameRoom, Transport
+from journal import (
+    KIND_ABILITY, KIND_ACTION, KIND_CREATE, KIND_JOIN, KIND_LEAVE, KIND_NAMES, KIND_RESUME, KIND_START, KIND_TICK,
+    read_journal,
+)
+from simulation import ManualClock
+
+
+class ReplayTransport(Transport):
+    """เก็บข้อความขาออกทั้งหมดระหว่างเล่นซ้ำ (state จะถูกสร้างจากห้องโดยตรงหลังแต่ละคำสั่ง)"""
+    def __init__(self):
+        self.messages = []
+
+    def emit(self, event, data, to):
+        self.messages.append((event, to))
+
+    def broadcast_state(self, room):
+        self.messages.append(('update_game_state', room.id))
+
+
+def replay(records):
+    """เล่นซ้ำ records แล้ว yield (kind, timestamp, ui_state) หลังทุกคำสั่ง"""
+    if not records or records[0][0] != KIND_CREATE:
+        raise ValueError('journal ต้องเริ่มด้วย record CREATE')
+    _, timestamp, (room_id, seed, host_sid, host_name) = records[0]
+    clock = ManualClock(timestamp)
+    transport = ReplayTransport()
+    room = GameRoom(room_id, host_sid, host_name, transport, clock=clock, seed=seed)
+    yield KIND_CREATE, timestamp, room.get_augmented_state_for_ui()
+
+    for kind, timestamp, payload in records[1:]:
+        clock.now = timestamp
+        if kind == KIND_JOIN:
+            room.add_player(payload[0], payload[1], bot=payload[2])
+        elif kind == KIND_LEAVE:
+            if room.handle_player_left(payload) == 'delete_room':
+                yield kind, timestamp, None
+                return
+        elif kind == KIND_START:
+            room.start_game()
+        elif kind == KIND_ACTION:
+            room.handle_player_action(payload[0], payload[1])
+        elif kind == KIND_ABILITY:
+            room.use_ability(payload[0], payload[1])
+        elif kind == KIND_RESUME:
+            room.resume_player(payload[0], payload[1])
+        elif kind == KIND_TICK:
+            room.spawn_batch = payload or 1
+            room.update()
+        yield kind, timestamp, room.get_augmented_state_for_ui()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='เล่นซ้ำ journal ของห้องเกม')
+    parser.add_argument('journal', help='ไฟล์ .journal')
+    parser.add_argument('--states', help='บันทึก GameState หลังทุกคำสั่งเป็นไฟล์ JSONL')
+    args = parser.parse_args(argv)
+
+    records = read_journal(args.journal)
+    out = open(args.states, 'w', encoding='utf-8') if args.states else None
+    counts = {}
+    last_state = None
+    started = time.perf_counter()
+    try:
+        for kind, timestamp, state in replay(records):
+            counts[KIND_NAMES[kind]] = counts.get(KIND_NAMES[kind], 0) + 1
+            last_state = state
+            if out:
+                out.write(json.dumps({'kind': KIND_NAMES[kind], 't': timestamp, 'state': state}, ensure_ascii=False) + '\n')
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"เล่นซ้ำ {len(records)} records ใน {elapsed * 1000:.1f} ms ({len(records) / max(elapsed, 1e-9):.0f} records/วิ)")
+    print('จำนวนคำสั่ง:', json.dumps(counts, ensure_ascii=False))
+    if last_state:
+        print(f"สถานะสุดท้าย: ด่าน {last_state['level']}, คะแนน {last_state['score']}, คะแนนรวม {last_state['total_score']}, เวลาเหลือ {last_state['time_left']}")
+    else:
+        print('สถานะสุดท้าย: ไม่มีเกมที่กำลังเล่นอยู่')
+
+
+if __name__ == '__main__':
+    main()
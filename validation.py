@@ -0,0 +1,154 @@
+# validation.py
+#
+# --- ตรวจ payload ขาเข้าก่อนถึง GameRoom ---
+# schema ของแต่ละ event ถูกแปลงเป็น closure ครั้งเดียวตอน import (ไม่ต้องตีความ schema ทุกข้อความ)
+# ตัวตรวจคืนค่า payload ใหม่ที่มีเฉพาะ field ที่รู้จัก จึงไม่มีข้อมูลแปลกปลอมหลุดไปเก็บในห้องหรือถูกส่งต่อให้ผู้เล่นอื่น
+# ข้อความที่ผิดรูปแบบหรือใหญ่เกินกำหนดถูกทิ้งและนับใน counter
+
+import math
+
+from game_engine import INGREDIENT_CATALOG, LEVEL_DEFINITIONS, MAX_ACK_BATCH, MAX_PLATE_SIZE
+from metrics import Counter
+from room_browser import MAX_PAGE_SIZE
+
+MESSAGES_INVALID = Counter('game_messages_invalid_total', 'จำนวนข้อความที่ถูกทิ้งเพราะ payload ผิดรูปแบบ', ['event'])
+
+MAX_NAME_LENGTH = 32
+ROOM_ID_LENGTH = 4
+RESUME_TOKEN_LENGTH = 64
+BOT_SID_LENGTH = 32 # sid ของบอทของเซิร์ฟเวอร์ (ดู BotScheduler.new_sid)
+MAX_LATENCY_SAMPLES = 100
+
+_INVALID = object() # ค่าที่ตัวตรวจคืนเมื่อไม่ผ่าน (เร็วกว่าการ raise exception)
+
+
+# --- ตัวตรวจพื้นฐาน: แต่ละฟังก์ชันคืน closure check(value) -> ค่าที่ผ่านการตรวจ หรือ _INVALID ---
+
+def string(max_length):
+    def check(value):
+        return value if value.__class__ is str and len(value) <= max_length else _INVALID
+    return check
+
+
+def one_of(*choices):
+    allowed = frozenset(choices)
+    def check(value):
+        return value if value.__class__ is str and value in allowed else _INVALID
+    return check
+
+
+def boolean():
+    def check(value):
+        return value if value.__class__ is bool else _INVALID
+    return check
+
+
+def integer(minimum, maximum):
+    def check(value):
+        return value if value.__class__ is int and minimum <= value <= maximum else _INVALID
+    return check
+
+
+def number(minimum, maximum):
+    def check(value):
+        if value.__class__ is not int and (value.__class__ is not float or not math.isfinite(value)):
+            return _INVALID
+        return value if minimum <= value <= maximum else _INVALID
+    return check
+
+
+def list_of(item, max_length, min_length=0):
+    def check(value):
+        if value.__class__ is not list or not min_length <= len(value) <= max_length:
+            return _INVALID
+        result = []
+        for element in value:
+            element = item(element)
+            if element is _INVALID:
+                return _INVALID
+            result.append(element)
+        return result
+    return check
+
+
+def record(required=None, optional=None):
+    """dict ที่ต้องมีทุก field ใน `required` และอาจมี field ใน `optional` (field อื่นถูกตัดทิ้ง)"""
+    required = tuple((required or {}).items())
+    optional = tuple((optional or {}).items())
+    def check(value):
+        if value.__class__ is not dict:
+            return _INVALID
+        result = {}
+        for key, field in required:
+            if key not in value:
+                return _INVALID
+            checked = field(value[key])
+            if checked is _INVALID:
+                return _INVALID
+            result[key] = checked
+        for key, field in optional:
+            if key in value:
+                checked = field(value[key])
+                if checked is _INVALID:
+                    return _INVALID
+                result[key] = checked
+        return result
+    return check
+
+
+def tagged(key, variants):
+    """dict ที่เลือก schema จากค่าของ field `key` (เช่น player_action แยกตาม type)"""
+    def check(value):
+        if value.__class__ is not dict:
+            return _INVALID
+        tag = value.get(key)
+        variant = variants.get(tag) if tag.__class__ is str else None
+        return _INVALID if variant is None else variant(value)
+    return check
+
+
+# --- Schema ของแต่ละ event ---
+
+name = string(MAX_NAME_LENGTH)
+room_id = string(ROOM_ID_LENGTH)
+ingredient = one_of(*INGREDIENT_CATALOG)
+item_id = integer(1, 2 ** 31) # id ของวัตถุดิบในสมุดบัญชีของห้อง (ดู GameState.items)
+# field สำหรับวัด latency (ดู latency.py) ที่ client แนบมากับ action
+TRACE_FIELDS = {'seq': integer(0, 2 ** 53), 'sent_at': number(0, 2 ** 53)}
+
+
+def action(action_type, **fields):
+    """player_action หนึ่งชนิด: room_id + type + field เฉพาะของชนิดนั้น"""
+    return record(dict(room_id=room_id, type=one_of(action_type), **fields), TRACE_FIELDS)
+
+
+SCHEMAS = {
+    'create_room': record(optional={'name': name, 'public': boolean()}),
+    'join_room': record({'room_id': room_id}, {'name': name}),
+    'start_game': record({'room_id': room_id}),
+    'resume': record({'token': string(RESUME_TOKEN_LENGTH)}),
+    'leave_room': record(optional={'room_id': room_id}),
+    'list_rooms': record(optional={'offset': integer(0, 2 ** 31), 'limit': integer(1, MAX_PAGE_SIZE), 'watch': boolean()}),
+    'add_bot': record({'room_id': room_id}),
+    'remove_bot': record({'room_id': room_id, 'sid': string(BOT_SID_LENGTH)}),
+    'player_action': tagged('type', {
+        'pass_item': action('pass_item', item_id=item_id, direction=one_of('left', 'right')),
+        'add_to_plate': action('add_to_plate', item_id=item_id),
+        'remove_from_plate': action('remove_from_plate', ingredients=list_of(ingredient, MAX_PLATE_SIZE)),
+        'submit_order': action('submit_order'),
+        'trash_item': action('trash_item', item_id=item_id),
+    }),
+    'use_ability': record({'room_id': room_id, 'item_id': item_id}, TRACE_FIELDS),
+    'ack_items': record({'room_id': room_id, 'level': integer(1, max(LEVEL_DEFINITIONS)), 'ids': list_of(item_id, MAX_ACK_BATCH)}),
+    'latency_report': record({'room_id': room_id, 'samples': list_of(list_of(number(0, 2 ** 53), 3, 3), MAX_LATENCY_SAMPLES)}),
+}
+
+
+def validate(event, data):
+    """คืนค่า payload ที่ผ่านการตรวจ หรือ None ถ้าต้องทิ้งข้อความนี้ (event ที่ไม่มี schema ถูกทิ้งเสมอ)"""
+    check = SCHEMAS.get(event)
+    result = check(data) if check is not None else _INVALID
+    if result is _INVALID:
+        MESSAGES_INVALID.inc((event,))
+        return None
+    return result